@@ -0,0 +1,489 @@
+#-------------------------------------------------------------------------------
+# Name:             Neplan 10 WS benchmarks
+# Purpose:          Timing of the Python wrapper around Neplan 10 webservice
+#
+# Licence:          GPLv2
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas
+from lxml import etree
+
+from service import NeplanService, AsyncNeplanService, WsdlCache, parse_result_file, httpx
+from mockserver import generate_result_file
+
+
+# --- FUNCTIONS ---
+def print_timings(text, timings):
+    """Prints min, mean and max of a list of durations (in seconds)"""
+
+    print("{:<40} min {:8.4f}  mean {:8.4f}  max {:8.4f}  (n={})".format(text, min(timings), statistics.mean(timings), max(timings), len(timings)))
+
+
+def time_call(function, repeat):
+    """Calls function repeat times and returns the list of durations"""
+
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+
+    return timings
+
+
+def benchmark_startup(args):
+    """Compares NeplanService construction without cache, with a cold cache, warm disk cache and warm process cache"""
+
+    cache = WsdlCache(cache_dir=args.cacheDir or tempfile.mkdtemp(prefix="neplan_wsdl_"))
+
+    def no_cache():
+        NeplanService(args.webSer, args.user, args.passwd, wsdl_cache=False)
+
+    def cold():
+        cache.invalidate()
+        NeplanService(args.webSer, args.user, args.passwd, wsdl_cache=cache)
+
+    def warm_disk():
+        WsdlCache._documents.clear()
+        NeplanService(args.webSer, args.user, args.passwd, wsdl_cache=cache)
+
+    def warm_process():
+        NeplanService(args.webSer, args.user, args.passwd, wsdl_cache=cache)
+
+    print_timings("No cache (download + parse)", time_call(no_cache, args.repeat))
+    print_timings("Cold cache (download + store + parse)", time_call(cold, args.repeat))
+    print_timings("Warm disk cache (file read + parse)", time_call(warm_disk, args.repeat))
+    print_timings("Warm process cache", time_call(warm_process, args.repeat))
+
+
+def parse_result_tree(path):
+    """Reference implementation, parses the complete tree and builds the DataFrames from lists of dicts"""
+
+    records = {}
+    for element in etree.parse(path).iter():
+        if element.attrib and not len(element):
+            table_name = element.get("Type") or etree.QName(element).localname
+            records.setdefault(table_name, []).append(dict(element.attrib))
+
+    return {table_name: pandas.DataFrame(table_records).apply(pandas.to_numeric, errors="coerce") for table_name, table_records in records.items()}
+
+
+def rss_mb(field="VmRSS"):
+    """Resident memory of this process in MB, VmRSS now or VmHWM at its peak. ru_maxrss is only a fallback without /proc,
+    Linux carries it over from the forking process and it never drops, so it hides growth below an earlier peak."""
+
+    try:
+        with open("/proc/self/status") as status:
+            return next(int(line.split()[1]) for line in status if line.startswith(field + ":")) / 1024
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def max_rss_mb():
+    """Peak resident memory of this process in MB"""
+
+    return rss_mb("VmHWM")
+
+
+def benchmark_resultparse_single(args):
+    """Parses one file with one method and prints duration and memory as json, used in a subprocess per measurement"""
+
+    with open(args.file, "rb") as file_object:
+        content = file_object.read() if args.fromBytes else None
+
+    rss_before = rss_mb()
+    start_time = time.perf_counter()
+
+    if args.method == "stream":
+        tables = parse_result_file(content if args.fromBytes else args.file)
+    else:
+        tables = parse_result_tree(args.file)
+
+    duration = time.perf_counter() - start_time
+
+    print(json.dumps({"seconds":   duration,
+                      "peak_mb":   max_rss_mb() - rss_before,
+                      "tables_mb": sum(table.memory_usage(deep=True).sum() for table in tables.values()) / 1024 ** 2,
+                      "rows":      sum(len(table) for table in tables.values())}))
+
+
+def benchmark_resultparse(args):
+    """Compares streaming parser and full tree parsing on synthetic result files of increasing size"""
+
+    directory = tempfile.mkdtemp(prefix="neplan_results_")
+
+    print("{:>9} {:>9} {:>7} {:>9} {:>9} {:>10} {:>10}".format("elements", "xml MB", "method", "seconds", "MB/s", "peak MB", "tables MB"))
+
+    for element_count in args.sizes:
+
+        path = os.path.join(directory, "results_{}.xml".format(element_count))
+        generate_result_file(path, element_count)
+        size_mb = os.path.getsize(path) / 1024 ** 2
+
+        for method in ("stream", "tree"):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "resultparse", "--file", path, "--method", method],
+                                    check=True, capture_output=True, text=True).stdout
+            measurement = json.loads(output.strip().splitlines()[-1])
+            print("{:>9} {:>9.1f} {:>7} {:>9.2f} {:>9.1f} {:>10.1f} {:>10.1f}".format(element_count, size_mb, method, measurement["seconds"],
+                  size_mb / measurement["seconds"], measurement["peak_mb"], measurement["tables_mb"]))
+
+        os.remove(path)
+
+
+def benchmark_transfer_single(args):
+    """Uploads or downloads one file with one method and prints duration and memory as json, used in a subprocess per measurement"""
+
+    api = NeplanService(args.webSer, args.user, args.passwd)
+    project = api.GetProject(args.project) if args.direction == "download" else None
+
+    rss_before = rss_mb()
+    start_time = time.perf_counter()
+
+    if args.direction == "upload" and args.method == "stream":
+        api.stream_upload("ZipUpload", args.file)
+
+    elif args.direction == "upload":
+        with open(args.file, "rb") as file_object:
+            api.service.ZipUpload(stream=file_object.read())
+
+    elif args.method == "stream":
+        api.stream_download("CIMExport", args.file, project, api.cim_export_options())
+
+    else:
+        with open(args.file, "wb") as file_object:
+            file_object.write(api.service.CIMExport(project, api.cim_export_options()))
+
+    duration = time.perf_counter() - start_time
+
+    print(json.dumps({"seconds": duration,
+                      "peak_mb": max_rss_mb() - rss_before,
+                      "file_mb": os.path.getsize(args.file) / 1024 ** 2}))
+
+
+def benchmark_transfer(args):
+    """Compares streamed and in memory ZipUpload and CIMExport, exits with 1 if a streamed transfer needs more than maxMemory MB.
+    Without webSer a local mock server with a CIM export of the upload size is used."""
+
+    mock_server = None
+    if not args.webSer:
+        mock_server, args.webSer = start_mock_server("--exportMB", str(args.size))
+
+    directory = tempfile.mkdtemp(prefix="neplan_transfer_")
+    upload_path = os.path.join(directory, "upload.zip")
+
+    with open(upload_path, "wb") as file_object:
+        for _ in range(args.size):
+            file_object.write(os.urandom(1024 ** 2))
+
+    print("{:>9} {:>7} {:>9} {:>9} {:>9} {:>10}".format("direction", "method", "file MB", "seconds", "MB/s", "peak MB"))
+
+    exceeded = []
+    for direction in ("upload", "download"):
+        for method in args.methods:
+
+            path = upload_path if direction == "upload" else os.path.join(directory, "export_{}.zip".format(method))
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "transfer", "-w", args.webSer, "-u", args.user, "-p", args.passwd,
+                                     "-n", args.project, "--file", path, "--direction", direction, "--method", method],
+                                    check=True, capture_output=True, text=True).stdout
+            measurement = json.loads(output.strip().splitlines()[-1])
+            print("{:>9} {:>7} {:>9.1f} {:>9.2f} {:>9.1f} {:>10.1f}".format(direction, method, measurement["file_mb"], measurement["seconds"],
+                  measurement["file_mb"] / measurement["seconds"], measurement["peak_mb"]))
+
+            if method == "stream" and measurement["peak_mb"] > args.maxMemory:
+                exceeded.append(direction)
+
+            if path != upload_path:
+                os.remove(path)
+
+    os.remove(upload_path)
+
+    if mock_server:
+        mock_server.terminate()
+
+    if exceeded:
+        print("ERROR - Streamed {} needed more than {} MB".format(" and ".join(exceeded), args.maxMemory))
+        sys.exit(1)
+
+
+# Operations compared by rawparse: arguments after the project
+RAW_BENCHMARK_OPERATIONS = {"GetAllElementsOfProject":    lambda project: (project, {}, {}),
+                            "GetAllElementResults":       lambda project: (project, "LoadFlow"),
+                            "GetProjects":                lambda project: (),
+                            "GetCalcParameterAttributes": lambda project: (project, "LoadFlow")}
+
+
+def benchmark_rawparse_single(args):
+    """Calls one operation repeat times with zeep or raw_call and prints CPU time per call and memory as json, used in a
+    subprocess per measurement"""
+
+    api = NeplanService(args.webSer, args.user, args.passwd, history=False)
+    arguments = RAW_BENCHMARK_OPERATIONS[args.operation](api.GetProject(args.project))
+    call = getattr(api.service, args.operation) if args.method == "zeep" else lambda *arguments: api.raw_call(args.operation, *arguments)
+
+    rss_before = rss_mb()
+    cpu_start  = time.process_time()
+    start_time = time.perf_counter()
+
+    for _ in range(args.repeat):
+        result = call(*arguments)
+
+    cpu_seconds = (time.process_time() - cpu_start) / args.repeat
+    seconds     = (time.perf_counter() - start_time) / args.repeat
+
+    if args.operation == "GetAllElementsOfProject":
+        result = result["elementNames"] if args.method == "raw" else result.elementNames.KeyValueOfstringstring
+
+    print(json.dumps({"cpu_seconds": cpu_seconds,
+                      "seconds":     seconds,
+                      "peak_mb":     max_rss_mb() - rss_before,
+                      "items":       len(result)}))
+
+
+def benchmark_rawparse(args):
+    """Compares zeep deserialization and raw_call of the large operations, CPU time of the client process per call and
+    peak memory. Without webSer a local mock server with projectElements elements is used."""
+
+    mock_server = None
+    if not args.webSer:
+        mock_server, args.webSer = start_mock_server("--projectElements", str(args.projectElements))
+
+    print("{:>27} {:>7} {:>9} {:>11} {:>9} {:>10}".format("operation", "method", "items", "CPU s/call", "s/call", "peak MB"))
+
+    try:
+        for operation in args.operations:
+            for method in ("zeep", "raw"):
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), "rawparse", "-w", args.webSer, "-u", args.user, "-p", args.passwd,
+                                         "-n", args.project, "-r", str(args.repeat), "--operation", operation, "--method", method],
+                                        check=True, capture_output=True, text=True).stdout
+                measurement = json.loads(output.strip().splitlines()[-1])
+                print("{:>27} {:>7} {:>9} {:>11.4f} {:>9.4f} {:>10.1f}".format(operation, method, measurement["items"], measurement["cpu_seconds"],
+                      measurement["seconds"], measurement["peak_mb"]))
+    finally:
+        if mock_server:
+            mock_server.terminate()
+
+
+# Modules service.py imported eagerly before they were deferred to first use
+HEAVY_MODULES = ("zeep", "requests", "urllib3", "lxml.etree", "pandas", "aniso8601")
+
+
+def time_subprocess(command, repeat):
+    """Runs command (argument list after the python executable) repeat times in a fresh interpreter, returns the durations"""
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    return time_call(lambda: subprocess.run([sys.executable, *command], cwd=directory, check=True, stdout=subprocess.DEVNULL), repeat)
+
+
+def benchmark_importtime(args):
+    """Compares the import time of service.py with the interpreter start and the former eager imports, each in a fresh
+    interpreter. Exits with 1 if importing service.py loads a heavy module or takes longer than --maxImport."""
+
+    interpreter = time_subprocess(["-c", "pass"], args.repeat)
+    print_timings("Interpreter start [s]", interpreter)
+    print_timings("Eager imports ({}) [s]".format(", ".join(HEAVY_MODULES)), time_subprocess(["-c", "import " + ", ".join(HEAVY_MODULES)], args.repeat))
+
+    service_import = time_subprocess(["-c", "import service"], args.repeat)
+    print_timings("import service [s]", service_import)
+    print_timings("service.py crypt [s]", time_subprocess(["service.py", "crypt", "-p", "benchmark"], args.repeat))
+
+    loaded = subprocess.run([sys.executable, "-c", "import sys, service; print(' '.join(name for name in {} if name in sys.modules))".format(HEAVY_MODULES)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True, capture_output=True, text=True).stdout.split()
+
+    import_time = (statistics.median(service_import) - statistics.median(interpreter)) * 1000
+    print("INFO - import service takes {:.1f} ms above the interpreter start".format(import_time))
+
+    if loaded:
+        print("ERROR - import service loads {}".format(", ".join(loaded)))
+        sys.exit(1)
+
+    if args.maxImport is not None and import_time > args.maxImport:
+        print("ERROR - import service above {:.1f} ms".format(args.maxImport))
+        sys.exit(1)
+
+
+def start_mock_server(*options):
+    """Starts mockserver.py in a subprocess on a free port, returns the process and the server url"""
+
+    process = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mockserver.py"), "-P", "0", *options],
+                               stdout=subprocess.PIPE, text=True)
+
+    return process, process.stdout.readline().rsplit(" ", 1)[-1].strip()
+
+
+def benchmark_suite(args):
+    """Runs construction, per call overhead, large payload deserialization and concurrent throughput benchmarks against
+    local mock servers, all results are seconds (lower is better). Exits with 1 if a result is slower than the baseline."""
+
+    fast_server, fast_url = start_mock_server("--resultElements", str(args.resultElements), "--projectElements", str(args.projectElements))
+    slow_server, slow_url = start_mock_server("--latency", str(args.latency))
+    cache   = WsdlCache(cache_dir=tempfile.mkdtemp(prefix="neplan_wsdl_"))
+    results = {}
+
+    def record(name, timings, unit="s"):
+        results[name] = statistics.median(timings)
+        print_timings("{} [{}]".format(name, unit), timings)
+
+    try:
+        # Import of service.py in a fresh interpreter, including the interpreter start
+        record("import_service", time_subprocess(["-c", "import service"], args.repeat))
+
+        # Client construction
+        record("construction_no_cache", time_call(lambda: NeplanService(fast_url, args.user, args.passwd, wsdl_cache=False), args.repeat))
+        record("construction_warm_cache", time_call(lambda: NeplanService(fast_url, args.user, args.passwd, wsdl_cache=cache), args.repeat))
+
+        # Per call overhead without server latency
+        api   = NeplanService(fast_url, args.user, args.passwd, wsdl_cache=cache)
+        plain = NeplanService(fast_url, args.user, args.passwd, wsdl_cache=cache, history=False, metrics=False)
+        record("call_overhead", time_call(lambda: api.GetProject("Project"), args.calls))
+        record("call_overhead_no_history_metrics", time_call(lambda: plain.GetProject("Project"), args.calls))
+
+        # Large payload deserialization
+        project = api.GetProject("Project")
+        record("deserialize_result_file", time_call(lambda: api.GetAnalysisResultFile("results.xml"), args.repeat))
+        record("deserialize_result_tables", time_call(lambda: api.GetAnalysisResultTables("results.xml"), args.repeat))
+        record("deserialize_elements_of_project", time_call(lambda: api.GetElementCatalog(project, refresh=True), args.repeat))
+        record("deserialize_element_results_zeep", time_call(lambda: api.GetAllElementResults(project), args.repeat))
+        record("deserialize_element_tables", time_call(lambda: api.GetElementTables(project), args.repeat))
+        record("deserialize_elements_of_project_raw", time_call(lambda: api.raw_call("GetAllElementsOfProject", project, {}, {}), args.repeat))
+        record("deserialize_element_results_raw", time_call(lambda: api.raw_call("GetAllElementResults", project, "LoadFlow"), args.repeat))
+
+        # Concurrent throughput, seconds per call
+        for workers in args.workers:
+            threaded = NeplanService(slow_url, args.user, args.passwd, wsdl_cache=cache, pool_maxsize=workers)
+
+            def run_threads():
+                with ThreadPoolExecutor(workers) as executor:
+                    list(executor.map(lambda index: threaded.GetProject("Project"), range(args.calls)))
+
+            record("throughput_threads_{}".format(workers), [timing / args.calls for timing in time_call(run_threads, args.repeat)], "s/call")
+
+        if httpx:
+            async def run_async():
+                async with AsyncNeplanService(slow_url, args.user, args.passwd, wsdl_cache=cache, max_concurrency=max(args.workers)) as async_api:
+                    start_time = time.perf_counter()
+                    await asyncio.gather(*[async_api.GetProject("Project") for _ in range(args.calls)])
+                    return time.perf_counter() - start_time
+
+            record("throughput_async_{}".format(max(args.workers)), [asyncio.run(run_async()) / args.calls for _ in range(args.repeat)], "s/call")
+
+    finally:
+        fast_server.terminate()
+        slow_server.terminate()
+
+    if args.output:
+        with open(args.output, "w") as file_object:
+            json.dump(results, file_object, indent=2)
+        print("INFO - Results written to {}".format(args.output))
+
+    if args.baseline:
+        with open(args.baseline) as file_object:
+            baseline = json.load(file_object)
+
+        regressions = [name for name, value in results.items() if name in baseline and value > baseline[name] * (1 + args.tolerance)]
+
+        for name in regressions:
+            print("ERROR - {} regressed: {:.4f} s, baseline {:.4f} s".format(name, results[name], baseline[name]))
+
+        if regressions:
+            sys.exit(1)
+
+        print("INFO - No regression above {:.0%} against {}".format(args.tolerance, args.baseline))
+
+
+if __name__ == "__main__":
+    """Readout Argument List"""
+    argParser = argparse.ArgumentParser()
+    subparsers = argParser.add_subparsers(dest='mode')
+    #Config für Startup Benchmark
+    parser_startup = subparsers.add_parser('startup', help='Compare cold and warm NeplanService construction')
+    parser_startup.add_argument("-w", "--webSer", help="WebService Adress", required=True)
+    parser_startup.add_argument("-u", "--user", help="Username", required=True)
+    parser_startup.add_argument("-p", "--passwd", help="Password, as SHA1 Passphrase use crypt to encode password", required=True)
+    parser_startup.add_argument("-r", "--repeat", help="Number of repetitions", type=int, default=5)
+    parser_startup.add_argument("-d", "--cacheDir", help="WSDL cache directory, by default a temporary directory")
+    #Config für Result Parser Benchmark
+    parser_results = subparsers.add_parser('resultparse', help='Compare memory and throughput of the result file parsers')
+    parser_results.add_argument("-s", "--sizes", help="Element counts of the synthetic result files", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser_results.add_argument("--file", help="Parse only this file and print measurement as json")
+    parser_results.add_argument("--method", help="Parser used with --file", choices=["stream", "tree"], default="stream")
+    parser_results.add_argument("--fromBytes", help="Read the file into memory before parsing, as returned by GetAnalysisResultFile", action="store_true")
+    #Config für Transfer Benchmark
+    parser_transfer = subparsers.add_parser('transfer', help='Compare memory of streamed and in memory uploads and CIM exports')
+    parser_transfer.add_argument("-w", "--webSer", help="WebService Adress, by default a local mock server")
+    parser_transfer.add_argument("-u", "--user", help="Username", default="benchmark")
+    parser_transfer.add_argument("-p", "--passwd", help="Password, as SHA1 Passphrase use crypt to encode password", default="benchmark")
+    parser_transfer.add_argument("-n", "--project", help="Project name for the CIM export", default="Project")
+    parser_transfer.add_argument("-s", "--size", help="Size of the uploaded file in MB", type=int, default=200)
+    parser_transfer.add_argument("-m", "--methods", help="Compared methods", choices=["stream", "zeep"], nargs="+", default=["stream", "zeep"])
+    parser_transfer.add_argument("--maxMemory", help="Allowed peak memory of a streamed transfer in MB", type=float, default=64)
+    parser_transfer.add_argument("--file", help="Transfer only this file and print measurement as json")
+    parser_transfer.add_argument("--direction", help="Transfer direction used with --file", choices=["upload", "download"], default="upload")
+    parser_transfer.add_argument("--method", help="Method used with --file", choices=["stream", "zeep"], default="stream")
+    #Config für Raw Response Benchmark
+    parser_raw = subparsers.add_parser('rawparse', help='Compare CPU time and memory of zeep and raw response deserialization')
+    parser_raw.add_argument("-w", "--webSer", help="WebService Adress, by default a local mock server")
+    parser_raw.add_argument("-u", "--user", help="Username", default="benchmark")
+    parser_raw.add_argument("-p", "--passwd", help="Password, as SHA1 Passphrase use crypt to encode password", default="benchmark")
+    parser_raw.add_argument("-n", "--project", help="Project name", default="Project")
+    parser_raw.add_argument("-r", "--repeat", help="Calls per measurement", type=int, default=3)
+    parser_raw.add_argument("-o", "--operations", help="Compared operations", choices=list(RAW_BENCHMARK_OPERATIONS), nargs="+", default=list(RAW_BENCHMARK_OPERATIONS))
+    parser_raw.add_argument("--projectElements", help="Elements of the project of the mock server", type=int, default=50000)
+    parser_raw.add_argument("--operation", help="Call only this operation and print measurement as json", choices=list(RAW_BENCHMARK_OPERATIONS))
+    parser_raw.add_argument("--method", help="Method used with --operation", choices=["zeep", "raw"], default="raw")
+    #Config für Import Benchmark
+    parser_import = subparsers.add_parser('importtime', help='Compare the import time of service.py with the eager imports of its dependencies')
+    parser_import.add_argument("-r", "--repeat", help="Number of repetitions", type=int, default=10)
+    parser_import.add_argument("--maxImport", help="Allowed import time of service.py above the interpreter start in ms", type=float)
+    #Config für Benchmark Suite gegen lokale Mock Server
+    parser_suite = subparsers.add_parser('suite', help='Offline benchmarks against local mock Neplan servers')
+    parser_suite.add_argument("-u", "--user", help="Username", default="benchmark")
+    parser_suite.add_argument("-p", "--passwd", help="Password", default="benchmark")
+    parser_suite.add_argument("-r", "--repeat", help="Number of repetitions", type=int, default=5)
+    parser_suite.add_argument("-c", "--calls", help="Number of calls for overhead and throughput", type=int, default=200)
+    parser_suite.add_argument("-j", "--workers", help="Thread counts for the throughput benchmark", type=int, nargs="+", default=[1, 4, 16])
+    parser_suite.add_argument("-l", "--latency", help="Server latency for the throughput benchmark in seconds", type=float, default=0.02)
+    parser_suite.add_argument("--resultElements", help="Nodes and branches of the analysis result file", type=int, default=100000)
+    parser_suite.add_argument("--projectElements", help="Elements of the project", type=int, default=20000)
+    parser_suite.add_argument("-o", "--output", help="Write the results as json to this file")
+    parser_suite.add_argument("-b", "--baseline", help="Compare with results of an earlier run, exit with 1 on regression")
+    parser_suite.add_argument("-t", "--tolerance", help="Allowed slowdown against the baseline", type=float, default=0.25)
+
+    args = argParser.parse_args()
+    if args.mode == 'startup':
+        benchmark_startup(args)
+    elif args.mode == 'resultparse' and args.file:
+        benchmark_resultparse_single(args)
+    elif args.mode == 'resultparse':
+        benchmark_resultparse(args)
+    elif args.mode == 'transfer' and args.file:
+        benchmark_transfer_single(args)
+    elif args.mode == 'transfer':
+        benchmark_transfer(args)
+    elif args.mode == 'rawparse' and args.operation:
+        benchmark_rawparse_single(args)
+    elif args.mode == 'rawparse':
+        benchmark_rawparse(args)
+    elif args.mode == 'importtime':
+        benchmark_importtime(args)
+    elif args.mode == 'suite':
+        benchmark_suite(args)
+    else:
+        argParser.print_help()
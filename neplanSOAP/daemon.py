@@ -0,0 +1,532 @@
+#-------------------------------------------------------------------------------
+# Name:             Neplan 10 WS daemon
+# Purpose:          Long running process with warm NeplanService clients, runs jobs submitted over a local
+#                   Unix socket or HTTP port, and the thin client for it. Imported by service.py on first use
+#
+# Licence:          GPLv2
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import base64
+import hmac
+import http.client
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from datetime import date, datetime
+from decimal import Decimal
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from uuid import uuid4
+
+
+JOB_TYPES = ("loadflow", "import", "cimexport", "call")
+
+# NeplanService methods of call jobs, only reading ones. Log on sessions and urls are left out, they hand out a login.
+CALL_METHODS = ("GetAllElementResults", "GetAllElementsOfElementType", "GetAllElementsOfProject", "GetAllFeeders", "GetAllSubAreas",
+                "GetAllZones", "GetAnalysisResultFile", "GetAnalysisResultTables", "GetAnaylsisLogFile", "GetCalcParameterAttributes",
+                "GetCalcParameterAttributesDescription", "GetElementCatalog", "GetElementTables", "GetLogFileAsList", "GetLogFileAsString",
+                "GetProject", "GetProjects", "GetSubAreaIDByName", "GetSubAreaNameByID", "GetZoneIDByName", "GetZoneNameByID",
+                "project_change_marker", "connection_stats", "concurrency_stats", "lookup_cache_stats")
+
+# Job parameters naming files the job reads or writes
+PATH_PARAMS = ("output_dir", "archive_dir", "diff_dir", "file", "file_path", "BoundaryPath", "DynamicLineRatingPath")
+
+
+# --- DAEMON ---
+
+class NeplanDaemon():
+    """Keeps a warm NeplanService or ServerPool and runs submitted jobs in worker threads, so a job costs a local request
+    instead of a new client with WSDL download and login. Jobs and status are served as JSON over HTTP, on a Unix socket
+    (socket_path) or on host:port.
+
+    Job types and their parameters:
+        loadflow:  project, operational_state, output_dir, download_log, archive_dir, archive_format, refresh, diff_dir, change_marker
+        import:    file, project, copy_settings_from
+        cimexport: project, file_path and the options of NeplanService.CIMExport
+        call:      method, args, kwargs, a reading method of NeplanService in CALL_METHODS, e.g. GetProjects
+
+    Requests:
+        POST /jobs          {"type": ..., "params": {...}, "wait": seconds}, answers the job, finished if it ended within wait
+        GET  /jobs          all kept jobs without results
+        GET  /jobs/<id>     the job, ?wait=seconds waits for the end
+        GET  /status        uptime, servers, job counts and SOAP call metrics
+        POST /shutdown      stops the daemon after the running jobs
+
+    The Unix socket is only accessible by the user of the daemon. On host:port every request needs the header
+    "Authorization: Bearer <token>", host must be a loopback address, and the files read and written by jobs must be
+    below output_root, by default the working directory of the daemon.
+
+        daemon = NeplanDaemon(NeplanService(server, username, crypted_password), socket_path="/tmp/neplan.sock")
+        daemon.serve_forever()
+
+    The job functions are taken from the module of api (service.py), so the jobs run with the same copy of it."""
+
+    def __init__(self, api, socket_path=None, host="127.0.0.1", port=None, max_workers=4, max_analyses=None, max_uploads=None, max_imports=None,
+                 keep_jobs=1000, debug=False, token=None, output_root=None):
+
+        self.api            = api
+        self.service        = sys.modules[type(api).__module__]
+        self.debug          = debug
+        self.keep_jobs      = keep_jobs
+        self.jobs           = OrderedDict() # job id -> job dict, oldest first
+        self.futures        = {}            # job id -> Future of unfinished jobs
+        self.start_time     = time.time()
+        self.socket_path    = socket_path
+        self.token          = token
+        self.output_root    = None
+        self.analysis_slots = threading.BoundedSemaphore(max_analyses or max_workers)
+        self.upload_slots   = threading.BoundedSemaphore(max_uploads or max_workers)
+        self.import_slots   = threading.BoundedSemaphore(max_imports or max(max_workers // 2, 1))
+        self._lock          = threading.Lock()
+        self._executor      = ThreadPoolExecutor(max_workers)
+
+        if port is None:
+            if os.path.lexists(socket_path):
+                if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+                    raise FileExistsError("{} exists and is no socket, not removed for the daemon socket".format(socket_path))
+                os.remove(socket_path) # Left over by a daemon that was killed
+            os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+            self.server = DaemonUnixServer(socket_path, DaemonHandler)
+            os.chmod(socket_path, 0o600)
+            self.address = socket_path
+        else:
+            if not token:
+                raise ValueError("The daemon needs a token to listen on a TCP port")
+            if not is_loopback(host):
+                raise ValueError("The daemon listens only on loopback addresses, not on {}".format(host))
+            self.output_root = os.path.realpath(output_root or os.getcwd())
+            self.server = DaemonHTTPServer((host, port), DaemonHandler)
+            self.address = "http://{}:{}".format(host, self.server.server_address[1])
+
+        self.server.daemon = self
+
+
+    def submit(self, job_type, params=None):
+
+        """Queues a job, returns its id"""
+
+        if job_type not in JOB_TYPES:
+            raise ValueError("Unknown job type {}, use one of {}".format(job_type, ", ".join(JOB_TYPES)))
+
+        if job_type == "call" and (params or {}).get("method") not in CALL_METHODS:
+            raise ValueError("{} is no reading method of NeplanService, see CALL_METHODS".format((params or {}).get("method")))
+
+        self._check_paths(params or {})
+
+        job = {"id": uuid4().hex, "type": job_type, "params": params or {}, "status": "queued", "submitted": time.time(), "started": None,
+               "finished": None, "duration": None, "result": None, "error": None}
+
+        if self.debug:
+            print("INFO - Job {} {} queued".format(job["id"], job_type))
+
+        with self._lock:
+            self.jobs[job["id"]] = job
+            self.futures[job["id"]] = self._executor.submit(self._run, job)
+            self._trim()
+
+        return job["id"]
+
+
+    def _check_paths(self, params):
+
+        """Raises ValueError for files of the job outside output_root"""
+
+        if self.output_root is None:
+            return
+
+        for key in PATH_PARAMS:
+            path = params.get(key)
+            if path is not None and os.path.commonpath([self.output_root, os.path.realpath(path)]) != self.output_root:
+                raise ValueError("{} {} is outside of {}".format(key, path, self.output_root))
+
+
+    def _trim(self):
+
+        """Forgets the oldest finished jobs above keep_jobs"""
+
+        for job_id in [job_id for job_id in self.jobs if job_id not in self.futures][:max(len(self.jobs) - self.keep_jobs, 0)]:
+            del self.jobs[job_id]
+
+
+    def _run(self, job):
+
+        job["status"]  = "running"
+        job["started"] = time.time()
+
+        try:
+            job["result"] = to_json(getattr(self, "_run_" + job["type"])(**job["params"]))
+            job["status"] = "failed" if isinstance(job["result"], dict) and job["result"].get("status") == "failed" else "done"
+            job["error"]  = job["result"].get("error") if job["status"] == "failed" else None
+        except Exception as error:
+            job["status"] = "failed"
+            job["error"]  = repr(error)
+
+        job["finished"] = time.time()
+        job["duration"] = job["finished"] - job["started"]
+
+        with self._lock:
+            self.futures.pop(job["id"], None)
+
+        if self.debug:
+            print("INFO - Job {} {} {} in {:.3f} s {}".format(job["id"], job["type"], job["status"], job["duration"], job["error"] or ""))
+
+
+    def _run_loadflow(self, project, output_dir, operational_state="", download_log=True, archive_dir=None, archive_format="parquet", refresh=False,
+                      diff_dir=None, change_marker=None):
+
+        job_options = {"download_log": download_log, "archive_dir": archive_dir, "archive_format": archive_format, "refresh": refresh, "diff_dir": diff_dir,
+                       "change_marker": change_marker}
+        os.makedirs(output_dir, exist_ok=True)
+
+        return self.service._run_loadflow_job(self.api, self.analysis_slots, project, operational_state, output_dir, job_options)
+
+
+    def _run_import(self, file, project="", copy_settings_from="test"):
+
+        return self.api._import_job(self.upload_slots, self.import_slots, file, project, copy_settings_from)
+
+
+    def _run_cimexport(self, project, file_path="Export.zip", **options):
+
+        if isinstance(options.get("ScenarioDateTime"), str):
+            options["ScenarioDateTime"] = self.service.aniso8601.parse_datetime(options["ScenarioDateTime"])
+
+        if isinstance(self.api, self.service.ServerPool):
+            self.api.CIMExport(project, file_path, **options)
+        else:
+            self.api.CIMExport(self.api.GetProject(project), file_path, **options)
+
+        return {"project": project, "file_path": os.path.abspath(file_path), "bytes": os.path.getsize(file_path)}
+
+
+    def _run_call(self, method, args=(), kwargs=None):
+
+        if method not in CALL_METHODS:
+            raise ValueError("{} is no reading method of NeplanService, see CALL_METHODS".format(method))
+
+        if isinstance(self.api, self.service.ServerPool):
+            with self.api.lease(self.service.get_operation_class(method)) as api:
+                return getattr(api, method)(*args, **(kwargs or {}))
+
+        return getattr(self.api, method)(*args, **(kwargs or {}))
+
+
+    def get(self, job_id, wait=None):
+
+        """Returns a copy of the job, waits up to wait seconds for its end, None for unknown ids"""
+
+        with self._lock:
+            job, future = self.jobs.get(job_id), self.futures.get(job_id)
+
+        if future is not None and wait:
+            wait_futures([future], timeout=wait)
+
+        return dict(job) if job is not None else None
+
+
+    def list_jobs(self):
+
+        """Returns all kept jobs without params and results, oldest first"""
+
+        with self._lock:
+            return [{key: value for key, value in job.items() if key not in ("params", "result")} for job in self.jobs.values()]
+
+
+    def status(self):
+
+        """Returns uptime, servers, job counts by status and the SOAP call metrics"""
+
+        with self._lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+
+        if isinstance(self.api, self.service.ServerPool):
+            servers = self.api.stats()
+            metrics = self.api.combined_metrics().as_dict()
+        else:
+            servers = {self.api.server: {}}
+            metrics = self.api.metrics.as_dict() if self.api.metrics else {}
+
+        return {"pid": os.getpid(), "address": self.address, "uptime": time.time() - self.start_time, "servers": servers, "jobs": counts, "metrics": metrics}
+
+
+    def serve_forever(self):
+
+        """Serves until shutdown, then waits for the running jobs"""
+
+        print("INFO - Neplan daemon listening on {}".format(self.address))
+
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+
+    def start(self):
+
+        """Serves in a background thread, returns the daemon"""
+
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        return self
+
+
+    def shutdown(self):
+
+        """Stops serving, may be called from a request handler"""
+
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+
+    def close(self):
+
+        self.server.server_close()
+        self._executor.shutdown(wait=True)
+
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        self.server.shutdown()
+        self.close()
+
+
+class DaemonHTTPServer(ThreadingHTTPServer):
+    """HTTP server of NeplanDaemon on a TCP port"""
+
+    daemon_threads = True
+
+
+class DaemonUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server of NeplanDaemon on a Unix socket"""
+
+    daemon_threads = True
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """Request handler of NeplanDaemon, JSON in and out"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+
+    def _send(self, status, content):
+
+        body = json.dumps(content).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def _authorized(self):
+
+        """True for requests with the token of the daemon, answers 401 to the others"""
+
+        token = self.server.daemon.token
+        if token is None or hmac.compare_digest(self.headers.get("Authorization", ""), "Bearer " + token):
+            return True
+
+        self.close_connection = True # The body of the request is not read
+        self._send(401, {"error": "Missing or wrong token"})
+
+        return False
+
+
+    def do_GET(self):
+
+        if not self._authorized():
+            return
+
+        daemon = self.server.daemon
+        url    = urlparse(self.path)
+
+        try:
+            wait = float(parse_qs(url.query).get("wait", [0])[0])
+        except ValueError as error:
+            self._send(400, {"error": "wait is no number of seconds: {}".format(error)})
+            return
+
+        if url.path == "/status":
+            self._send(200, daemon.status())
+        elif url.path == "/jobs":
+            self._send(200, daemon.list_jobs())
+        elif url.path.startswith("/jobs/"):
+            job = daemon.get(url.path[len("/jobs/"):], wait)
+            self._send(200, job) if job else self._send(404, {"error": "Unknown job"})
+        else:
+            self._send(404, {"error": "Unknown path {}".format(url.path)})
+
+
+    def do_POST(self):
+
+        if not self._authorized():
+            return
+
+        daemon  = self.server.daemon
+        length  = int(self.headers.get("Content-Length") or 0)
+
+        try:
+            request = json.loads(self.rfile.read(length)) if length else {}
+            wait    = float(request.get("wait") or 0)
+        except (ValueError, TypeError, AttributeError) as error:
+            self._send(400, {"error": "Invalid request: {}".format(error)})
+            return
+
+        if self.path == "/jobs":
+            try:
+                job_id = daemon.submit(request.get("type"), request.get("params"))
+            except ValueError as error:
+                self._send(400, {"error": str(error)})
+            else:
+                self._send(202, daemon.get(job_id, wait))
+        elif self.path == "/shutdown":
+            self._send(200, {"status": "stopping"})
+            daemon.shutdown()
+        else:
+            self._send(404, {"error": "Unknown path {}".format(self.path)})
+
+
+def is_loopback(host):
+    """True if host is a loopback address or resolves to one, e.g. localhost"""
+
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def to_json(value):
+    """Converts zeep objects, DataFrames, bytes, dates and Decimals in results to JSON compatible values"""
+
+    if hasattr(value, "_xsd_type") or hasattr(value, "__values__"):
+        from zeep.helpers import serialize_object # loaded already for zeep objects
+        value = serialize_object(value, dict)
+
+    if hasattr(value, "to_dict") and hasattr(value, "columns"):
+        return to_json(value.to_dict(orient="records"))
+    if isinstance(value, dict):
+        return {str(key): to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    return str(value)
+
+
+# --- CLIENT ---
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix socket"""
+
+    def __init__(self, socket_path, timeout=None):
+
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+
+    def connect(self):
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class DaemonClient():
+    """Thin client of NeplanDaemon, url and token for a daemon on a TCP port, else the Unix socket socket_path
+
+        client = DaemonClient("/tmp/neplan.sock")
+        job = client.submit("loadflow", {"project": "Project", "output_dir": "results"}, wait=600)"""
+
+    def __init__(self, socket_path=None, url=None, timeout=None, token=None):
+
+        if socket_path is None and url is None:
+            raise ValueError("DaemonClient needs the socket_path or the url of the daemon")
+
+        self.socket_path = socket_path
+        self.url         = urlparse(url) if url else None
+        self.timeout     = timeout
+        self.token       = token
+
+
+    def _request(self, method, path, content=None):
+
+        if self.url:
+            connection = http.client.HTTPConnection(self.url.hostname, self.url.port, timeout=self.timeout)
+        else:
+            connection = UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+
+        try:
+            body = json.dumps(content).encode("utf-8") if content is not None else None
+            headers = {"Content-Type": "application/json"} if body else {}
+            if self.token:
+                headers["Authorization"] = "Bearer " + self.token
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            result = json.loads(response.read())
+        finally:
+            connection.close()
+
+        if response.status >= 400:
+            raise RuntimeError("Neplan daemon answered {}: {}".format(response.status, result.get("error")))
+
+        return result
+
+
+    def submit(self, job_type, params=None, wait=None):
+
+        """Submits a job, returns the job, finished if it ended within wait seconds"""
+
+        return self._request("POST", "/jobs", {"type": job_type, "params": params or {}, "wait": wait})
+
+
+    def job(self, job_id, wait=None):
+
+        """Returns the job, waits up to wait seconds for its end"""
+
+        return self._request("GET", "/jobs/{}".format(job_id) + ("?wait={}".format(wait) if wait else ""))
+
+
+    def jobs(self):
+        return self._request("GET", "/jobs")
+
+
+    def status(self):
+        return self._request("GET", "/status")
+
+
+    def shutdown(self):
+        return self._request("POST", "/shutdown")
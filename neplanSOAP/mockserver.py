@@ -0,0 +1,463 @@
+#-------------------------------------------------------------------------------
+# Name:             Neplan 10 WS mock server
+# Purpose:          Local stand-in for the Neplan 10 webservice, for benchmarks without a Neplan server
+#
+# Licence:          GPLv2
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import argparse
+import base64
+import hashlib
+import io
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from lxml import etree
+
+
+# --- NAMESPACES ---
+TNS  = "http://www.neplan.ch/Web/External"
+DC   = "http://schemas.datacontract.org/2004/07/Neplan.Web.External"
+ARR  = "http://schemas.microsoft.com/2003/10/Serialization/Arrays"
+SOAP = "http://schemas.xmlsoap.org/soap/envelope/"
+
+
+# --- WSDL ---
+
+# Operations of the trimmed WSDL: request parts, response parts
+OPERATIONS = {"WriteMessageToLogFile":                 ([("project", "dc:ExternalProject"), ("text", "xs:string"), ("logLvl", "xs:string")], []),
+              "GetAllFeeders":                         ([("project", "dc:ExternalProject")], [("GetAllFeedersResult", "arr:ArrayOfstring")]),
+              "GetAllSubAreas":                        ([("project", "dc:ExternalProject")], [("GetAllSubAreasResult", "arr:ArrayOfKeyValueOfstringstring")]),
+              "GetAllZones":                           ([("project", "dc:ExternalProject")], [("GetAllZonesResult", "arr:ArrayOfKeyValueOfstringstring")]),
+              "GetAllElementResults":                  ([("project", "dc:ExternalProject"), ("analysisType", "xs:string")], [("GetAllElementResultsResult", "dc:ArrayOfElementResult")]),
+              "GetAllElementsOfElementType":           ([("project", "dc:ExternalProject"), ("elementType", "xs:string"), ("elementIDs", "arr:ArrayOfstring"), ("elementNames", "arr:ArrayOfstring")],
+                                                        [("GetAllElementsOfElementTypeResult", "xs:boolean"), ("elementIDs", "arr:ArrayOfstring"), ("elementNames", "arr:ArrayOfstring")]),
+              "GetAllElementsOfProject":               ([("project", "dc:ExternalProject"), ("elementNames", "arr:ArrayOfKeyValueOfstringstring"), ("elementTypes", "arr:ArrayOfKeyValueOfstringstring")],
+                                                        [("GetAllElementsOfProjectResult", "xs:boolean"), ("elementNames", "arr:ArrayOfKeyValueOfstringstring"), ("elementTypes", "arr:ArrayOfKeyValueOfstringstring")]),
+              "GetAnalysisResultFile":                 ([("fileName", "xs:string")], [("GetAnalysisResultFileResult", "xs:base64Binary")]),
+              "GetAnaylsisLogFile":                    ([("fileName", "xs:string")], [("GetAnaylsisLogFileResult", "xs:base64Binary")]),
+              "GetCalcParameterAttributes":            ([("project", "dc:ExternalProject"), ("analysisType", "xs:string")], [("GetCalcParameterAttributesResult", "arr:ArrayOfKeyValueOfstringstring")]),
+              "GetCalcParameterAttributesDescription": ([("analysisType", "xs:string")], [("GetCalcParameterAttributesDescriptionResult", "arr:ArrayOfKeyValueOfstringstring")]),
+              "GetProject":                            ([("projectName", "xs:string"), ("variantName", "xs:string"), ("diagramName", "xs:string"), ("layerName", "xs:string")],
+                                                        [("GetProjectResult", "dc:ExternalProject")]),
+              "GetProjects":                           ([], [("GetProjectsResult", "arr:ArrayOfstring")]),
+              "GetLogFileAsList":                      ([], [("GetLogFileAsListResult", "arr:ArrayOfstring")]),
+              "GetLogFileAsString":                    ([], [("GetLogFileAsStringResult", "xs:string")]),
+              "GetLogOnSessionID":                     ([("project", "dc:ExternalProject")], [("GetLogOnSessionIDResult", "xs:string")]),
+              "GetLogOnUrl":                           ([], [("GetLogOnUrlResult", "xs:string")]),
+              "GetLogOnUrlWithProject":                ([("project", "dc:ExternalProject")], [("GetLogOnUrlWithProjectResult", "xs:string")]),
+              "AnalyseVariant":                        ([("project", "dc:ExternalProject"), ("analysisRefenceID", "xs:string"), ("analysisModule", "xs:string"), ("calcNameID", "xs:string"),
+                                                         ("analysisMethode", "xs:string"), ("conditions", "xs:string"), ("analysisLoadOptionXML", "xs:string")],
+                                                        [("AnalyseVariantResult", "dc:AnalysisReturnInfo")]),
+              "GetSubAreaIDByName":                    ([("project", "dc:ExternalProject"), ("subAreaName", "xs:string")], [("GetSubAreaIDByNameResult", "xs:string")]),
+              "GetSubAreaNameByID":                    ([("project", "dc:ExternalProject"), ("subAreaID", "xs:string")], [("GetSubAreaNameByIDResult", "xs:string")]),
+              "GetZoneIDByName":                       ([("project", "dc:ExternalProject"), ("zoneName", "xs:string")], [("GetZoneIDByNameResult", "xs:string")]),
+              "GetZoneNameByID":                       ([("project", "dc:ExternalProject"), ("zoneID", "xs:string")], [("GetZoneNameByIDResult", "xs:string")]),
+              "CIMExport":                             ([("project", "dc:ExternalProject"), ("options", "dc:CimExportOptions"), ("runPowerFlow", "xs:boolean"), ("operationalState", "xs:string")],
+                                                        [("CIMExportResult", "xs:base64Binary")]),
+              "ZipUpload":                             ([("stream", "xs:base64Binary")], [("ZipUploadResult", "xs:string")]),
+              "XMLUpload":                             ([("stream", "xs:base64Binary")], [("XMLUploadResult", "xs:string")]),
+              "ImportFromListFile":                    ([("uploadName", "xs:string"), ("projectName", "xs:string"), ("copySettingsFromProjectName", "xs:string")],
+                                                        [("ImportFromListFileResult", "dc:ImportReturnInfo")]),
+              "DeleteMarkedAdDeletedProject":          ([], [("DeleteMarkedAdDeletedProjectResult", "xs:int")]),
+              "CIMImport":                             ([("inputFiles", "arr:ArrayOfstring"), ("isLocalPath", "xs:boolean"), ("projectName", "xs:string"), ("userName", "xs:string")],
+                                                        [("CIMImportResult", "xs:boolean")])}
+
+# Data contract types: fields
+DATA_CONTRACTS = {"ExternalProject":    [("DiagramID", "xs:string"), ("LayerID", "xs:string"), ("ProjectID", "xs:string"), ("ProjectName", "xs:string"),
+                                         ("VariantID", "xs:string"), ("VariantName", "xs:string")],
+                  "AnalysisReturnInfo": [("AnalysisRefenceID", "xs:string"), ("ErrorString", "xs:string"), ("LogFilename", "xs:string"), ("ResultFilename", "xs:string"),
+                                         ("ReturnCode", "xs:int")],
+                  "ImportReturnInfo":   [("actualCreatedProjectName", "xs:string"), ("errorMessage", "xs:string"), ("success", "xs:boolean")],
+                  "ElementResult":      [("ElementID", "xs:string"), ("ElementName", "xs:string"), ("ElementType", "xs:string"), ("Results", "arr:ArrayOfKeyValueOfstringdouble")],
+                  "CimExportOptions":   [("AreasToExport", "arr:ArrayOfguid"), ("AreasToExportNames", "arr:ArrayOfstring"), ("BalticCGMArea", "xs:string"),
+                                         ("BalticRSCExport", "xs:boolean"), ("BoundaryAreaName", "xs:string"), ("BoundaryPath", "xs:string"), ("Description", "xs:string"),
+                                         ("DynamicLineRatingPath", "xs:string"), ("ENTSOEZIP", "xs:boolean"), ("EqFileCIMID", "xs:string"), ("ExcludeBRELL", "xs:boolean"),
+                                         ("ExportAsCGMES3", "xs:boolean"), ("ExportBoundary", "xs:boolean"), ("ExportDL", "xs:boolean"), ("ExportDY", "xs:boolean"),
+                                         ("ExportEQ", "xs:boolean"), ("ExportGL", "xs:boolean"), ("ExportMerged", "xs:boolean"), ("ExportSSH", "xs:boolean"),
+                                         ("ExportSV", "xs:boolean"), ("ExportSVShortCircuit", "xs:boolean"), ("ExportTP", "xs:boolean"), ("FileHeaderComment", "xs:string"),
+                                         ("IsAutomatedExport", "xs:boolean"), ("KeepEQIDConstant", "xs:boolean"),
+                                         ("ListOfMASForSVExport", "arr:ArrayOfKeyValueOfstringArrayOfstringty7Ep6D1"), ("MAS", "xs:string"), ("Period", "xs:string"),
+                                         ("ScenarioDateTime", "xs:dateTime"), ("Version", "xs:string")]}
+
+# Serialization arrays: item name, item type or key/value types
+ARRAYS = {"ArrayOfstring":                                ("string", "xs:string"),
+          "ArrayOfguid":                                  ("guid", "xs:string"),
+          "ArrayOfKeyValueOfstringstring":                ("KeyValueOfstringstring", ("xs:string", "xs:string")),
+          "ArrayOfKeyValueOfstringdouble":                ("KeyValueOfstringdouble", ("xs:string", "xs:double")),
+          "ArrayOfKeyValueOfstringArrayOfstringty7Ep6D1": ("KeyValueOfstringArrayOfstringty7Ep6D1", ("xs:string", "arr:ArrayOfstring"))}
+
+
+def _sequence(parts):
+
+    return "".join('<xs:element minOccurs="0" name="{}" nillable="true" type="{}"/>'.format(name, type_name) for name, type_name in parts)
+
+
+def build_wsdl(address="http://localhost/Services/External/NeplanService.svc/basic"):
+    """Returns a trimmed NeplanService WSDL (singleWsdl) with the operations used by NeplanService as bytes"""
+
+    elements = []
+    for operation_name, (request_parts, response_parts) in OPERATIONS.items():
+        elements.append('<xs:element name="{}"><xs:complexType><xs:sequence>{}</xs:sequence></xs:complexType></xs:element>'.format(operation_name, _sequence(request_parts)))
+        elements.append('<xs:element name="{}Response"><xs:complexType><xs:sequence>{}</xs:sequence></xs:complexType></xs:element>'.format(operation_name, _sequence(response_parts)))
+
+    data_contracts = ['<xs:complexType name="{}"><xs:sequence>{}</xs:sequence></xs:complexType>'.format(name, _sequence(fields)) for name, fields in DATA_CONTRACTS.items()]
+    data_contracts.append('<xs:complexType name="ArrayOfElementResult"><xs:sequence><xs:element minOccurs="0" maxOccurs="unbounded" name="ElementResult" nillable="true" type="dc:ElementResult"/></xs:sequence></xs:complexType>')
+
+    arrays = []
+    for name, (item_name, item_type) in ARRAYS.items():
+        if isinstance(item_type, tuple):
+            item = '<xs:complexType><xs:sequence><xs:element name="Key" nillable="true" type="{}"/><xs:element name="Value" nillable="true" type="{}"/></xs:sequence></xs:complexType>'.format(*item_type)
+            arrays.append('<xs:complexType name="{}"><xs:sequence><xs:element minOccurs="0" maxOccurs="unbounded" name="{}">{}</xs:element></xs:sequence></xs:complexType>'.format(name, item_name, item))
+        else:
+            arrays.append('<xs:complexType name="{}"><xs:sequence><xs:element minOccurs="0" maxOccurs="unbounded" name="{}" nillable="true" type="{}"/></xs:sequence></xs:complexType>'.format(name, item_name, item_type))
+
+    messages, port_type, binding = [], [], []
+    for operation_name in OPERATIONS:
+        messages.append('<wsdl:message name="NeplanService_{0}_InputMessage"><wsdl:part name="parameters" element="tns:{0}"/></wsdl:message>'.format(operation_name))
+        messages.append('<wsdl:message name="NeplanService_{0}_OutputMessage"><wsdl:part name="parameters" element="tns:{0}Response"/></wsdl:message>'.format(operation_name))
+        port_type.append('<wsdl:operation name="{1}"><wsdl:input wsaw:Action="{0}/NeplanService/{1}" message="tns:NeplanService_{1}_InputMessage"/>'
+                         '<wsdl:output wsaw:Action="{0}/NeplanService/{1}Response" message="tns:NeplanService_{1}_OutputMessage"/></wsdl:operation>'.format(TNS, operation_name))
+        binding.append('<wsdl:operation name="{1}"><soap:operation soapAction="{0}/NeplanService/{1}" style="document"/>'
+                       '<wsdl:input><soap:body use="literal"/></wsdl:input><wsdl:output><soap:body use="literal"/></wsdl:output></wsdl:operation>'.format(TNS, operation_name))
+
+    return "\n".join([
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<wsdl:definitions name="NeplanService" targetNamespace="{0}" xmlns:wsdl="http://schemas.xmlsoap.org/wsdl/" xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/" '
+        'xmlns:wsaw="http://www.w3.org/2006/05/addressing/wsdl" xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:tns="{0}">'.format(TNS),
+        '<wsdl:types>',
+        '<xs:schema elementFormDefault="qualified" targetNamespace="{0}" xmlns:dc="{1}" xmlns:arr="{2}"><xs:import namespace="{1}"/><xs:import namespace="{2}"/>'.format(TNS, DC, ARR),
+        *elements,
+        '</xs:schema>',
+        '<xs:schema elementFormDefault="qualified" targetNamespace="{0}" xmlns:dc="{0}" xmlns:arr="{1}"><xs:import namespace="{1}"/>'.format(DC, ARR),
+        *data_contracts,
+        '</xs:schema>',
+        '<xs:schema elementFormDefault="qualified" targetNamespace="{0}" xmlns:arr="{0}">'.format(ARR),
+        *arrays,
+        '</xs:schema>',
+        '</wsdl:types>',
+        *messages,
+        '<wsdl:portType name="NeplanService">',
+        *port_type,
+        '</wsdl:portType>',
+        '<wsdl:binding name="BasicHttpBinding_NeplanService" type="tns:NeplanService"><soap:binding transport="http://schemas.xmlsoap.org/soap/http"/>',
+        *binding,
+        '</wsdl:binding>',
+        '<wsdl:service name="NeplanService"><wsdl:port name="BasicHttpBinding_NeplanService" binding="tns:BasicHttpBinding_NeplanService">'
+        '<soap:address location="{}"/></wsdl:port></wsdl:service>'.format(address),
+        '</wsdl:definitions>', '']).encode("utf-8")
+
+
+# --- SYNTHETIC PAYLOADS ---
+def generate_result_file(path, element_count, seed=0):
+    """Writes a synthetic load flow result file with element_count nodes, as many branches and a few loss records
+    path: file path or text file object"""
+
+    generator = random.Random(seed)
+
+    with (open(path, "w", encoding="utf-8") if isinstance(path, (str, os.PathLike)) else path) as file_object:
+
+        file_object.write('<?xml version="1.0" encoding="utf-8"?>\n<NeplanResults Analysis="LoadFlow">\n<Nodes>\n')
+        for index in range(element_count):
+            u = generator.uniform(0.9, 1.1)
+            file_object.write('<Node ID="N{0}" Name="Node {0}" Type="{1}" Un="110" U="{2:.4f}" u="{3:.3f}" Uang="{4:.3f}" P="{5:.3f}" Q="{6:.3f}"/>\n'.format(
+                index, "Busbar" if index % 5 else "Node", 110 * u, 100 * u, generator.uniform(-30, 30), generator.uniform(-50, 50), generator.uniform(-20, 20)))
+
+        file_object.write('</Nodes>\n<Elements>\n')
+        for index in range(element_count):
+            p = generator.uniform(-100, 100)
+            file_object.write('<Element ID="B{0}" Name="Branch {0}" Type="{1}" FromNode="N{0}" ToNode="N{2}" P1="{3:.3f}" Q1="{4:.3f}" I1="{5:.2f}" P2="{6:.3f}" Q2="{7:.3f}" Loading="{8:.2f}" PLoss="{9:.4f}" QLoss="{10:.4f}"/>\n'.format(
+                index, "Trafo2Winding" if index % 10 == 0 else "Line", (index + 1) % element_count, p, generator.uniform(-30, 30), abs(p) * 5,
+                -p * 0.99, generator.uniform(-30, 30), generator.uniform(0, 120), abs(p) * 0.01, generator.uniform(0, 1)))
+
+        file_object.write('</Elements>\n<Losses>\n')
+        for index in range(10):
+            file_object.write('<Loss Zone="Z{0}" PLoss="{1:.3f}" QLoss="{2:.3f}"/>\n'.format(index, generator.uniform(0, 10), generator.uniform(0, 5)))
+
+        file_object.write('</Losses>\n</NeplanResults>\n')
+
+        if not isinstance(path, (str, os.PathLike)):
+            return file_object.getvalue()
+
+
+ELEMENT_TYPES   = ("Busbar", "Line", "Load", "Trafo2Winding", "SynchronousMachine")
+CALC_PARAMETERS = 300 # Parameters returned by GetCalcParameterAttributes
+
+
+# --- MOCK SERVER ---
+class MockNeplanServer(ThreadingHTTPServer):
+    """HTTP server answering the NeplanService SOAP operations with synthetic payloads
+
+    latency:          seconds every operation waits before answering
+    analysis_latency: seconds AnalyseVariant and ImportFromListFile wait in addition
+    result_elements:  nodes and branches in the result file of GetAnalysisResultFile
+    project_elements: elements returned by GetAllElementsOfProject and GetAllElementResults
+    export_bytes:     size of the random CIMExport file
+    capacity:         calls the server handles at full speed, with more calls in flight all latencies grow quadratically
+    Projects named Fault... and upload names not returned by ZipUpload or XMLUpload of this server are answered with a
+    SOAP Fault.
+
+        server = MockNeplanServer(port=0).start()
+        api = NeplanService(server.url, "user", "password")"""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, analysis_latency=0.0, result_elements=1000, project_elements=1000, export_bytes=1024 ** 2,
+                 capacity=None):
+
+        super().__init__((host, port), MockNeplanHandler)
+
+        self.latency          = latency
+        self.analysis_latency = analysis_latency
+        self.project_elements = project_elements
+        self.capacity         = capacity
+        self.in_flight        = 0
+        self._lock            = threading.Lock()
+        self.url              = "http://{}:{}".format(host, self.server_address[1])
+        self.wsdl             = build_wsdl("{}/Services/External/NeplanService.svc/basic".format(self.url))
+        self.requests         = 0
+        self.activity_log     = [] # One line per handled operation, returned by GetLogFileAsString and GetLogFileAsList
+        self.uploads          = set() # Names returned by ZipUpload and XMLUpload
+        self._thread          = None
+
+        # Payloads do not depend on the request, encode them once
+        self.result_file = base64.b64encode(generate_result_file(io.StringIO(), result_elements).encode("utf-8")).decode("ascii")
+        self.log_file    = base64.b64encode(b"Load flow converged\nIterations: 4\n").decode("ascii")
+        self.export_file = base64.b64encode(random.Random(0).randbytes(export_bytes)).decode("ascii")
+
+
+    def start(self):
+
+        """Serves in a background thread, returns the server"""
+
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+
+    def stop(self):
+
+        """Stops serving and closes the socket"""
+
+        self.shutdown()
+        self.server_close()
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        self.stop()
+
+
+class MockNeplanHandler(BaseHTTPRequestHandler):
+    """Request handler of MockNeplanServer"""
+
+    protocol_version        = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+    def _send(self, status, body, content_type="text/xml; charset=utf-8"):
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"{}"'.format(hashlib.sha1(self.server.wsdl).hexdigest()))
+        self.end_headers()
+
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+
+    def do_HEAD(self):
+        self._send(200, self.server.wsdl)
+
+
+    def do_GET(self):
+        self._send(200, self.server.wsdl)
+
+
+    def do_POST(self):
+
+        self.server.requests += 1
+        message   = self.rfile.read(int(self.headers["Content-Length"]))
+        request   = etree.fromstring(message, etree.XMLParser(huge_tree=True)).find("{%s}Body" % SOAP)[0]
+        operation = etree.QName(request).localname
+        arguments = {etree.QName(child).localname: child for child in request}
+
+        with self.server._lock:
+            self.server.in_flight += 1
+            overload = max(1.0, self.server.in_flight / self.server.capacity) ** 2 if self.server.capacity else 1.0
+
+        time.sleep((self.server.latency + (self.server.analysis_latency if operation in ("AnalyseVariant", "ImportFromListFile") else 0)) * overload)
+
+        with self.server._lock:
+            self.server.in_flight -= 1
+
+        project_name = arguments["projectName"].text if "projectName" in arguments else arguments["project"].findtext("{%s}ProjectName" % DC) if "project" in arguments else None
+
+        with self.server._lock:
+            self.server.activity_log.append("{};{:%Y-%m-%dT%H:%M:%S.%f};{} {}".format("ERROR" if (project_name or "").startswith("Fault") else "INFO",
+                                                                                 datetime.now(), operation, project_name or "").rstrip())
+
+        # Upload name of ImportFromListFile and boundary of CIMExport
+        upload_name = arguments["uploadName"].text if "uploadName" in arguments else \
+                      arguments["options"].findtext("{%s}BoundaryPath" % DC) if "options" in arguments else None
+
+        if (project_name or "").startswith("Fault"):
+            self._send(500, fault_envelope("Project {} not found".format(project_name)))
+        elif upload_name and upload_name not in self.server.uploads:
+            self._send(500, fault_envelope("Upload {} not found".format(upload_name)))
+        else:
+            self._send(200, response_envelope(self.server, operation, arguments))
+
+
+def fault_envelope(message):
+    """Returns a SOAP 1.1 Fault envelope"""
+
+    envelope = etree.Element("{%s}Envelope" % SOAP, nsmap={"s": SOAP})
+    fault    = etree.SubElement(etree.SubElement(envelope, "{%s}Body" % SOAP), "{%s}Fault" % SOAP)
+    etree.SubElement(fault, "faultcode").text   = "s:Client"
+    etree.SubElement(fault, "faultstring").text = message
+
+    return etree.tostring(envelope, xml_declaration=True, encoding="utf-8")
+
+
+def _key_values(parent, name, pairs):
+
+    array = etree.SubElement(parent, "{%s}%s" % (TNS, name))
+    for key, value in pairs:
+        item = etree.SubElement(array, "{%s}KeyValueOfstringstring" % ARR)
+        etree.SubElement(item, "{%s}Key" % ARR).text   = key
+        etree.SubElement(item, "{%s}Value" % ARR).text = value
+
+
+def _fields(parent, name, values):
+
+    element = etree.SubElement(parent, "{%s}%s" % (TNS, name))
+    for key, value in values:
+        etree.SubElement(element, "{%s}%s" % (DC, key)).text = value
+
+
+def response_envelope(server, operation, arguments):
+    """Returns the SOAP response of the operation with synthetic content"""
+
+    envelope = etree.Element("{%s}Envelope" % SOAP, nsmap={"s": SOAP, "a": ARR, "b": DC})
+    response = etree.SubElement(etree.SubElement(envelope, "{%s}Body" % SOAP), "{%s}%sResponse" % (TNS, operation), nsmap={None: TNS})
+    text     = lambda name: arguments[name].text if name in arguments and arguments[name].text else ""
+
+    def result(value):
+        etree.SubElement(response, "{%s}%sResult" % (TNS, operation)).text = value
+
+    if operation == "GetProject":
+        name = text("projectName")
+        _fields(response, "GetProjectResult", [("DiagramID", "D-" + name), ("LayerID", "L-" + name), ("ProjectID", "P-" + name), ("ProjectName", name),
+                                               ("VariantID", "V-" + name), ("VariantName", text("variantName") or "Base")])
+    elif operation == "AnalyseVariant":
+        _fields(response, "AnalyseVariantResult", [("AnalysisRefenceID", text("analysisRefenceID")), ("ErrorString", ""), ("LogFilename", "analysis.log"),
+                                                   ("ResultFilename", "results.xml"), ("ReturnCode", "0")])
+    elif operation == "GetAnalysisResultFile":
+        result(server.result_file)
+    elif operation == "GetAnaylsisLogFile":
+        result(server.log_file)
+    elif operation == "CIMExport":
+        result(server.export_file)
+    elif operation in ("ZipUpload", "XMLUpload"):
+        data = base64.b64decode(text("stream"))
+        upload_name = "upload_{}_{}".format(len(data), hashlib.sha1(data).hexdigest()[:12])
+        server.uploads.add(upload_name)
+        result(upload_name)
+    elif operation == "ImportFromListFile":
+        _fields(response, "ImportFromListFileResult", [("actualCreatedProjectName", text("projectName")), ("errorMessage", ""), ("success", "true")])
+    elif operation in ("GetAllZones", "GetAllSubAreas"):
+        _key_values(response, operation + "Result", [("{}-{}".format(operation[6:-1], index), "{} {}".format(operation[6:-1], index)) for index in range(10)])
+    elif operation in ("GetZoneIDByName", "GetSubAreaIDByName"):
+        result("ID-" + (text("zoneName") or text("subAreaName")))
+    elif operation in ("GetZoneNameByID", "GetSubAreaNameByID"):
+        result("Name-" + (text("zoneID") or text("subAreaID")))
+    elif operation in ("GetAllFeeders", "GetProjects"):
+        strings = etree.SubElement(response, "{%s}%sResult" % (TNS, operation))
+        for index in range(10):
+            etree.SubElement(strings, "{%s}string" % ARR).text = "{} {}".format(operation[3:], index)
+    elif operation == "GetLogFileAsList":
+        strings = etree.SubElement(response, "{%s}%sResult" % (TNS, operation))
+        for line in list(server.activity_log):
+            etree.SubElement(strings, "{%s}string" % ARR).text = line
+    elif operation == "GetAllElementsOfProject":
+        etree.SubElement(response, "{%s}GetAllElementsOfProjectResult" % TNS).text = "true"
+        element_ids = ["E{:08d}".format(index) for index in range(server.project_elements)]
+        _key_values(response, "elementNames", [(element_id, "Element {}".format(index)) for index, element_id in enumerate(element_ids)])
+        _key_values(response, "elementTypes", [(element_id, ELEMENT_TYPES[index % len(ELEMENT_TYPES)]) for index, element_id in enumerate(element_ids)])
+    elif operation == "GetAllElementsOfElementType":
+        etree.SubElement(response, "{%s}GetAllElementsOfElementTypeResult" % TNS).text = "true"
+        element_ids = [index for index in range(server.project_elements) if ELEMENT_TYPES[index % len(ELEMENT_TYPES)] == text("elementType")]
+        for name, values in (("elementIDs", ["E{:08d}".format(index) for index in element_ids]), ("elementNames", ["Element {}".format(index) for index in element_ids])):
+            strings = etree.SubElement(response, "{%s}%s" % (TNS, name))
+            for value in values:
+                etree.SubElement(strings, "{%s}string" % ARR).text = value
+    elif operation == "GetAllElementResults":
+        results = etree.SubElement(response, "{%s}GetAllElementResultsResult" % TNS)
+        generator = random.Random(0)
+        for index in range(server.project_elements):
+            element = etree.SubElement(results, "{%s}ElementResult" % DC)
+            etree.SubElement(element, "{%s}ElementID" % DC).text   = "E{:08d}".format(index)
+            etree.SubElement(element, "{%s}ElementName" % DC).text = "Element {}".format(index)
+            etree.SubElement(element, "{%s}ElementType" % DC).text = ELEMENT_TYPES[index % len(ELEMENT_TYPES)]
+            values = etree.SubElement(element, "{%s}Results" % DC)
+            for key in ("P", "Q", "U", "I", "Loading"):
+                item = etree.SubElement(values, "{%s}KeyValueOfstringdouble" % ARR)
+                etree.SubElement(item, "{%s}Key" % ARR).text   = key
+                etree.SubElement(item, "{%s}Value" % ARR).text = "{:.4f}".format(generator.uniform(-100, 100))
+    elif operation in ("GetCalcParameterAttributes", "GetCalcParameterAttributesDescription"):
+        _key_values(response, operation + "Result", [("Parameter{:03d}".format(index), "Description of parameter {}".format(index) if operation.endswith("Description") else str(index))
+                                                     for index in range(CALC_PARAMETERS)])
+    elif operation in ("GetLogOnUrl", "GetLogOnUrlWithProject"):
+        result("{}/Neplan?session=mock".format(server.url))
+    elif operation == "GetLogOnSessionID":
+        result("mock-session")
+    elif operation == "GetLogFileAsString":
+        result("\n".join(list(server.activity_log)))
+    elif operation == "DeleteMarkedAdDeletedProject":
+        result("0")
+    elif operation == "CIMImport":
+        result("true")
+
+    return etree.tostring(envelope, xml_declaration=True, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    """Readout Argument List"""
+    argParser = argparse.ArgumentParser(description="Local stand-in for the Neplan 10 webservice")
+    argParser.add_argument("-H", "--host", help="Listen address", default="127.0.0.1")
+    argParser.add_argument("-P", "--port", help="Listen port, 0 for a free port", type=int, default=8080)
+    argParser.add_argument("-l", "--latency", help="Latency of every operation in seconds", type=float, default=0.0)
+    argParser.add_argument("--analysisLatency", help="Additional latency of AnalyseVariant and ImportFromListFile in seconds", type=float, default=0.0)
+    argParser.add_argument("--resultElements", help="Nodes and branches in the analysis result file", type=int, default=1000)
+    argParser.add_argument("--projectElements", help="Elements of every project", type=int, default=1000)
+    argParser.add_argument("--exportMB", help="Size of the CIM export in MB", type=float, default=1)
+    argParser.add_argument("--capacity", help="Calls handled at full speed, latency grows quadratically with more calls in flight", type=int)
+
+    args = argParser.parse_args()
+    server = MockNeplanServer(args.host, args.port, latency=args.latency, analysis_latency=args.analysisLatency, result_elements=args.resultElements,
+                              project_elements=args.projectElements, export_bytes=int(args.exportMB * 1024 ** 2),
+                              capacity=args.capacity)
+
+    print("INFO - Mock Neplan server listening on {}".format(server.url), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
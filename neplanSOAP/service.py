@@ -16,7 +16,6 @@
 # SOFTWARE.
 from __future__ import print_function
 
-import inspect
 import re
 import os
 #Parse Arguments
@@ -26,43 +25,137 @@ import sys
 
 import pathlib
 
+import json
+import time
+import threading
+import asyncio
+import multiprocessing
+import csv
+from collections import OrderedDict, deque
+import contextvars
+import bisect
+import itertools
+import io
+import mmap
+import shutil
+import base64
+import importlib
+import importlib.util
+from array import array
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext, contextmanager, asynccontextmanager
+
 #from hashlib import md5 # Before Neplan 10.8.2.0
 from hashlib import sha1
 from uuid import uuid4
 
-from zeep import Transport, Client, settings
-from zeep.wsse import UsernameToken
-from zeep.plugins import HistoryPlugin
-from zeep.exceptions import Fault
+from datetime import datetime, timedelta, timezone
+
+from urllib.parse import urlparse, urlunparse, quote
 
-from requests import Session
-from lxml import etree
+from enum import Enum
 
-from datetime import datetime
 
-from urllib.parse import urlparse, urlunparse
+# --- LAZY IMPORTS ---
 
-import pandas
+class LazyModule():
+    """Module imported on first attribute access, so modes like crypt or scripts using only the enums start without
+    loading zeep, requests, lxml or pandas
 
-from enum import Enum
+    Submodules are imported on access as well (pyarrow.parquet). bool() tells whether the module is installed
+    without importing it, optional dependencies are checked with: if not pyarrow: ...
+
+    local=True marks a module of this package (soap, daemon), it is imported next to this file, as neplanSOAP.soap
+    when this file is imported as neplanSOAP.service, so both share one copy of this module."""
+
+    def __init__(self, name, package=None, local=False):
+
+        if local and __package__:
+            name = "{}.{}".format(__package__, name)
+
+        self.__dict__["_name"]    = name
+        self.__dict__["_package"] = None if local else package or name.partition(".")[0] # pip package for the error message
+        self.__dict__["_module"]  = None
+
+
+    def _load(self):
+
+        module = self._module
+
+        if module is None:
+            try:
+                module = importlib.import_module(self._name)
+            except ImportError as error:
+                if self._package is None:
+                    raise
+                raise ImportError("{} is needed for this function, install it with: pip install {}".format(self._name, self._package)) from error
+
+            self.__dict__["_module"] = module
+
+        return module
+
+
+    def __getattr__(self, name):
 
-import urllib3
-urllib3.disable_warnings()
-settings.Settings(strict=False)
+        module = self._load()
 
-import aniso8601
+        try:
+            value = getattr(module, name)
+        except AttributeError:
+            try:
+                value = importlib.import_module("{}.{}".format(self._name, name))
+            except ImportError:
+                raise AttributeError("module {} has no attribute {}".format(self._name, name)) from None
 
+        self.__dict__[name] = value
 
-pandas.set_option("display.max_rows", 10)
-pandas.set_option("display.max_columns", 12)
-pandas.set_option("display.width", 1500)
-#pandas.set_option('precision', 1)
+        return value
+
+
+    def __bool__(self):
+
+        available = self.__dict__.get("_available")
+
+        if available is None:
+            try:
+                available = self.__dict__["_available"] = self._module is not None or importlib.util.find_spec(self._name) is not None
+            except ImportError:
+                available = self.__dict__["_available"] = False
+
+        return available
+
+
+    def __repr__(self):
+
+        return "<lazy module {} ({})>".format(self._name, "loaded" if self._module else "not loaded")
+
+
+zeep            = LazyModule("zeep")
+requests        = LazyModule("requests")
+etree           = LazyModule("lxml.etree", "lxml")
+aniso8601       = LazyModule("aniso8601")
+pandas          = LazyModule("pandas")   # Optional, only needed for DataFrames
+numpy           = LazyModule("numpy")    # Optional, only needed for DataFrames
+httpx           = LazyModule("httpx")    # Optional, only needed for AsyncNeplanService
+pyarrow         = LazyModule("pyarrow")  # Optional, only needed for the result archive
+soap            = LazyModule("soap", local=True)   # zeep, requests and urllib3 based classes of NeplanService, see soap.py
+daemon          = LazyModule("daemon", local=True) # Long running job server with warm clients and its client, see daemon.py
 
 
 # --- FUNCTIONS ---
 def importFiles(args):
     print(args.u)
 
+
+def set_display_options():
+    """Compact pandas output for interactive sessions, not set on import so pandas is only loaded when needed"""
+
+    pandas.set_option("display.max_rows", 10)
+    pandas.set_option("display.max_columns", 12)
+    pandas.set_option("display.width", 1500)
+    #pandas.set_option('precision', 1)
+
 #Crypt a password and print it for later use
 
 def cryptPassword(password):
@@ -73,557 +166,5100 @@ def cryptPassword(password):
     print("Copy below SHA1 Hash for later use in Service for Auth")
     print(crypted_password)
 
-class NeplanService():
 
-    # HELPER FUNCTIONS - START
+# --- WSDL CACHE ---
 
-    #def __init__(self, server, username, password, debug = False):
-    def __init__(self, server, username, crypted_password, debug = False):
-        """Sets up the Neplan SOAP WS and retuns the service object
-        use service.history to get last sent and received raw SOAP messages"""
+WSDL_CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.environ.get("NEPLAN_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "neplanSOAP"))
+DEFAULT_DAEMON_SOCKET = os.path.join(DEFAULT_CACHE_DIR, "daemon.sock")
 
-        self.username = username
-        self.server = server
-        self.debug  = debug
+class WsdlCache():
+    """Local cache of the NeplanService WSDL, one entry per server url.
 
+    The downloaded WSDL is stored together with a small json file holding the HTTP validators (ETag, Last-Modified, Content-Length).
+    Entries younger than max_age (seconds) are used without any network access, older entries are checked with a HEAD request
+    and only downloaded again if the server copy has changed. Only the download is cached on disk: a zeep document holds
+    thread locals and lxml objects and cannot be pickled, so every new process parses the cached file once. Parsed documents
+    are kept in memory, so every further client in the same process skips the parsing as well. They are parsed with a
+    transport owned by the cache, never with the one of a client, so sync and async clients can share them; zeep sends the
+    calls through the transport of the client."""
 
-        # Suppress certificate validation
-        session = Session()
-        session.verify = False # to enable http and non certified https connections
+    _documents = {} # (wsdl url, sha1 of wsdl) -> zeep.wsdl.Document, shared by all caches of the process
+    _transport = None # transport of the shared documents, only used to resolve imports of the local file
+    _lock = threading.Lock()
 
-        # Setup of transport
-        transport = Transport(session=session)#, timeout=10, operation_timeout=360)
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_age=24 * 3600, debug=False):
 
-        # Add plugin for message exchange history
-        self.history = HistoryPlugin() # Call this element to see last sent/recieved messages
+        self.cache_dir = cache_dir
+        self.max_age   = max_age
+        self.debug     = debug
 
-        # Set up service
-        wsdl = "{}/Services/External/NeplanService.svc?singleWsdl".format(server)
-        wsse = UsernameToken(username, password=crypted_password)
 
-        client = Client(wsdl, transport=transport, wsse=wsse, plugins=[self.history])
-        self.client = client
-        self.wsdl = client.wsdl
-        client.debug = debug # Only on Kristjan machine this has effect (prints out all sent and recived messages, direct modification to zeep libary)
+    def _paths(self, wsdl_url):
 
-        service = client.create_service('{http://www.neplan.ch/Web/External}BasicHttpBinding_NeplanService', '{}/Services/External/NeplanService.svc/basic'.format(server))
-        get_type = client.get_type
-        self.service = service
-        self.get_type = get_type
-        if debug:
-            print("INFO - Service created to {}".format(server))
+        """Returns the paths of the WSDL and metadata file for the given url, key includes cache and zeep version"""
 
+        key = sha1("{}|{}|{}".format(WSDL_CACHE_VERSION, zeep.__version__, wsdl_url).encode()).hexdigest()
 
-    def print_last_messageexchange(self):
+        return os.path.join(self.cache_dir, key + ".wsdl"), os.path.join(self.cache_dir, key + ".json")
 
-        """Prints out last sent and recieved SOAP messages"""
 
-        messages = {"SENT":     self.history.last_sent,
-                    "RECIEVED": self.history.last_received}
+    def _read_metadata(self, metadata_path):
 
-        for message in messages:
+        try:
+            with open(metadata_path, "r") as file_object:
+                metadata = json.load(file_object)
+        except (OSError, ValueError):
+            return None
 
-            print("---{}---".format(message))
-            print("### http header ###")
-            print('\n' * 1)
-            print(messages[message]["http_headers"])
-            print('\n' * 1)
-            print("### {} http envelope START ###".format(message))
-            print('\n' * 1)
-            print(etree.tostring(messages[message]["envelope"], pretty_print = True).decode())
-            print("### {} http envelope END ###".format(message))
-            print('\n' * 1)
+        if metadata.get("version") != WSDL_CACHE_VERSION or metadata.get("zeep_version") != zeep.__version__:
+            return None
 
+        return metadata
 
-    def print_duration(self, text, start_time):
 
-        """Print duration between now and start time
-        Input: text, start_time
-        Output: duration (in seconds), end_time"""
+    def _write(self, path, content, mode="wb"):
 
-        end_time = datetime.now()
-        duration = (end_time - start_time).total_seconds()
-        print(text, duration)
+        """Writes the file atomically, so parallel processes never read half written files"""
 
-        return duration, end_time
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temporary_path = "{}.{}.tmp".format(path, uuid4().hex)
 
+        with open(temporary_path, mode) as file_object:
+            file_object.write(content)
 
-    def update_url_to_current_server(self, localhost_url):
+        os.replace(temporary_path, path)
 
-        """Updates localhost url to server url"""
 
-        parsed_url      = urlparse(localhost_url)
-        new_netloc      = urlparse(self.server).netloc
-        parse_update    = parsed_url._replace(netloc=new_netloc)
-        updated_url     = urlunparse(parse_update)
+    def _validators(self, response):
 
-        return updated_url
+        return {name: response.headers.get(name) for name in ("ETag", "Last-Modified", "Content-Length")}
 
 
-    # HELPER FUNCTIONS - END
+    def _is_unchanged(self, wsdl_url, session, metadata):
 
+        """Cheap freshness check, compares the HTTP validators of a HEAD request with the cached ones"""
 
-    def WriteMessageToLogFile(self, project, message_text, log_level_text = "Info"):
-        """Writes a message to the user log file, by default the log level is Info
-        WriteMessageToLogFile(project: ns2:ExternalProject, text: xsd:string, logLvl: xsd:string)"""
+        try:
+            response = session.head(wsdl_url, allow_redirects=True, timeout=30)
+        except requests.exceptions.RequestException as error:
+            print("WARNING - Could not check WSDL freshness, using cached copy: {}".format(error))
+            return True
 
-        self.service.WriteMessageToLogFile(project, message_text, log_level_text)
+        if not response.ok:
+            return False
 
-    # VARIABLES start
-    class networkTypeGroup(Enum):
-        Network             = 0
-        Feeder              = 1
-        Zone                = 2
-        Area                = 3
-        Subarea             = 4
-        TieFlowBetweenZones = 5
-        TieFlowBetweenAreas = 6
-        VoltageLevel        = 7
+        validators = self._validators(response)
 
-    class phase(Enum):
-        L1L2L3N     = 0
-        L1N         = 1
-        L2N         = 2
-        L3N         = 3
-        L1L2N       = 4
-        L1L3N       = 5
-        L2L3N       = 6
-        L1L2L3N_AS  = 7
+        return any(validators.values()) and validators == metadata["validators"]
+
+
+    def get(self, wsdl_url, session):
+
+        """Returns local path and metadata of an up to date copy of the WSDL, downloads it only when needed
+        Input: wsdl_url, session (requests.Session used for download)
+        Output: wsdl_path, metadata"""
+
+        wsdl_path, metadata_path = self._paths(wsdl_url)
+        metadata = self._read_metadata(metadata_path)
+
+        if metadata and os.path.exists(wsdl_path):
+
+            if time.time() - metadata["fetched"] < self.max_age:
+                if self.debug:
+                    print("INFO - Using cached WSDL {}".format(wsdl_path))
+                return wsdl_path, metadata
+
+            if self._is_unchanged(wsdl_url, session, metadata):
+                if self.debug:
+                    print("INFO - Cached WSDL still valid {}".format(wsdl_path))
+                metadata["fetched"] = time.time()
+                self._write(metadata_path, json.dumps(metadata), mode="w")
+                return wsdl_path, metadata
+
+        if self.debug:
+            print("INFO - Downloading WSDL {}".format(wsdl_url))
+
+        response = session.get(wsdl_url, timeout=300)
+        response.raise_for_status()
+
+        metadata = {"version":      WSDL_CACHE_VERSION,
+                    "zeep_version": zeep.__version__,
+                    "url":          wsdl_url,
+                    "fetched":      time.time(),
+                    "sha1":         sha1(response.content).hexdigest(),
+                    "validators":   self._validators(response)}
+
+        self._write(wsdl_path, response.content)
+        self._write(metadata_path, json.dumps(metadata), mode="w")
+
+        return wsdl_path, metadata
+
+
+    def document(self, wsdl_url, session):
+
+        """Returns the parsed zeep WSDL document for the url, parsing only once per process and WSDL version"""
+
+        wsdl_path, metadata = self.get(wsdl_url, session)
+        key = (wsdl_url, metadata["sha1"])
+
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None and WsdlCache._transport is None:
+                WsdlCache._transport = zeep.Transport()
+
+        if document is None:
+            document = zeep.wsdl.Document(wsdl_path, WsdlCache._transport)
+            with self._lock:
+                self._documents[key] = document
+
+        return document
+
+
+    def invalidate(self, wsdl_url=None):
+
+        """Removes the cached WSDL of the given url, or all cached WSDLs if no url is given"""
+
+        if wsdl_url:
+            paths = self._paths(wsdl_url)
+        elif os.path.isdir(self.cache_dir):
+            paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith((".wsdl", ".json"))]
+        else:
+            paths = []
+
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+        with self._lock:
+            for key in list(self._documents):
+                if wsdl_url is None or key[0] == wsdl_url:
+                    del self._documents[key]
+
+        if self.debug:
+            print("INFO - WSDL cache invalidated for {}".format(wsdl_url or "all servers"))
+
+
+# --- TRANSPORT ---
+
+# Operations grouped by expected duration, every other operation is a lookup
+OPERATION_CLASSES = {"AnalyseVariant":          "analysis",
+                     "CIMExport":               "export",
+                     "CIMImport":               "export",
+                     "ImportFromListFile":      "export",
+                     "ZipUpload":               "export",
+                     "XMLUpload":               "export",
+                     "GetAnalysisResultFile":   "export",
+                     "GetAnaylsisLogFile":      "export",
+                     "GetAllElementResults":    "export"}
+
+# Timeouts in seconds per operation class or operation name, None means no timeout
+DEFAULT_OPERATION_TIMEOUTS = {"lookup":   60,
+                              "export":   1800,
+                              "analysis": 3600}
+
+
+def get_operation_class(operation_name):
+    """Returns the operation class of a SOAP operation: analysis, export or lookup"""
+
+    return OPERATION_CLASSES.get(operation_name, "lookup")
+
+
+class ConnectionStats():
+    """Counts sent HTTP requests and opened connections over all connection pools of one session"""
+
+    def __init__(self):
+
+        self.new_connections     = 0
+        self._pools              = []
+        self._connection_classes = {}
+        self._lock               = threading.Lock()
+
+
+    def add_pool(self, pool):
+
+        """Registers the pool and lets it count every opened connection"""
+
+        with self._lock:
+            self._pools.append(pool)
+            connection_class = self._connection_classes.get(pool.ConnectionCls)
+
+            if connection_class is None:
+                connection_class = self._counting_connection_class(pool.ConnectionCls)
+                self._connection_classes[pool.ConnectionCls] = connection_class
+
+        pool.ConnectionCls = connection_class
+
+
+    def _counting_connection_class(self, connection_cls):
+
+        stats = self
+
+        class CountingConnection(connection_cls):
+
+            def connect(self):
+                with stats._lock:
+                    stats.new_connections += 1
+                return super().connect()
+
+        return CountingConnection
+
+
+    def as_dict(self):
+
+        """Returns requests, new_connections and reused_connections"""
+
+        with self._lock:
+            requests        = sum(pool.num_requests for pool in self._pools)
+            new_connections = self.new_connections
+
+        return {"requests":           requests,
+                "new_connections":    new_connections,
+                "reused_connections": max(requests - new_connections, 0)}
+
+
+# --- RESULT FILE PARSER ---
+
+# Element types grouped into the tables returned by parse_result_file, all other element types get a table of their own
+RESULT_TABLE_GROUPS = {"node":   ("Node", "Busbar", "DCNode"),
+                       "branch": ("Line", "LineAsym", "LineSection", "DCLine", "Trafo2Winding", "Trafo3Winding", "Trafo4Winding",
+                                  "SerieRLC", "SerieTransformator", "Reactor", "TCSC", "UPFC", "EquivalentSerieLF"),
+                       "losses": ("Loss", "Losses", "NetworkLosses", "AreaLosses", "ZoneLosses")}
+
+
+class ResultTable():
+    """Column store for the records of one result table, numeric columns are kept as float64 arrays"""
+
+    def __init__(self):
+
+        self.columns = {}
+        self.rows    = 0
+        self.texts   = {} # column name -> {row: original text} of the numbers _number_text does not restore, e.g. "007" or "1.50"
+
+
+    def append(self, record):
+
+        """Appends one record (dict of column name -> string value), missing values are NaN or None"""
+
+        for name, value in record.items():
+
+            column = self.columns.get(name)
+
+            if column is None:
+                column = self.columns[name] = array("d")
+
+            if len(column) < self.rows:
+                self._pad(column)
+
+            if type(column) is array:
+                try:
+                    number = float(value) if value else float("nan")
+                except ValueError:
+                    column = self._to_strings(name)
+                else:
+                    column.append(number)
+                    if value and self._number_text(number) != value:
+                        self.texts.setdefault(name, {})[self.rows] = value
+                    continue
+
+            column.append(sys.intern(value))
+
+        self.rows += 1
+
+
+    def _pad(self, column):
+
+        """Fills the rows without value of the column with NaN or None"""
+
+        if len(column) < self.rows:
+            missing = float("nan") if isinstance(column, array) else None
+            column.extend([missing] * (self.rows - len(column)))
+
+
+    @staticmethod
+    def _number_text(value):
+
+        return None if value != value else str(int(value)) if value.is_integer() else repr(value)
+
+
+    def _to_strings(self, name):
+
+        """Converts a numeric column to a string column, used when the first non numeric value is found. Values keep
+        their original text"""
+
+        texts  = self.texts.pop(name, {})
+        column = [texts.get(row) or self._number_text(value) for row, value in enumerate(self.columns[name])]
+        self.columns[name] = column
+
+        return column
+
+
+    def to_dataframe(self):
+
+        """Returns the table as DataFrame, float64 columns for numeric values and object columns for strings"""
+
+        data = {}
+
+        for name, column in self.columns.items():
+
+            self._pad(column)
+
+            if isinstance(column, array):
+                data[name] = numpy.frombuffer(column, dtype=numpy.float64) if len(column) else numpy.empty(0, dtype=numpy.float64)
+            else:
+                data[name] = column
+
+        return pandas.DataFrame(data)
+
+
+def parse_result_file(source, tables=None, table_groups=RESULT_TABLE_GROUPS):
+    """Streaming parser of the XML analysis result file, returns a dict of table name -> DataFrame.
+
+    source: bytes as returned by GetAnalysisResultFile, path of a result file or binary file object
+    tables: names of the tables to keep, by default all
+    table_groups: element types per table name, see RESULT_TABLE_GROUPS
+
+    Every element with attributes and no child elements, or with only text child elements, is a record. Its attributes and
+    child texts are the columns, the table is selected by its Type/ElementType attribute or its tag. Records are freed as soon as
+    they are read, so the memory use is close to the size of the resulting tables and independent of the XML size."""
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    table_names = {element_type: table_name for table_name, element_types in table_groups.items() for element_type in element_types}
+    result_tables = {}
+    containers = set() # Elements that contained records, not records themselves
+
+    for event, element in etree.iterparse(source, events=("end",), remove_comments=True, huge_tree=True):
+
+        parent = element.getparent()
+
+        if element in containers:
+            containers.discard(element)
+            if parent is not None:
+                containers.add(parent)
+                parent.remove(element)
+            continue
+
+        # Text only elements are columns of their parent record
+        if not len(element) and not element.attrib:
+            continue
+
+        record = dict(element.attrib)
+
+        if len(element):
+            if any(len(child) or child.attrib for child in element):
+                continue
+
+            for child in element:
+                record[child.tag.rpartition("}")[2]] = (child.text or "").strip()
+
+        element_type = record.get("Type") or record.get("ElementType") or element.tag.rpartition("}")[2]
+        table_name = table_names.get(element_type, element_type)
+
+        if tables is None or table_name in tables:
+            table = result_tables.get(table_name)
+            if table is None:
+                table = result_tables[table_name] = ResultTable()
+            table.append(record)
+
+        # Free the record
+        element.clear()
+        if parent is not None:
+            containers.add(parent)
+            parent.remove(element)
+
+    return {table_name: table.to_dataframe() for table_name, table in result_tables.items()}
+
+
+# --- ELEMENT CATALOG ---
+
+def key_value_items(response):
+    """Returns the Key/Value items of an ArrayOfKeyValueOfstringstring, zeep returns it as list or as object holding the list"""
+
+    if response is None:
+        return []
+
+    if isinstance(response, list):
+        return response
+
+    return getattr(response, "KeyValueOfstringstring", None) or []
+
+
+class ElementCatalog():
+    """Elements of one project variant with O(1) lookups by ID, name and type
+
+    Element types are stored as integer codes into type_names, the DataFrame view is only built on first use.
+
+        catalog = api.GetElementCatalog(project)
+        catalog.name(element_id), catalog.type(element_id), catalog.ids_by_name("Line 1"), catalog.ids_by_type("Line")
+    """
+
+    def __init__(self):
+
+        self.ids        = []
+        self.names      = []
+        self.type_codes = array("i")  # -1 for elements without type
+        self.type_names = []
+
+        self._position_by_id    = {}
+        self._positions_by_name = {}
+        self._positions_by_type = {}
+        self._type_code_by_name = {}
+        self._dataframe         = None
+
+
+    @classmethod
+    def from_response(cls, Name_Type_dict):
+
+        """Builds the catalog from the GetAllElementsOfProject response of zeep or of raw_call"""
+
+        if isinstance(Name_Type_dict, dict):
+            return cls.from_pairs(Name_Type_dict["elementNames"], Name_Type_dict["elementTypes"])
+
+        return cls.from_pairs(((item.Key, item.Value) for item in key_value_items(Name_Type_dict.elementNames)),
+                              ((item.Key, item.Value) for item in key_value_items(Name_Type_dict.elementTypes)))
+
+
+    @classmethod
+    def from_pairs(cls, element_names, element_types):
+
+        """Builds the catalog from (ID, name) and (ID, type) pairs, one pass over names and one over types"""
+
+        catalog = cls()
+        type_code_by_name = catalog._type_code_by_name
+
+        for element_id, name in element_names:
+            catalog._add(element_id, name)
+
+        for element_id, type_name in element_types:
+
+            position = catalog._position_by_id.get(element_id)
+            if position is None:
+                position = catalog._add(element_id, None)
+
+            type_code = type_code_by_name.get(type_name)
+            if type_code is None:
+                type_code = type_code_by_name[type_name] = len(catalog.type_names)
+                catalog.type_names.append(type_name)
+                catalog._positions_by_type[type_code] = []
+
+            catalog.type_codes[position] = type_code
+            catalog._positions_by_type[type_code].append(position)
+
+        return catalog
+
+
+    def _add(self, element_id, name):
+
+        position = self._position_by_id.get(element_id)
+
+        if position is None:
+            position = len(self.ids)
+            self._position_by_id[element_id] = position
+            self.ids.append(element_id)
+            self.names.append(name)
+            self.type_codes.append(-1)
+        else:
+            self.names[position] = name
+
+        if name is not None:
+            self._positions_by_name.setdefault(name, []).append(position)
+
+        return position
+
+
+    def __len__(self):
+        return len(self.ids)
+
+
+    def __contains__(self, element_id):
+        return element_id in self._position_by_id
+
+
+    def name(self, element_id):
+
+        """Returns the name of the element, None if the ID is unknown"""
+
+        position = self._position_by_id.get(element_id)
+
+        return None if position is None else self.names[position]
+
+
+    def type(self, element_id):
+
+        """Returns the element type of the element, None if the ID is unknown or has no type"""
+
+        position = self._position_by_id.get(element_id)
+
+        if position is None or self.type_codes[position] < 0:
+            return None
+
+        return self.type_names[self.type_codes[position]]
+
+
+    def ids_by_name(self, name):
+
+        """Returns the IDs of all elements with the given name, names are not unique in Neplan"""
+
+        return [self.ids[position] for position in self._positions_by_name.get(name, [])]
+
+
+    def id_by_name(self, name, element_type=None):
+
+        """Returns the ID of the first element with the given name (and element type), None if not found"""
+
+        for position in self._positions_by_name.get(name, []):
+            if element_type is None or self.type(self.ids[position]) == element_type:
+                return self.ids[position]
+
+        return None
+
+
+    def ids_by_type(self, element_type):
+
+        """Returns the IDs of all elements of the element type"""
+
+        type_code = self._type_code_by_name.get(element_type)
+
+        if type_code is None:
+            return []
+
+        return [self.ids[position] for position in self._positions_by_type[type_code]]
+
+
+    def type_counts(self):
+
+        """Returns number of elements per element type"""
+
+        return {type_name: len(self._positions_by_type[type_code]) for type_code, type_name in enumerate(self.type_names)}
+
+
+    def fingerprint(self):
+
+        """Returns a sha1 hex digest of all (ID, name, type), changes when elements are added, removed, renamed or retyped"""
+
+        digest = sha1()
+
+        for element_id in sorted(self._position_by_id):
+            digest.update("{}\x1f{}\x1f{}\x1e".format(element_id, self.name(element_id), self.type(element_id)).encode())
+
+        return digest.hexdigest()
+
+
+    @property
+    def dataframe(self):
+
+        """DataFrame view with columns [ID, NAME, TYPE], TYPE is categorical, built on first use"""
+
+        if self._dataframe is None:
+            self._dataframe = pandas.DataFrame({"ID":   self.ids,
+                                                "NAME": self.names,
+                                                "TYPE": pandas.Categorical.from_codes(numpy.frombuffer(self.type_codes, dtype=numpy.int32), categories=self.type_names)})
+
+        return self._dataframe
+
+
+# --- ELEMENT TABLES ---
+
+def string_items(response):
+    """Returns the strings of an ArrayOfstring, zeep returns it as list or as object holding the list"""
+
+    if response is None:
+        return []
+
+    if isinstance(response, list):
+        return response
+
+    return getattr(response, "string", None) or []
+
+
+def element_type_name(element_type):
+    """Returns the name of an element type given as member of the NeplanService.elementType enums or as string,
+    raises ValueError for unknown element types"""
+
+    if isinstance(element_type, Enum):
+        return element_type.value
+
+    for analysis in (NeplanService.elementType.PowerSystemAnalysis, NeplanService.elementType.GasAnalysis,
+                     NeplanService.elementType.WaterAnalysis, NeplanService.elementType.DistrictHeatingAnalysis):
+        if element_type in analysis.__members__:
+            return element_type
+
+    raise ValueError("Unknown element type {}".format(element_type))
+
+
+class ElementResultReader():
+    """Reads the GetAllElementResults response while it is received into columns per element type, without building
+    zeep objects. Every ElementResult is dropped from the tree after it is read.
+
+    The values are collected as text per element type and set of result keys and converted to float64 in one numpy
+    call per group when the columns are built. feed() takes chunks of the HTTP response, close() returns the columns,
+    see columns(). IDs, element types and result keys are interned.
+    element_types: keep only elements of these types, all if None"""
+
+    def __init__(self, element_types=None):
+
+        self.element_types = set(element_types) if element_types else None
+        self.fault         = None
+        self._types        = {} # element type -> (ids, names, {result keys: (positions, values)})
+        self._parser       = etree.XMLPullParser(events=("end",), tag=("{*}ElementResult", "{*}Fault"), huge_tree=True)
+
+
+    def feed(self, data):
+
+        self._parser.feed(data)
+        self._read()
+
+
+    def _read(self):
+
+        for _, element in self._parser.read_events():
+
+            if element.tag.rpartition("}")[2] == "Fault":
+                self.fault = {child.tag.rpartition("}")[2]: child.text for child in element}
+                continue
+
+            element_id = element_name = element_type = None
+            texts = ()
+
+            for child in element:
+                name = child.tag.rpartition("}")[2]
+
+                if name == "ElementID":
+                    element_id = child.text
+                elif name == "ElementName":
+                    element_name = child.text
+                elif name == "ElementType":
+                    element_type = child.text
+                elif name == "Results":
+                    # Results, then Key and Value of every KeyValueOfstringdouble: [None, None, key, value, None, key, value, ...]
+                    texts = [item.text for item in child.iter()]
+
+            self.add(element_id, element_name, element_type, texts[2::3], texts[3::3])
+
+            # Keep memory flat, drop the element and the already read siblings
+            element.clear(keep_tail=False)
+            parent = element.getparent()
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+    def add(self, element_id, element_name, element_type, keys, values):
+
+        """Adds one element with its result keys and values (numbers or their text)"""
+
+        if self.element_types is not None and element_type not in self.element_types:
+            return
+
+        table = self._types.get(element_type)
+        if table is None:
+            table = self._types[sys.intern(element_type or "")] = ([], [], {})
+
+        ids, names, groups = table
+        keys = tuple(keys)
+
+        group = groups.get(keys)
+        if group is None:
+            group = groups[tuple(sys.intern(key) for key in keys)] = ([], [])
+
+        group[0].append(len(ids))
+        group[1].extend(values if None not in values else ["nan" if value is None else value for value in values])
+        ids.append(sys.intern(element_id or ""))
+        names.append(element_name)
+
+
+    def from_reply(self, results):
+
+        """Adds the elements of a GetAllElementResults result already deserialized by zeep, returns the columns as close()"""
+
+        for result in results or []:
+            items = (getattr(result.Results, "KeyValueOfstringdouble", None) if result.Results is not None else None) or []
+            self.add(result.ElementID, result.ElementName, result.ElementType, [item.Key for item in items], [item.Value for item in items])
+
+        return self.columns()
+
+
+    def columns(self):
+
+        """Returns the elements read so far, {element type: (ids, names, {result key: float64 array})}, results missing
+        for an element are NaN"""
+
+        columns_by_type = {}
+
+        for element_type, (ids, names, groups) in self._types.items():
+            columns = {}
+
+            for keys, (positions, values) in groups.items():
+                if not keys:
+                    continue
+
+                matrix    = numpy.array(values, dtype=numpy.float64).reshape(len(positions), len(keys))
+                positions = numpy.array(positions, dtype=numpy.int64)
+
+                for index, key in enumerate(keys):
+                    column = columns.get(key)
+                    if column is None:
+                        column = columns[key] = numpy.full(len(ids), numpy.nan)
+                    column[positions] = matrix[:, index]
+
+            columns_by_type[element_type] = (ids, names, columns)
+
+        return columns_by_type
+
+
+    def close(self):
+
+        self._parser.close()
+        self._read()
+
+        if self.fault is not None:
+            raise zeep.exceptions.Fault(message=self.fault.get("faultstring") or "Unknown fault occured", code=self.fault.get("faultcode"))
+
+        return self.columns()
+
+
+class ElementTable():
+    """Elements of one element type with their results as columns, IDs and names are object arrays of (interned)
+    strings, every result key is a float64 array with NaN where an element has no value
+
+        table = tables["Line"]
+        table["Loading"].max(), table.row("E00000001"), table.dataframe"""
+
+    def __init__(self, element_type, ids, names, columns=None):
+
+        self.element_type    = element_type
+        self.ids             = numpy.array(ids, dtype=object)
+        self.names           = numpy.array(names, dtype=object)
+        self.columns         = columns or {}
+        self._position_by_id = None
+        self._dataframe      = None
+
+
+    @classmethod
+    def from_results(cls, element_type, ids, names, results=None):
+
+        """Builds the table from the element IDs and names of GetAllElementsOfElementType and the columns of
+        ElementResultReader, results of elements not listed are appended at the end"""
+
+        ids = [sys.intern(element_id) for element_id in ids]
+
+        if not results:
+            return cls(element_type, ids, names)
+
+        result_ids, result_names, result_columns = results
+
+        if ids == result_ids:
+            return cls(element_type, ids, names, result_columns)
+
+        result_position = {element_id: position for position, element_id in enumerate(result_ids)}
+        listed = set(ids)
+        extra  = [position for position, element_id in enumerate(result_ids) if element_id not in listed]
+
+        order = numpy.fromiter((result_position.get(element_id, -1) for element_id in ids), dtype=numpy.int64, count=len(ids))
+        order = numpy.concatenate([order, numpy.array(extra, dtype=numpy.int64)])
+        found = order >= 0
+
+        columns = {}
+        for key, values in result_columns.items():
+            columns[key] = numpy.where(found, values[numpy.where(found, order, 0)], numpy.nan) if len(values) else numpy.full(len(order), numpy.nan)
+
+        return cls(element_type, ids + [result_ids[position] for position in extra], list(names) + [result_names[position] for position in extra], columns)
+
+
+    def __len__(self):
+        return len(self.ids)
+
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+
+    def __contains__(self, key):
+        return key in self.columns
+
+
+    def position(self, element_id):
+
+        """Returns the row of the element, None if the ID is not in the table"""
+
+        if self._position_by_id is None:
+            self._position_by_id = {element_id: position for position, element_id in enumerate(self.ids)}
+
+        return self._position_by_id.get(element_id)
+
+
+    def row(self, element_id):
+
+        """Returns ID, name and results of the element as dict, None if the ID is not in the table"""
+
+        position = self.position(element_id)
+
+        if position is None:
+            return None
+
+        return dict({"ID": self.ids[position], "NAME": self.names[position]}, **{key: float(values[position]) for key, values in self.columns.items()})
+
+
+    @property
+    def nbytes(self):
+
+        """Bytes of the result columns"""
+
+        return sum(values.nbytes for values in self.columns.values())
+
+
+    @property
+    def dataframe(self):
+
+        """DataFrame view with columns [ID, NAME] and one column per result key, built on first use"""
+
+        if self._dataframe is None:
+            self._dataframe = pandas.DataFrame(dict({"ID": self.ids, "NAME": self.names}, **self.columns), copy=False)
+
+        return self._dataframe
+
+
+class ElementTables(dict):
+    """ElementTable per element type, as returned by NeplanService.GetElementTables"""
+
+    def column(self, key):
+
+        """Returns IDs and values of the result key over all element types having it"""
+
+        tables = [table for table in self.values() if key in table]
+
+        if not tables:
+            return numpy.array([], dtype=object), numpy.array([], dtype=numpy.float64)
+
+        return numpy.concatenate([table.ids for table in tables]), numpy.concatenate([table[key] for table in tables])
+
+
+    def aggregate(self, key, function=None):
+
+        """Returns function (by default numpy.nansum) of the result key per element type"""
+
+        function = function or numpy.nansum
+
+        return {element_type: float(function(table[key])) for element_type, table in self.items() if key in table and len(table)}
+
+
+    def dataframe(self):
+
+        """Returns one DataFrame of all element types with columns [ID, NAME, TYPE] and the result keys"""
+
+        frames = [table.dataframe.assign(TYPE=element_type) for element_type, table in self.items()]
+
+        if not frames:
+            return pandas.DataFrame(columns=["ID", "NAME", "TYPE"])
+
+        dataframe = pandas.concat(frames, ignore_index=True)
+        dataframe["TYPE"] = dataframe["TYPE"].astype("category")
+
+        return dataframe
+
+
+# --- LOOKUP CACHE ---
+
+class LookupCache():
+    """Thread safe LRU cache with time to live for results of lookup calls (projects, zone and subarea names and IDs)
+
+    At most maxsize entries are kept, the least recently used is removed first. Entries older than ttl seconds are
+    treated as missing, ttl None keeps them until evicted. stats() returns hits, misses, evictions and expirations."""
+
+    def __init__(self, maxsize=10000, ttl=600):
+
+        self.maxsize  = maxsize
+        self.ttl      = ttl
+        self._entries = OrderedDict() # key -> (expiry time, value)
+        self._lock    = threading.Lock()
+        self._stats   = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+
+    def get(self, key):
+
+        """Returns (True, value) for a valid entry, otherwise (False, None)"""
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+
+            if entry[0] is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+
+            return True, entry[1]
+
+
+    def set(self, key, value):
+
+        with self._lock:
+            self._entries[key] = (None if self.ttl is None else time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+
+    def delete(self, key):
+
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+
+
+    def stats(self):
+
+        """Returns hits, misses, evictions, expirations, hit_rate and size"""
+
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries))
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+
+        return stats
+
+
+def project_key(project):
+    """Returns the cache key of a project variant"""
+
+    return (project.ProjectID, project.VariantID)
+
+
+# --- RESULT CACHE ---
+
+# Increase when the layout of the result cache changes, older entries are then ignored
+RESULT_CACHE_VERSION = 1
+
+
+class AnalysisInfo(dict):
+    """AnalysisReturnInfo of a cached AnalyseVariant run, a dict with attribute access like the zeep object
+    (analysis_response.ResultFilename), the file names refer to the original run on the server"""
+
+    def __getattr__(self, name):
+
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class ResultCache():
+    """Persistent cache of AnalyseVariant outcomes (AnalysisReturnInfo, result file and log file) on local disk
+
+    Entries are keyed by a hash of server, project variant, analysis module, calcNameID, analysisMethode, conditions,
+    analysisLoadOptionXML and a change marker of the project given by the caller, e.g. a model version. Neplan offers no
+    modification time of a project, so changed loads, generation, switching or tap positions are only noticed through
+    the marker.
+    Every entry is a directory <key[:2]>/<key> with info.json, result.xml and log.txt, written to a temporary
+    directory first and renamed, so parallel threads and processes never read half written entries.
+    Above max_bytes the least recently used entries are removed.
+
+        api = NeplanService(server, username, crypted_password, result_cache=True)
+        results_xml, analysis_response, project, process_log = api.run_loadflow("Project", "State", change_marker="v12")  # runs the analysis
+        results_xml, analysis_response, project, process_log = api.run_loadflow("Project", "State", change_marker="v12")  # from the cache
+    """
+
+    def __init__(self, cache_dir=os.path.join(DEFAULT_CACHE_DIR, "results"), max_bytes=2 * 1024 ** 3, debug=False):
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.debug     = debug
+
+
+    def key(self, server, project, analysis_module="LoadFlow", calc_name_id="", analysis_methode="", conditions="",
+            analysis_load_option_xml="", change_marker=""):
+
+        """Returns the hex key of an analysis run, project is the ExternalProject of the run"""
+
+        inputs = [RESULT_CACHE_VERSION, server, project.ProjectID, project.VariantID, analysis_module, calc_name_id or "",
+                  analysis_methode or "", conditions or "", analysis_load_option_xml or "", change_marker or ""]
+
+        return sha1(json.dumps(inputs).encode()).hexdigest()
+
+
+    def _path(self, key):
+
+        return os.path.join(self.cache_dir, key[:2], key)
+
+
+    def get(self, key):
+
+        """Returns (analysis_info, results_xml, process_log) of the entry, None on a miss
+        process_log is None if the log was not stored, reading an entry marks it as recently used"""
+
+        path = self._path(key)
+
+        try:
+            with open(os.path.join(path, "info.json"), "r") as file_object:
+                info = json.load(file_object)
+
+            with open(os.path.join(path, "result.xml"), "rb") as file_object:
+                results_xml = file_object.read()
+
+            process_log = None
+            if info["has_log"]:
+                with open(os.path.join(path, "log.txt"), "rb") as file_object:
+                    process_log = file_object.read()
+
+            os.utime(path)
+
+        except (OSError, ValueError, KeyError):
+            return None
+
+        if self.debug:
+            print("INFO - Result cache hit {}".format(key))
+
+        return AnalysisInfo(info["analysis_response"]), results_xml, process_log
+
+
+    def put(self, key, analysis_response, results_xml, process_log=None):
+
+        """Stores the outcome of an analysis run and evicts old entries above max_bytes
+        analysis_response: AnalysisReturnInfo of the run, results_xml and process_log as bytes"""
+
+        path = self._path(key)
+        temporary_path = "{}.{}.tmp".format(path, uuid4().hex)
+        os.makedirs(temporary_path)
+
+        info = {"version":           RESULT_CACHE_VERSION,
+                "stored":            time.time(),
+                "has_log":           process_log is not None,
+                "analysis_response": dict(zeep.helpers.serialize_object(analysis_response, dict))}
+
+        with open(os.path.join(temporary_path, "info.json"), "w") as file_object:
+            json.dump(info, file_object, default=str)
+
+        with open(os.path.join(temporary_path, "result.xml"), "wb") as file_object:
+            file_object.write(results_xml)
+
+        if process_log is not None:
+            with open(os.path.join(temporary_path, "log.txt"), "wb") as file_object:
+                file_object.write(process_log)
+
+        # Replace an older entry of the same key, e.g. after a forced refresh
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+        try:
+            os.rename(temporary_path, path)
+        except OSError:
+            # Stored by a parallel run in the meantime
+            shutil.rmtree(temporary_path, ignore_errors=True)
+
+        self.evict()
+
+
+    def entries(self):
+
+        """Returns (last use, size in bytes, path) of all entries"""
+
+        entries = []
+
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for prefix in os.scandir(self.cache_dir):
+
+            if not prefix.is_dir():
+                continue
+
+            for entry in os.scandir(prefix.path):
+
+                if entry.name.endswith(".tmp"):
+                    continue
+
+                try:
+                    size = sum(file_entry.stat().st_size for file_entry in os.scandir(entry.path))
+                    entries.append((entry.stat().st_mtime, size, entry.path))
+                except OSError:
+                    continue
+
+        return entries
+
+
+    def evict(self):
+
+        """Removes the least recently used entries until the cache holds at most max_bytes, returns number of removed entries"""
+
+        entries = self.entries()
+        total_size = sum(size for _, size, _ in entries)
+        removed = 0
+
+        for _, size, path in sorted(entries):
+
+            if total_size <= self.max_bytes:
+                break
+
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+            removed += 1
+
+        if removed and self.debug:
+            print("INFO - Result cache evicted {} entries, {:.1f} MB left".format(removed, total_size / 1024 ** 2))
+
+        return removed
+
+
+    def stats(self):
+
+        """Returns number of entries and size in bytes"""
+
+        entries = self.entries()
+
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries), "max_bytes": self.max_bytes}
+
+
+    def invalidate(self, key=None):
+
+        """Removes the entry of the key, or all entries if no key is given"""
+
+        if key:
+            shutil.rmtree(self._path(key), ignore_errors=True)
+        elif os.path.isdir(self.cache_dir):
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+        if self.debug:
+            print("INFO - Result cache invalidated {}".format(key or "completely"))
+
+
+def result_cache_from_args(args):
+    """Returns the ResultCache of the --resultCache and --cacheSizeMB command line options, False if not enabled.
+    Exits if --resultCache is given without --changeMarker, in the modes that have it"""
+
+    if not args.resultCache:
+        return False
+
+    if hasattr(args, "changeMarker") and not args.changeMarker:
+        print("ERROR - --resultCache needs --changeMarker, a marker of the project state like the model version")
+        sys.exit(1)
+
+    cache_dir = args.resultCache if isinstance(args.resultCache, str) else os.path.join(DEFAULT_CACHE_DIR, "results")
+
+    return ResultCache(cache_dir, max_bytes=args.cacheSizeMB * 1024 ** 2, debug=True)
+
+
+# --- UPLOAD REGISTRY ---
+
+# Increase when the layout of the upload registry changes, older files are then ignored
+UPLOAD_REGISTRY_VERSION = 1
+
+
+class UploadRegistry():
+    """Persistent registry of uploaded files (ZipUpload, XMLUpload), the upload name returned by the server is kept per
+    server, operation and sha1 of the file content, so the same boundary set or list file is sent only once
+
+    Entries older than max_age seconds are treated as missing, the server may have removed its copy by then, None keeps
+    them until invalidated. The registry is a json file written to a temporary file first and renamed, parallel
+    threads and processes share it, with path None it is kept in memory only. File hashes are remembered per path,
+    size and modification time.
+
+        api = NeplanService(server, username, crypted_password, upload_registry=True)
+        api.CIMExport(project, "Export1.zip", BoundaryPath="Boundary.zip")  # uploads the boundary
+        api.CIMExport(project, "Export2.zip", BoundaryPath="Boundary.zip")  # reuses the upload name
+    """
+
+    def __init__(self, path=os.path.join(DEFAULT_CACHE_DIR, "uploads.json"), max_age=24 * 3600, debug=False):
+
+        self.path     = path
+        self.max_age  = max_age
+        self.debug    = debug
+        self._entries = {} # "server|operation|sha1" -> {"name", "stored", "bytes"}
+        self._mtime   = None
+        self._hashes  = {} # (path, size, mtime) -> sha1 of the content
+        self._pending = {} # key -> lock held while the content is uploaded
+        self._lock    = threading.Lock()
+        self._stats   = {"hits": 0, "misses": 0, "rejected": 0, "reused_bytes": 0}
+
+
+    def file_hash(self, file_path):
+
+        """Returns the sha1 hex digest of the file content, read in chunks, unchanged files are not read again"""
+
+        file_stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), file_stat.st_size, file_stat.st_mtime_ns)
+        digest = self._hashes.get(key)
+
+        if digest is None:
+            content_hash = sha1()
+
+            with open(file_path, "rb") as file_object:
+                for chunk in iter(lambda: file_object.read(UPLOAD_CHUNK_SIZE), b""):
+                    content_hash.update(chunk)
+
+            digest = self._hashes[key] = content_hash.hexdigest()
+
+        return digest
+
+
+    @staticmethod
+    def key(server, operation_name, digest):
+
+        return "{}|{}|{}".format(server, operation_name, digest)
+
+
+    def _load(self):
+
+        if self.path is None:
+            return
+
+        # Reread the file if another process wrote it in the meantime
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+
+        if mtime == self._mtime:
+            return
+
+        try:
+            with open(self.path, "r") as file_object:
+                content = json.load(file_object)
+        except (OSError, ValueError):
+            return
+
+        self._mtime   = mtime
+        self._entries = content.get("entries", {}) if content.get("version") == UPLOAD_REGISTRY_VERSION else {}
+
+
+    def _save(self):
+
+        if self.path is None:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary_path = "{}.{}.tmp".format(self.path, uuid4().hex)
+
+        with open(temporary_path, "w") as file_object:
+            json.dump({"version": UPLOAD_REGISTRY_VERSION, "entries": self._entries}, file_object, indent=1)
+
+        os.replace(temporary_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+
+    def pending(self, server, operation_name, digest):
+
+        """Returns the lock of the file content, held while it is uploaded, so parallel jobs with the same file wait for
+        the first upload and reuse its name"""
+
+        with self._lock:
+            return self._pending.setdefault(self.key(server, operation_name, digest), threading.Lock())
+
+
+    def get(self, server, operation_name, digest, file_bytes=0):
+
+        """Returns the upload name of the file content on the server, None if it was not uploaded or is too old"""
+
+        with self._lock:
+            self._load()
+            entry = self._entries.get(self.key(server, operation_name, digest))
+
+            if entry is None or (self.max_age is not None and entry["stored"] + self.max_age < time.time()):
+                self._stats["misses"] += 1
+                return None
+
+            self._stats["hits"] += 1
+            self._stats["reused_bytes"] += file_bytes
+
+        if self.debug:
+            print("INFO - Upload registry hit {} -> {}".format(digest, entry["name"]))
+
+        return entry["name"]
+
+
+    def put(self, server, operation_name, digest, upload_name, file_bytes=0):
+
+        with self._lock:
+            self._load()
+            self._entries[self.key(server, operation_name, digest)] = {"name": upload_name, "stored": time.time(), "bytes": file_bytes}
+
+            # Drop expired entries while the file is written anyway
+            if self.max_age is not None:
+                oldest = time.time() - self.max_age
+                self._entries = {key: entry for key, entry in self._entries.items() if entry["stored"] >= oldest}
+
+            self._save()
+
+
+    def invalidate(self, server=None, operation_name=None, digest=None, rejected=False):
+
+        """Removes the entry of the file content, all entries of the server, or all entries if no server is given
+        rejected: the server did not accept the upload name any more, counted in stats"""
+
+        with self._lock:
+            self._load()
+
+            if digest:
+                self._entries.pop(self.key(server, operation_name, digest), None)
+            else:
+                self._entries = {key: entry for key, entry in self._entries.items() if server and not key.startswith(server + "|")}
+
+            if rejected:
+                self._stats["rejected"] += 1
+
+            self._save()
+
+        if self.debug:
+            print("INFO - Upload registry invalidated {}".format(digest or server or "completely"))
+
+
+    def stats(self):
+
+        """Returns hits, misses, rejected upload names, reused_bytes (not sent again) and size"""
+
+        with self._lock:
+            self._load()
+            return dict(self._stats, size=len(self._entries))
+
+
+# --- STREAMING TRANSFER ---
+
+# Placeholder of the stream argument of upload operations, replaced by the file content while sending
+STREAM_PLACEHOLDER = b"NEPLAN-STREAM-PLACEHOLDER"
+
+# Read size of uploaded files, multiple of 3 (no base64 padding) and of the page size (mmap.madvise)
+UPLOAD_CHUNK_SIZE = 3 * 256 * 1024
+
+# Read size of downloaded responses
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class Base64FileBody():
+    """HTTP request body of a SOAP message with a file as base64 content, the file is mapped with mmap and
+    encoded chunk by chunk while sending
+
+    prefix and suffix are the serialized SOAP envelope before and after the file content,
+    len() is the size of the encoded body, so it is sent with Content-Length and not chunked."""
+
+    def __init__(self, file_path, prefix, suffix, chunk_size=UPLOAD_CHUNK_SIZE):
+
+        self.file_path  = file_path
+        self.prefix     = prefix
+        self.suffix     = suffix
+        self.chunk_size = chunk_size
+        self.file_size  = os.path.getsize(file_path)
+
+
+    def __len__(self):
+
+        return len(self.prefix) + 4 * ((self.file_size + 2) // 3) + len(self.suffix)
+
+
+    def __iter__(self):
+
+        yield self.prefix
+
+        # Empty files can not be mapped
+        if self.file_size:
+            with open(self.file_path, "rb") as file_object, mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for start in range(0, self.file_size, self.chunk_size):
+                    yield base64.b64encode(data[start:start + self.chunk_size])
+
+                    # Drop the sent pages from the process memory, they stay in the OS file cache
+                    if hasattr(data, "madvise") and hasattr(mmap, "MADV_DONTNEED"):
+                        data.madvise(mmap.MADV_DONTNEED, start, min(self.chunk_size, self.file_size - start))
+
+        yield self.suffix
+
+
+class Base64StreamTarget():
+    """lxml parser target that decodes the base64 result of a SOAP response into a file while the response is parsed
+
+    Only the text of result_tag is written, so memory use does not grow with the file size.
+    close() returns the number of written bytes and raises zeep Fault if the response is a SOAP Fault.
+
+        parser = etree.XMLParser(target=Base64StreamTarget(file_object, "CIMExportResult"), huge_tree=True)"""
+
+    def __init__(self, file_object, result_tag):
+
+        self.file_object   = file_object
+        self.result_tag    = result_tag
+        self.written_bytes = 0
+        self.fault         = None
+        self._in_result    = False
+        self._tag          = None
+        self._rest         = b""
+
+
+    # lxml parser target interface
+    def start(self, tag, attrib):
+
+        self._tag = etree.QName(tag).localname
+
+        if self._tag == self.result_tag:
+            self._in_result = True
+        elif self._tag == "Fault":
+            self.fault = {}
+
+
+    def data(self, text):
+
+        if self._in_result:
+            encoded = self._rest + text.encode("ascii").translate(None, b" \t\r\n")
+            end = len(encoded) - len(encoded) % 4
+            self._rest = encoded[end:]
+            self.written_bytes += self.file_object.write(base64.b64decode(encoded[:end]))
+
+        elif self.fault is not None and self._tag in ("faultcode", "faultstring"):
+            self.fault[self._tag] = self.fault.get(self._tag, "") + text
+
+
+    def end(self, tag):
+
+        if self._in_result and etree.QName(tag).localname == self.result_tag:
+            self._in_result = False
+            self.written_bytes += self.file_object.write(base64.b64decode(self._rest))
+            self._rest = b""
+
+        self._tag = None
+
+
+    def comment(self, text):
+        pass
+
+
+    def close(self):
+
+        if self.fault is not None:
+            raise zeep.exceptions.Fault(message=self.fault.get("faultstring") or "Unknown fault occured", code=self.fault.get("faultcode"))
+
+        return self.written_bytes
+
+
+# --- RAW RESPONSES ---
+
+# Plain structure of the response parts per operation for raw_call, parts not listed are converted with raw_to_python
+#   strings:  ArrayOfstring as list of str
+#   pairs:    ArrayOfKeyValueOfstring... as list of (key, value) tuples, values are str
+#   fields:   data contract object as dict of str
+#   results:  ArrayOfElementResult as list of (ElementID, ElementName, ElementType, {result key: float})
+RAW_OPERATIONS = {"GetProjects":                           {"GetProjectsResult": "strings"},
+                  "GetAllFeeders":                         {"GetAllFeedersResult": "strings"},
+                  "GetLogFileAsList":                      {"GetLogFileAsListResult": "strings"},
+                  "GetAllZones":                           {"GetAllZonesResult": "pairs"},
+                  "GetAllSubAreas":                        {"GetAllSubAreasResult": "pairs"},
+                  "GetCalcParameterAttributes":            {"GetCalcParameterAttributesResult": "pairs"},
+                  "GetCalcParameterAttributesDescription": {"GetCalcParameterAttributesDescriptionResult": "pairs"},
+                  "GetAllElementsOfProject":               {"GetAllElementsOfProjectResult": "text", "elementNames": "pairs", "elementTypes": "pairs"},
+                  "GetAllElementsOfElementType":           {"GetAllElementsOfElementTypeResult": "text", "elementIDs": "strings", "elementNames": "strings"},
+                  "GetAllElementResults":                  {"GetAllElementResultsResult": "results"},
+                  "GetProject":                            {"GetProjectResult": "fields"}}
+
+# Operations the wrappers call with raw_call if the service is set up with raw_responses
+RAW_CLIENT_OPERATIONS = ("GetProjects", "GetAllElementsOfProject", "GetAllElementResults", "GetCalcParameterAttributes",
+                         "GetCalcParameterAttributesDescription")
+
+# Compiled extractor per operation, built on first use by raw_extractor
+RAW_EXTRACTORS = {}
+
+
+def raw_to_python(element):
+    """Converts an element into str (no children), list (repeated child names) or dict by local name, xsi:nil is None"""
+
+    if not len(element):
+        return element.text
+
+    names = [child.tag.rpartition("}")[2] for child in element]
+
+    if len(names) > 1 and len(set(names)) == 1:
+        return [raw_to_python(child) for child in element]
+
+    return {name: raw_to_python(child) for name, child in zip(names, element)}
+
+
+def _raw_part(part_name, kind):
+
+    """Returns the function extracting one response part, the XPath expressions are compiled once"""
+
+    items = etree.XPath("*[local-name()='{}']/*".format(part_name))
+    part  = etree.XPath("*[local-name()='{}']".format(part_name))
+
+    if kind == "strings":
+        return lambda response: [item.text for item in items(response)]
+
+    if kind == "pairs":
+        leaves = etree.XPath("*[local-name()='{}']/*/*".format(part_name))
+
+        def pairs(response):
+            texts = [leaf.text for leaf in leaves(response)]
+            return list(zip(texts[0::2], texts[1::2]))
+
+        return pairs
+
+    if kind == "fields":
+        return lambda response: {child.tag.rpartition("}")[2]: child.text for element in part(response) for child in element}
+
+    if kind == "results":
+        # [None, None, key, value, None, key, value, ...] for the Results element, see ElementResultReader
+        def results(response):
+            rows = []
+            for item in items(response):
+                values = {}
+                row = [None, None, None, values]
+                for child in item:
+                    name = child.tag.rpartition("}")[2]
+                    if name == "Results":
+                        texts = [leaf.text for leaf in child.iter()]
+                        values.update(zip(texts[2::3], (float(value) if value is not None else float("nan") for value in texts[3::3])))
+                    elif name in ("ElementID", "ElementName", "ElementType"):
+                        row[("ElementID", "ElementName", "ElementType").index(name)] = child.text
+                rows.append(tuple(row))
+            return rows
+
+        return results
+
+    if kind == "text":
+        return lambda response: next((element.text for element in part(response)), None)
+
+    return lambda response: next((raw_to_python(element) for element in part(response)), None)
+
+
+def raw_extractor(operation_name):
+    """Returns the compiled extractor of the operation, a function of the response element returning the result
+    alone for operations with one output part, else a dict by part name"""
+
+    extractor = RAW_EXTRACTORS.get(operation_name)
+
+    if extractor is None:
+        spec = RAW_OPERATIONS.get(operation_name)
+
+        if spec is None:
+            extractor = lambda response: raw_to_python(response[0]) if len(response) == 1 else raw_to_python(response)
+        elif len(spec) == 1:
+            extractor = _raw_part(*next(iter(spec.items())))
+        else:
+            parts = [(part_name, _raw_part(part_name, kind)) for part_name, kind in spec.items()]
+            extractor = lambda response: {part_name: extract(response) for part_name, extract in parts}
+
+        RAW_EXTRACTORS[operation_name] = extractor
+
+    return extractor
+
+
+def raw_response(content, operation_name):
+    """Returns the {operation}Response element of a SOAP response, raises zeep Fault for SOAP faults"""
+
+    body = next(etree.fromstring(content, etree.XMLParser(huge_tree=True)).iterchildren("{*}Body"))
+    response = body[0]
+
+    if response.tag.rpartition("}")[2] == "Fault":
+        fault = {child.tag.rpartition("}")[2]: child.text for child in response}
+        raise zeep.exceptions.Fault(message=fault.get("faultstring") or "Unknown fault occured", code=fault.get("faultcode"))
+
+    return response
+
+
+class RawServiceProxy():
+    """api.raw.<Operation>(arguments) calls the operation with raw_call, like api.service.<Operation> without zeep
+    deserialization of the response"""
+
+    def __init__(self, api, output="dict"):
+
+        self._api    = api
+        self._output = output
+
+
+    def __getattr__(self, operation_name):
+        return lambda *args, **kwargs: self._api.raw_call(operation_name, *args, output=self._output, **kwargs)
+
+
+# --- METRICS ---
+
+# Upper bounds of the latency histogram buckets in seconds, last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800, 3600)
+
+# Phases of a SOAP call: building the envelope, HTTP exchange, parsing the response, and all together
+LATENCY_PHASES = ("serialize", "network", "deserialize", "total")
+
+# OperationCall of the running SOAP call, per thread and per asyncio task
+CURRENT_CALL = contextvars.ContextVar("neplan_current_call", default=None)
+
+
+class OperationCall():
+    """Timestamps and message sizes of one running SOAP call, sent() and received() are called by the transport"""
+
+    __slots__ = ("operation_name", "start_time", "send_time", "receive_time", "request_bytes", "response_bytes")
+
+    def __init__(self, operation_name):
+
+        self.operation_name = operation_name
+        self.start_time     = time.perf_counter()
+        self.send_time      = None
+        self.receive_time   = None
+        self.request_bytes  = 0
+        self.response_bytes = 0
+
+
+    def sent(self, request_bytes):
+
+        self.send_time      = time.perf_counter()
+        self.request_bytes += request_bytes
+
+
+    def received(self, response_bytes):
+
+        self.receive_time    = time.perf_counter()
+        self.response_bytes += response_bytes
+
+
+class OperationMetrics():
+    """Counts, latency histograms (serialize, network, deserialize, total), message sizes and faults per SOAP operation
+
+    One object can be shared by several services. Export with as_dict(), to_json() or to_prometheus().
+
+        with metrics.measure("GetProject"):
+            service.GetProject(...)"""
+
+    def __init__(self):
+
+        self._operations = {}
+        self._lock       = threading.Lock()
+
+
+    @staticmethod
+    def _empty_operation():
+
+        operation = {"calls": 0, "faults": 0, "errors": 0, "request_bytes": 0, "response_bytes": 0}
+
+        for phase in LATENCY_PHASES:
+            operation[phase] = {"buckets": [0] * (len(LATENCY_BUCKETS) + 1), "sum": 0.0, "max": 0.0}
+
+        return operation
+
+
+    @contextmanager
+    def measure(self, operation_name):
+
+        """Context manager recording one call of the operation, a Fault counts as fault, other exceptions as error"""
+
+        call  = OperationCall(operation_name)
+        token = CURRENT_CALL.set(call)
+        fault = error = False
+
+        try:
+            yield call
+        except zeep.exceptions.Fault:
+            fault = True
+            raise
+        except Exception:
+            error = True
+            raise
+        finally:
+            CURRENT_CALL.reset(token)
+            self.record(call, fault, error)
+
+
+    def record(self, call, fault=False, error=False):
+
+        """Adds a finished OperationCall, phases without transport timestamps count as serialize time"""
+
+        end_time     = time.perf_counter()
+        send_time    = call.send_time or end_time
+        receive_time = call.receive_time or end_time
+        durations    = {"serialize":   send_time - call.start_time,
+                        "network":     receive_time - send_time,
+                        "deserialize": end_time - receive_time,
+                        "total":       end_time - call.start_time}
+
+        with self._lock:
+            operation = self._operations.get(call.operation_name)
+            if operation is None:
+                operation = self._operations[call.operation_name] = self._empty_operation()
+
+            operation["calls"]          += 1
+            operation["faults"]         += fault
+            operation["errors"]         += error
+            operation["request_bytes"]  += call.request_bytes
+            operation["response_bytes"] += call.response_bytes
+
+            for phase, duration in durations.items():
+                histogram = operation[phase]
+                histogram["buckets"][bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+                histogram["sum"] += duration
+                histogram["max"]  = max(histogram["max"], duration)
+
+
+    def snapshot(self, reset=False):
+
+        """Returns a copy of the raw counters, to be added to another OperationMetrics with merge()"""
+
+        with self._lock:
+            operations = json.loads(json.dumps(self._operations))
+            if reset:
+                self._operations = {}
+
+        return operations
+
+
+    def merge(self, operations):
+
+        """Adds the counters of a snapshot(), for example from a worker process"""
+
+        with self._lock:
+            for operation_name, other in operations.items():
+                operation = self._operations.get(operation_name)
+                if operation is None:
+                    operation = self._operations[operation_name] = self._empty_operation()
+
+                for key in ("calls", "faults", "errors", "request_bytes", "response_bytes"):
+                    operation[key] += other[key]
+
+                for phase in LATENCY_PHASES:
+                    histogram = operation[phase]
+                    histogram["buckets"] = [count + other_count for count, other_count in zip(histogram["buckets"], other[phase]["buckets"])]
+                    histogram["sum"] += other[phase]["sum"]
+                    histogram["max"]  = max(histogram["max"], other[phase]["max"])
+
+
+    def reset(self):
+
+        """Removes all recorded calls"""
+
+        with self._lock:
+            self._operations = {}
+
+
+    def as_dict(self):
+
+        """Returns per operation: calls, faults, errors, request_bytes, response_bytes and per phase
+        count, sum, mean, max and cumulative buckets (upper bound in seconds: calls)"""
+
+        result = {}
+
+        for operation_name, operation in sorted(self.snapshot().items()):
+            result[operation_name] = {key: operation[key] for key in ("calls", "faults", "errors", "request_bytes", "response_bytes")}
+
+            for phase in LATENCY_PHASES:
+                histogram  = operation[phase]
+                cumulative = numpy.cumsum(histogram["buckets"]).tolist()
+                result[operation_name][phase] = {"count":   operation["calls"],
+                                                 "sum":     histogram["sum"],
+                                                 "mean":    histogram["sum"] / operation["calls"],
+                                                 "max":     histogram["max"],
+                                                 "buckets": dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"], cumulative))}
+
+        return result
+
+
+    def to_json(self, indent=2):
+
+        """Returns as_dict() as JSON text"""
+
+        return json.dumps(self.as_dict(), indent=indent)
+
+
+    def to_prometheus(self, prefix="neplan_soap"):
+
+        """Returns the metrics in the Prometheus text exposition format"""
+
+        operations = self.as_dict()
+        lines = []
+
+        for key, help_text in (("calls", "SOAP calls"), ("faults", "SOAP calls answered with a Fault"), ("errors", "SOAP calls failed without a Fault"),
+                               ("request_bytes", "Bytes of sent SOAP requests"), ("response_bytes", "Bytes of received SOAP responses")):
+            lines.append("# HELP {}_{}_total {} per operation".format(prefix, key, help_text))
+            lines.append("# TYPE {}_{}_total counter".format(prefix, key))
+            for operation_name, operation in operations.items():
+                lines.append('{}_{}_total{{operation="{}"}} {}'.format(prefix, key, operation_name, operation[key]))
+
+        lines.append("# HELP {}_duration_seconds Duration of SOAP calls per operation and phase".format(prefix))
+        lines.append("# TYPE {}_duration_seconds histogram".format(prefix))
+        for operation_name, operation in operations.items():
+            for phase in LATENCY_PHASES:
+                labels = 'operation="{}",phase="{}"'.format(operation_name, phase)
+                for bound, count in operation[phase]["buckets"].items():
+                    lines.append('{}_duration_seconds_bucket{{{},le="{}"}} {}'.format(prefix, labels, bound, count))
+                lines.append("{}_duration_seconds_sum{{{}}} {!r}".format(prefix, labels, operation[phase]["sum"]))
+                lines.append("{}_duration_seconds_count{{{}}} {}".format(prefix, labels, operation[phase]["count"]))
+
+        return "\n".join(lines) + "\n"
+
+
+    def write(self, path):
+
+        """Writes the metrics to path, as JSON if it ends with .json, else in the Prometheus text format"""
+
+        with open(path, "w", encoding="utf-8") as file_object:
+            file_object.write(self.to_json() if str(path).endswith(".json") else self.to_prometheus())
+
+
+# --- CONCURRENCY LIMIT ---
+
+def timeout_errors():
+    """Returns the exception types counted as timeout, they always lower the limit
+    Only the HTTP clients already in use are checked, so no client library is imported for it"""
+
+    errors = (TimeoutError,)
+
+    if "requests" in sys.modules:
+        errors += (requests.exceptions.Timeout,)
+    if "httpx" in sys.modules:
+        errors += (httpx.TimeoutException,)
+
+    return errors
+
+# Start, minimum and maximum number of calls in flight per operation class
+DEFAULT_CONCURRENCY_LIMITS = {"analysis": (2, 1, 32),
+                              "export":   (4, 1, 16),
+                              "lookup":   (16, 1, 128)}
+
+# latency_tolerance of AdaptiveLimiter per operation class. Analyses and exports take as long as the model is large, with
+# mixed model sizes the latency above the fastest call says nothing about the server load, they react to failures only
+DEFAULT_LATENCY_TOLERANCES = {"analysis": None,
+                              "export":   None,
+                              "lookup":   2.0}
+
+
+class AdaptiveLimiter():
+    """AIMD limit of calls in flight, the limit adapts to the observed latency and failures
+
+    Every successful call raises the limit by increase / limit while the limiter is saturated, so the limit grows by
+    about increase per round trip. The limit is multiplied by decrease after a timeout or connection error,
+    when the fault rate is above max_fault_rate, or when the smoothed latency is above latency_tolerance times the
+    lowest latency of the last window calls (or above latency_target, if given). latency_tolerance None reacts to
+    failures only, for operations whose latency follows the model size. Only calls started after the last
+    decrease can decrease it again, so a burst of slow or failed calls lowers the limit once.
+
+    A limiter serves either threads (acquire, release) or the tasks of one event loop (acquire_async, release_async)."""
+
+    def __init__(self, initial=4, minimum=1, maximum=64, increase=1.0, decrease=0.5, latency_tolerance=2.0, latency_target=None,
+                 max_fault_rate=0.2, smoothing=0.1, window=100):
+
+        self.limit             = float(initial)
+        self.minimum           = minimum
+        self.maximum           = maximum
+        self.increase          = increase
+        self.decrease          = decrease
+        self.latency_tolerance = latency_tolerance
+        self.latency_target    = latency_target
+        self.max_fault_rate    = max_fault_rate
+        self.smoothing         = smoothing
+
+        self.in_flight    = 0
+        self.min_latency  = None
+        self.latency      = None
+        self._latencies   = deque([], window)
+        self.fault_rate   = 0.0
+        self.calls        = 0
+        self.failures     = 0
+        self.decreases    = 0
+        self._epoch       = 0
+        self._lock        = threading.Lock()
+        self._condition   = threading.Condition(self._lock)
+        self._async_condition = None # asyncio.Condition, created in the event loop of the first async call
+
+
+    def _take(self):
+
+        self.in_flight += 1
+
+        return (time.perf_counter(), self._epoch, self.in_flight >= int(self.limit))
+
+
+    def _free(self):
+
+        return self.in_flight < int(self.limit)
+
+
+    def acquire(self):
+
+        """Waits for a free slot, returns the token for release()"""
+
+        with self._condition:
+            self._condition.wait_for(self._free)
+
+            return self._take()
+
+
+    async def acquire_async(self):
+
+        """Waits for a free slot without blocking the event loop, returns the token for release_async()"""
+
+        if self._async_condition is None:
+            self._async_condition = asyncio.Condition()
+
+        async with self._async_condition:
+            await self._async_condition.wait_for(self._free)
+
+            return self._take()
+
+
+    def _adapt(self, token, outcome):
+
+        """Frees the slot and adapts the limit, returns the number of free slots"""
+
+        start_time, epoch, saturated = token
+        latency = time.perf_counter() - start_time
+
+        self.in_flight -= 1
+        self.calls     += 1
+        self.failures  += outcome != "ok"
+        self.fault_rate = (1 - self.smoothing) * self.fault_rate + self.smoothing * (outcome == "fault")
+
+        if outcome == "ok":
+            # Lowest latency of a window, so the baseline follows changed models
+            self._latencies.append(latency)
+            self.latency     = latency if self.latency is None else (1 - self.smoothing) * self.latency + self.smoothing * latency
+            self.min_latency = min(self._latencies)
+
+        overloaded = (outcome in ("timeout", "error")
+                      or (outcome == "fault" and self.fault_rate > self.max_fault_rate)
+                      or (outcome == "ok" and self.latency_target is not None and self.latency > self.latency_target)
+                      or (outcome == "ok" and self.latency_target is None and self.latency_tolerance is not None
+                          and self.latency > self.latency_tolerance * self.min_latency))
+
+        if overloaded and epoch == self._epoch:
+            self.limit      = max(self.minimum, self.limit * self.decrease)
+            self._epoch    += 1
+            self.decreases += 1
+        elif outcome == "ok" and saturated:
+            self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+        return max(int(self.limit) - self.in_flight, 0)
+
+
+    def release(self, token, outcome="ok"):
+
+        """Frees the slot and adapts the limit, outcome: ok, fault, timeout or error"""
+
+        with self._condition:
+            self._condition.notify(self._adapt(token, outcome))
+
+
+    async def release_async(self, token, outcome="ok"):
+
+        """release for slots of acquire_async"""
+
+        async with self._async_condition:
+            self._async_condition.notify(self._adapt(token, outcome))
+
+
+    def stats(self):
+
+        """Returns limit, in_flight, calls, failures, decreases, latency, min_latency and fault_rate"""
+
+        with self._lock:
+            return {"limit":       int(self.limit),
+                    "in_flight":   self.in_flight,
+                    "calls":       self.calls,
+                    "failures":    self.failures,
+                    "decreases":   self.decreases,
+                    "latency":     self.latency,
+                    "min_latency": self.min_latency,
+                    "fault_rate":  self.fault_rate}
+
+
+class ConcurrencyLimiter():
+    """One AdaptiveLimiter per operation class (analysis, export, lookup), see get_operation_class
+
+    limits: dict operation class: (initial, minimum, maximum), missing classes use DEFAULT_CONCURRENCY_LIMITS
+    latency_tolerances: dict operation class: latency_tolerance, missing classes use DEFAULT_LATENCY_TOLERANCES
+    further keyword arguments are passed to every AdaptiveLimiter. Share one object between services of the same server,
+    either sync services or async services of one event loop."""
+
+    def __init__(self, limits=None, latency_tolerances=None, **options):
+
+        limits = dict(DEFAULT_CONCURRENCY_LIMITS, **(limits or {}))
+        latency_tolerances = dict(DEFAULT_LATENCY_TOLERANCES, **(latency_tolerances or {}))
+
+        if "latency_tolerance" in options: # One tolerance for all classes
+            latency_tolerances = dict.fromkeys(limits, options.pop("latency_tolerance"))
+        self.limiters = {operation_class: AdaptiveLimiter(initial, minimum, maximum, latency_tolerance=latency_tolerances.get(operation_class, 2.0), **options)
+                         for operation_class, (initial, minimum, maximum) in limits.items()}
+
+
+    @staticmethod
+    def _outcome(error):
+
+        if isinstance(error, zeep.exceptions.Fault):
+            return "fault"
+        if isinstance(error, timeout_errors()):
+            return "timeout"
+        return "error"
+
+
+    @contextmanager
+    def slot(self, operation_name):
+
+        """Context manager holding a slot of the operation class for one call"""
+
+        limiter = self.limiters[get_operation_class(operation_name)]
+        token   = limiter.acquire()
+        outcome = "ok"
+
+        try:
+            yield limiter
+        except Exception as error:
+            outcome = self._outcome(error)
+            raise
+        finally:
+            limiter.release(token, outcome)
+
+
+    @asynccontextmanager
+    async def async_slot(self, operation_name):
+
+        """Async context manager holding a slot of the operation class for one call"""
+
+        limiter = self.limiters[get_operation_class(operation_name)]
+        token   = await limiter.acquire_async()
+        outcome = "ok"
+
+        try:
+            yield limiter
+        except Exception as error:
+            outcome = self._outcome(error)
+            raise
+        finally:
+            await limiter.release_async(token, outcome)
+
+
+    def stats(self):
+
+        """Returns the AdaptiveLimiter stats per operation class"""
+
+        return {operation_class: limiter.stats() for operation_class, limiter in self.limiters.items()}
+
+
+# --- ACTIVITY LOG ---
+
+# Level, time and message of a user activity log line, "INFO;2023-01-20T10:00:00;message" or "2023-01-20 10:00:00 INFO message"
+LOG_LINE_PATTERNS = (re.compile(r"^\s*(?P<level>[A-Za-z]+)\s*;\s*(?P<time>[^;]+?)\s*;\s*(?P<message>.*)$", re.S),
+                     re.compile(r"^\s*\[?(?P<time>\d{1,4}[-./]\d{1,2}[-./]\d{1,4}[ T]\d{1,2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?)\]?\s*[-|;]?\s*"
+                                r"\[?(?P<level>[A-Za-z]+)\]?\s*[-:|;]?\s*(?P<message>.*)$", re.S))
+
+# Formats of the log time besides ISO 8601
+LOG_TIME_FORMATS = ("%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S")
+
+
+class LogRecord():
+    """One entry of the user activity log, number counts the lines since the start of the log, time is None and level
+    empty if the line could not be parsed"""
+
+    __slots__ = ("number", "level", "time", "message", "line")
+
+    def __init__(self, number, level, time, message, line):
+
+        self.number  = number
+        self.level   = level
+        self.time    = time
+        self.message = message
+        self.line    = line
+
+
+    def __repr__(self):
+        return "LogRecord({}, {!r}, {}, {!r})".format(self.number, self.level, self.time, self.message)
+
+
+    def as_dict(self):
+        return {"number": self.number, "level": self.level, "time": self.time.isoformat() if self.time else None, "message": self.message}
+
+
+def parse_log_time(text):
+    """Returns the datetime of a log time, None if it is no known format"""
+
+    try:
+        return datetime.fromisoformat(text.strip())
+    except ValueError:
+        pass
+
+    for time_format in LOG_TIME_FORMATS:
+        try:
+            return datetime.strptime(text.strip(), time_format)
+        except ValueError:
+            pass
+
+    return None
+
+
+def parse_log_line(line, number=0):
+    """Returns the LogRecord of one user activity log line"""
+
+    for pattern in LOG_LINE_PATTERNS:
+        match = pattern.match(line)
+
+        if match:
+            log_time = parse_log_time(match["time"])
+            if log_time is not None:
+                return LogRecord(number, match["level"].upper(), log_time, match["message"].strip(), line)
+
+    return LogRecord(number, "", None, line.strip(), line)
+
+
+class LogFollower():
+    """Returns only the entries of the user activity log added since the last poll, parsed into LogRecords
+
+    The webservice has no offset for the log, every poll still downloads it with GetLogFileAsString, but only the text
+    after the cursor is split and parsed. The cursor is the length and line count of the log read so far, with the
+    last characters as fingerprint and the time of the last entry. If the log was cleared or rotated the fingerprint
+    does not match anymore, the follower then starts again at the first line and skips entries not newer than the
+    last time seen.
+
+        follower = LogFollower(api, state_file="activity.cursor")
+        for record in follower.tail(poll_interval=10):
+            print(record.level, record.time, record.message)
+
+    from_start: also return the entries already in the log at the first poll, else start at its end
+    state_file: JSON file keeping the cursor across runs, a stored cursor takes precedence over from_start
+    levels: return only entries with these levels (INFO, WARNING, ERROR, ...), all are read for the cursor"""
+
+    FINGERPRINT_CHARS = 256
+
+    def __init__(self, api, from_start=True, state_file=None, levels=None):
+
+        self.api        = api
+        self.state_file = state_file
+        self.levels     = {level.upper() for level in levels} if levels else None
+        self.cursor     = {"offset": 0, "lines": 0, "fingerprint": "", "time": None}
+        self.stats      = {"polls": 0, "records": 0, "parsed_chars": 0, "rotations": 0}
+        self._skip      = not from_start # First poll only moves the cursor to the end of the log
+
+        if state_file and os.path.exists(state_file):
+            with open(state_file) as file_object:
+                self.cursor = json.load(file_object)
+            self._skip = False
+
+
+    def poll(self):
+
+        """Reads the log once, returns the new LogRecords and moves the cursor behind them"""
+
+        if isinstance(self.api, AsyncNeplanService):
+            raise TypeError("LogFollower of an AsyncNeplanService is read with apoll and atail")
+
+        return self.feed(self.api.GetLogFileAsString() or "")
+
+
+    async def apoll(self):
+
+        """poll for AsyncNeplanService"""
+
+        return self.feed(await self.api.GetLogFileAsString() or "")
+
+
+    def feed(self, text):
+
+        """Returns the LogRecords of the log text after the cursor and moves the cursor to its end"""
+
+        self.stats["polls"] += 1
+        offset, number, last_time = self.cursor["offset"], self.cursor["lines"], self.cursor["time"]
+
+        if offset > len(text) or text[max(offset - self.FINGERPRINT_CHARS, 0):offset] != self.cursor["fingerprint"]:
+            self.stats["rotations"] += 1
+            offset = number = 0
+            print("WARNING - User activity log was cleared or rotated, reading it from the start")
+        else:
+            last_time = None # Entries behind an unchanged cursor are new in any case
+
+        records = []
+        new_text = text[offset:]
+
+        if self._skip:
+            lines = [line for line in new_text.splitlines() if line.strip()]
+            number += len(lines)
+
+            last_record = parse_log_line(lines[-1]) if lines else None
+            if last_record and last_record.time:
+                self.cursor["time"] = last_record.time.isoformat()
+        else:
+            for line in new_text.splitlines():
+                if not line.strip():
+                    continue
+
+                number += 1
+                record = parse_log_line(line, number)
+
+                if last_time and record.time and record.time.isoformat() <= last_time:
+                    continue
+                if record.time:
+                    self.cursor["time"] = record.time.isoformat()
+                if self.levels is None or record.level in self.levels:
+                    records.append(record)
+
+        self._skip = False
+        self.stats["records"] += len(records)
+        self.stats["parsed_chars"] += len(new_text)
+        self.cursor.update(offset=len(text), lines=number, fingerprint=text[max(len(text) - self.FINGERPRINT_CHARS, 0):])
+
+        if self.state_file:
+            self.save()
+
+        return records
+
+
+    def save(self):
+
+        """Writes the cursor to the state file"""
+
+        temp_path = "{}.{}.tmp".format(self.state_file, os.getpid())
+
+        with open(temp_path, "w") as file_object:
+            json.dump(self.cursor, file_object)
+
+        os.replace(temp_path, self.state_file)
+
+
+    def tail(self, poll_interval=5.0, max_interval=None, stop=None):
+
+        """Generator of new LogRecords, polls every poll_interval seconds. Without new entries the interval doubles up
+        to max_interval (by default it stays at poll_interval). stop: threading.Event that ends the generator"""
+
+        interval = poll_interval
+
+        while stop is None or not stop.is_set():
+            records = self.poll()
+            yield from records
+
+            interval = poll_interval if records else min(interval * 2, max_interval or poll_interval)
+
+            if stop is None:
+                time.sleep(interval)
+            else:
+                stop.wait(interval)
+
+
+    async def atail(self, poll_interval=5.0, max_interval=None):
+
+        """tail for AsyncNeplanService, async generator of new LogRecords"""
+
+        interval = poll_interval
+
+        while True:
+            records = await self.apoll()
+            for record in records:
+                yield record
+
+            interval = poll_interval if records else min(interval * 2, max_interval or poll_interval)
+            await asyncio.sleep(interval)
+
+
+# --- CIM EXPORT ---
+
+#ns13:CimExportOptions(AreasToExport: ns4:ArrayOfguid, AreasToExportNames: ns4:ArrayOfstring, BalticCGMArea: xsd:string, BalticRSCExport: xsd:boolean, BoundaryAreaName: xsd:string, BoundaryPath: xsd:string, Description: xsd:string, DynamicLineRatingPath: xsd:string, ENTSOEZIP: xsd:boolean, EqFileCIMID: xsd:string, ExcludeBRELL: xsd:boolean, ExportAsCGMES3: xsd:boolean, ExportBoundary: xsd:boolean, ExportDL: xsd:boolean, ExportDY: xsd:boolean, ExportEQ: xsd:boolean, ExportGL: xsd:boolean, ExportMerged: xsd:boolean, ExportSSH: xsd:boolean, ExportSV: xsd:boolean, ExportSVShortCircuit: xsd:boolean, ExportTP: xsd:boolean, FileHeaderComment: xsd:string, IsAutomatedExport: xsd:boolean, KeepEQIDConstant: xsd:boolean, ListOfMASForSVExport: ns4:ArrayOfKeyValueOfstringArrayOfstringty7Ep6D1, MAS: xsd:string, Period: xsd:string, ScenarioDateTime: xsd:dateTime, Version: xsd:string)
+
+# Default CimExportOptions, ScenarioDateTime None is replaced with the current UTC time
+CIM_EXPORT_DEFAULTS = { 'AreasToExport': [], #ns4:ArrayOfguid
+                        'AreasToExportNames': [], #ns4:ArrayOfstring
+                        'BalticCGMArea': None, #xsd:string
+                        'BalticRSCExport': False, #xsd:boolean
+                        'BoundaryAreaName': "EU", #xsd:string
+                        'BoundaryPath': None, #xsd:string
+                        'Description': "Neplan Export", #xsd:string
+                        'DynamicLineRatingPath': None, #xsd:string
+                        'ENTSOEZIP': True, #xsd:boolean
+                        'EqFileCIMID': False, #xsd:string
+                        'ExcludeBRELL': True, #xsd:boolean
+                        'ExportAsCGMES3': False, #xsd:boolean
+                        'ExportBoundary': False, #xsd:boolean
+                        'ExportDL': False, #xsd:boolean
+                        'ExportDY': False, #xsd:boolean
+                        'ExportEQ': True, #xsd:boolean
+                        'ExportGL': False, #xsd:boolean
+                        'ExportMerged': False, #xsd:boolean
+                        'ExportSSH': True, #xsd:boolean
+                        'ExportSV': True, #xsd:boolean
+                        'ExportSVShortCircuit': False, #xsd:boolean
+                        'ExportTP': True, #xsd:boolean
+                        'FileHeaderComment': "OPDE Confidential", #xsd:string
+                        'IsAutomatedExport': True, #xsd:boolean
+                        'KeepEQIDConstant': True, #xsd:boolean
+                        'ListOfMASForSVExport': [], #ns4:ArrayOfKeyValueOfstringArrayOfstringty7Ep6D1
+                        'MAS': "", #xsd:string
+                        'Period': "1D", #xsd:string
+                        'ScenarioDateTime': None, #xsd:dateTime
+                        'Version': "001", #xsd:string
+}
+
+
+def cim_export_options(**options):
+    """Returns the CimExportOptions dict for CIMExport, options not given are taken from CIM_EXPORT_DEFAULTS"""
+
+    unknown_options = set(options) - set(CIM_EXPORT_DEFAULTS)
+
+    if unknown_options:
+        raise TypeError("Unknown CIM export options: {}".format(", ".join(sorted(unknown_options))))
+
+    CIMOptions = dict(CIM_EXPORT_DEFAULTS, **options)
+
+    if CIMOptions['ScenarioDateTime'] is None:
+        CIMOptions['ScenarioDateTime'] = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    # zeep sends plain lists of ArrayOfguid/ArrayOfstring as empty arrays
+    for option, item in (('AreasToExport', 'guid'), ('AreasToExportNames', 'string')):
+        if isinstance(CIMOptions[option], (list, tuple)) and CIMOptions[option]:
+            CIMOptions[option] = {item: list(CIMOptions[option])}
+
+    return CIMOptions
+
+
+class NeplanServiceBase():
+    """Options and helpers shared by NeplanService and AsyncNeplanService: metrics, concurrency limiter, message history,
+    lookup, result and WSDL caches, upload registry and the zeep plumbing independent of the transport. The subclasses
+    set up their transport and zeep client and bind it with _bind_service."""
+
+    def __init__(self, server, username, crypted_password, debug = False, wsdl_cache = True, lookup_cache = False,
+                 history = True, metrics = True, concurrency_limiter = False, result_cache = False, raw_responses = False,
+                 upload_registry = False):
+        """Sets up the options of both clients, see NeplanService for the arguments"""
+
+        self.username = username
+        self.server = server
+        self.debug  = debug
+        self.raw_responses = raw_responses
+        self.raw = RawServiceProxy(self)
+
+        # Optional per operation metrics
+        self.metrics = OperationMetrics() if metrics is True else metrics or None
+
+        # Optional adaptive limit of calls in flight
+        self.concurrency_limiter = ConcurrencyLimiter() if concurrency_limiter is True else concurrency_limiter or None
+
+        # Add plugin for message exchange history
+        self.history = soap.MessageHistory() if history is True else soap.MessageHistory(history) if isinstance(history, str) else \
+                       soap.MessageHistory(**history) if isinstance(history, dict) else history or None # Call this element to see last sent/recieved messages
+
+        # Cache of ElementCatalog per (ProjectID, VariantID)
+        self._element_catalogs      = {}
+        self._element_catalogs_lock = threading.Lock()
+
+        # Optional cache of lookup calls
+        self.lookup_cache = LookupCache() if lookup_cache is True else lookup_cache or None
+
+        # Optional persistent cache of load flow results
+        self.result_cache = ResultCache(debug=debug) if result_cache is True else ResultCache(result_cache, debug=debug) if isinstance(result_cache, str) else result_cache or None
+
+        # Optional persistent registry of uploaded files
+        self.upload_registry = UploadRegistry(debug=debug) if upload_registry is True else UploadRegistry(upload_registry, debug=debug) if isinstance(upload_registry, str) else upload_registry or None
+
+        # Set up service
+        self.wsdl_url = "{}/Services/External/NeplanService.svc?singleWsdl".format(server)
+        self.wsse     = zeep.wsse.UsernameToken(username, password=crypted_password)
+
+        # Use local copy of the WSDL if available
+        if wsdl_cache is True:
+            wsdl_cache = WsdlCache(debug=debug)
+
+        self.wsdl_cache = wsdl_cache or None
+
+
+    def _bind_service(self, client, proxy_class, metered_proxy_class):
+
+        """Sets client, wsdl and service of the zeep client, with metrics or concurrency_limiter through metered_proxy_class"""
+
+        binding = client.wsdl.bindings['{http://www.neplan.ch/Web/External}BasicHttpBinding_NeplanService']
+        address = '{}/Services/External/NeplanService.svc/basic'.format(self.server)
+
+        if self.metrics or self.concurrency_limiter:
+            service = metered_proxy_class(client, binding, self.metrics, self.concurrency_limiter, address=address)
+        else:
+            service = proxy_class(client, binding, address=address)
+
+        self.client   = client
+        self.wsdl     = client.wsdl
+        self.service  = service
+        self.get_type = client.get_type
+
+
+    def invalidate_wsdl_cache(self):
+
+        """Removes the cached WSDL of this server, next NeplanService object will download it again"""
+
+        if self.wsdl_cache:
+            self.wsdl_cache.invalidate(self.wsdl_url)
+
+
+    def print_last_messageexchange(self):
+
+        """Prints out last sent and recieved SOAP messages"""
+
+        if self.history is None:
+            print("INFO - Message history is off")
+            return
+
+        messages = {"SENT":     self.history.last_sent,
+                    "RECIEVED": self.history.last_received}
+
+        for message in messages:
+
+            if messages[message] is None:
+                print("---{}--- not in history".format(message))
+                continue
+
+            print("---{}---".format(message))
+            print("### http header ###")
+            print('\n' * 1)
+            print(messages[message]["http_headers"])
+            print('\n' * 1)
+            print("### {} http envelope START ###".format(message))
+            print('\n' * 1)
+            print(messages[message]["envelope"])
+            print("### {} http envelope END ###".format(message))
+            print('\n' * 1)
+
+
+    def print_duration(self, text, start_time):
+
+        """Print duration between now and start time
+        Input: text, start_time
+        Output: duration (in seconds), end_time"""
+
+        end_time = datetime.now()
+        duration = (end_time - start_time).total_seconds()
+        print(text, duration)
+
+        return duration, end_time
+
+
+    def print_duration_saved(self, serial_duration, parallel_duration):
+
+        """Print time saved by running calls in parallel
+        Input: serial_duration (sum of the single call durations), parallel_duration (wall clock time of all calls)
+        Output: saved duration (in seconds)"""
+
+        saved_duration = max(serial_duration - parallel_duration, 0)
+        print("Saved by parallel download -> ", saved_duration)
+
+        return saved_duration
+
+
+    def update_url_to_current_server(self, localhost_url):
+
+        """Updates localhost url to server url"""
+
+        parsed_url      = urlparse(localhost_url)
+        new_netloc      = urlparse(self.server).netloc
+        parse_update    = parsed_url._replace(netloc=new_netloc)
+        updated_url     = urlunparse(parse_update)
+
+        return updated_url
+
+
+    def cim_export_options(self, **options):
+
+        """Returns the CimExportOptions dict for CIMExport, see cim_export_options"""
+
+        return cim_export_options(**options)
+
+
+    def _stream_message(self, operation_name, *args, **kwargs):
+
+        """Returns address, serialized SOAP envelope and HTTP headers of the operation as zeep would send them"""
+
+        binding = self.service._binding
+        envelope, http_headers = binding._create(operation_name, args, kwargs, client=self.client, options=self.service._binding_options)
+
+        return self.service._binding_options["address"], zeep.wsdl.utils.etree_to_string(envelope), http_headers
+
+
+    def _upload_body(self, operation_name, file_path):
+
+        """Returns address, Base64FileBody and HTTP headers of an upload operation with the file as stream argument"""
+
+        address, message, http_headers = self._stream_message(operation_name, stream=STREAM_PLACEHOLDER)
+        prefix, suffix = message.split(base64.b64encode(STREAM_PLACEHOLDER), 1)
+
+        return address, Base64FileBody(file_path, prefix, suffix), http_headers
+
+
+    def _process_reply(self, operation_name, response):
+
+        """Returns the result of the operation from the HTTP response, raises zeep Fault on SOAP faults"""
+
+        binding = self.service._binding
+
+        return binding.process_reply(self.client, binding.get(operation_name), response)
+
+
+    def _measure(self, operation_name):
+
+        """Returns the context manager recording a call of the operation in metrics, see OperationMetrics.measure"""
+
+        return self.metrics.measure(operation_name) if self.metrics else nullcontext()
+
+
+    def concurrency_stats(self):
+
+        """Returns limit, calls in flight, latency and failures per operation class, None without concurrency_limiter"""
+
+        return self.concurrency_limiter.stats() if self.concurrency_limiter else None
+
+
+    def _warm_lookups(self, project, kind, response):
+
+        """Stores all ID <-> name pairs of a GetAllZones/GetAllSubAreas response in lookup_cache, kind is Zone or SubArea"""
+
+        if not self.lookup_cache:
+            return
+
+        for item in key_value_items(response):
+            self.lookup_cache.set(("Get{}NameByID".format(kind), project_key(project), item.Key), item.Value)
+            self.lookup_cache.set(("Get{}IDByName".format(kind), project_key(project), item.Value), item.Key)
+
+
+    def lookup_cache_stats(self):
+
+        """Returns hit/miss statistics of lookup_cache, None if the cache is not used"""
+
+        return self.lookup_cache.stats() if self.lookup_cache else None
+
+
+    def invalidate_lookup_cache(self):
+
+        """Removes all cached projects, zones, subareas and feeders"""
+
+        if self.lookup_cache:
+            self.lookup_cache.clear()
+
+
+    def invalidate_element_catalog(self, project=None):
+        """Removes the cached ElementCatalog of the project variant, or all cached catalogs if no project is given"""
+
+        with self._element_catalogs_lock:
+            if project is None:
+                self._element_catalogs.clear()
+            else:
+                self._element_catalogs.pop((project.ProjectID, project.VariantID), None)
+
+
+    def follow_log(self, from_start=True, state_file=None, levels=None):
+        """Returns a LogFollower returning only new entries of the user activity log as LogRecords"""
+
+        return LogFollower(self, from_start, state_file, levels)
+
+
+class NeplanService(NeplanServiceBase):
+
+    # HELPER FUNCTIONS - START
+
+    #def __init__(self, server, username, password, debug = False):
+    def __init__(self, server, username, crypted_password, debug = False, wsdl_cache = True,
+                 pool_maxsize = 10, timeout = 300, operation_timeouts = None, keep_alive = True, compression = True,
+                 lookup_cache = False, history = True, metrics = True,
+                 concurrency_limiter = False, result_cache = False, raw_responses = False, upload_registry = False):
+        """Sets up the Neplan SOAP WS and retuns the service object
+        use service.history to get last sent and received raw SOAP messages
+        wsdl_cache: True for the default WsdlCache, a WsdlCache object, or False to always download the WSDL
+        pool_maxsize: number of kept open connections to the server, should be at least the number of parallel calls
+        timeout: timeout for loading the WSDL, in seconds
+        operation_timeouts: dict of timeouts per operation class (lookup, export, analysis) or operation name, see DEFAULT_OPERATION_TIMEOUTS
+        keep_alive: reuse connections between calls
+        compression: allow gzip/deflate compressed responses
+        lookup_cache: True for a default LookupCache, a LookupCache object, or False to always ask the server for
+                      projects, zones, subareas and feeders
+        history: True for a default MessageHistory (last exchange, envelopes truncated above 64 kB), "errors" to keep only
+                 exchanges with a SOAP Fault, a dict of MessageHistory arguments (mode, max_body_size, maxlen), a
+                 MessageHistory object, or False to keep no messages
+        metrics: True to record every SOAP call in a new OperationMetrics (service.metrics), an OperationMetrics object
+                 to share it between services, or False for no metrics
+        concurrency_limiter: True for a new ConcurrencyLimiter adapting the calls in flight per operation class to latency
+                             and failures, a ConcurrencyLimiter object to share it between services, or False for no limit
+        result_cache: True for a ResultCache in the default cache directory, a directory path, a ResultCache object, or False
+                      to run every load flow on the server, see run_loadflow
+        raw_responses: the wrappers of the large operations in RAW_CLIENT_OPERATIONS return the plain structures of raw_call
+                       instead of zeep objects, service.raw calls any operation this way
+        upload_registry: True for an UploadRegistry in the default cache directory, a json file path, an UploadRegistry
+                         object, or False to upload boundary and list files on every CIMExport and import"""
+
+        super().__init__(server, username, crypted_password, debug, wsdl_cache, lookup_cache, history, metrics,
+                         concurrency_limiter, result_cache, raw_responses, upload_registry)
+
+        # Keep constructor arguments to set up the same service in worker processes
+        self._init_args   = (server, username, crypted_password)
+        self._init_kwargs = dict(debug=debug, wsdl_cache=wsdl_cache, pool_maxsize=pool_maxsize, timeout=timeout,
+                                 operation_timeouts=operation_timeouts, keep_alive=keep_alive, compression=compression,
+                                 lookup_cache=bool(lookup_cache),
+                                 history=history.options if isinstance(history, soap.MessageHistory) else history,
+                                 metrics=bool(metrics), concurrency_limiter=bool(concurrency_limiter), result_cache=result_cache,
+                                 raw_responses=raw_responses,
+                                 upload_registry=upload_registry.path if isinstance(upload_registry, UploadRegistry) else upload_registry)
+
+
+        # Suppress certificate validation
+        session = requests.Session()
+        session.verify = False # to enable http and non certified https connections
+
+        # Connection pool, one pool per host with pool_maxsize connections
+        adapter = soap.NeplanHTTPAdapter(ConnectionStats(), pool_connections=1, pool_maxsize=pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        self.adapter = adapter
+
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+
+        if not compression:
+            session.headers["Accept-Encoding"] = "identity"
+
+        # Setup of transport
+        transport = soap.NeplanTransport(session=session, timeout=timeout, operation_timeouts=dict(DEFAULT_OPERATION_TIMEOUTS, **(operation_timeouts or {})),
+                                       operation_class=get_operation_class, current_call=CURRENT_CALL)
+
+        # Use local copy of the WSDL if available
+        wsdl = self.wsdl_cache.document(self.wsdl_url, session) if self.wsdl_cache else self.wsdl_url
+
+        client = zeep.Client(wsdl, transport=transport, wsse=self.wsse, plugins=[self.history] if self.history else [],
+                        settings=zeep.settings.Settings(xml_huge_tree=True)) # Allow base64 results above 10 MB
+        client.debug = debug # Only on Kristjan machine this has effect (prints out all sent and recived messages, direct modification to zeep libary)
+        self._bind_service(client, zeep.proxy.ServiceProxy, soap.MeteredServiceProxy)
+
+        if debug:
+            print("INFO - Service created to {}".format(server))
+
+
+    def connection_stats(self):
+
+        """Returns counters of the HTTP session: requests, new_connections and reused_connections"""
+
+        return self.adapter.connection_stats.as_dict()
+
+
+    def _slot(self, operation_name):
+
+        """Returns the context manager holding a slot of concurrency_limiter for a call of the operation"""
+
+        return self.concurrency_limiter.slot(operation_name) if self.concurrency_limiter else nullcontext()
+
+
+    def stream_upload(self, operation_name, file_path):
+
+        """Calls an upload operation (ZipUpload, XMLUpload) with the file as stream argument and returns the upload name,
+        the file is read and sent in chunks, memory use does not grow with the file size"""
+
+        with self._slot(operation_name), self._measure(operation_name):
+            address, body, http_headers = self._upload_body(operation_name, file_path)
+            response = self.client.transport.post(address, body, http_headers)
+
+            return self._process_reply(operation_name, response)
+
+
+    def registered_upload(self, operation_name, file_path, upload_registry=None):
+
+        """Uploads the file with stream_upload unless upload_registry knows an upload name of the same content on this
+        server, returns (upload name, sha1 of the file if the name was reused else None)
+        upload_registry: used instead of the upload_registry of the service, e.g. one of a batch"""
+
+        registry = upload_registry or self.upload_registry
+
+        if not registry:
+            return self.stream_upload(operation_name, file_path), None
+
+        digest = registry.file_hash(file_path)
+        file_bytes = os.path.getsize(file_path)
+
+        with registry.pending(self.server, operation_name, digest):
+            upload_name = registry.get(self.server, operation_name, digest, file_bytes)
+
+            if upload_name:
+                return upload_name, digest
+
+            upload_name = self.stream_upload(operation_name, file_path)
+            registry.put(self.server, operation_name, digest, upload_name, file_bytes)
+
+        return upload_name, None
+
+
+    def with_upload(self, operation_name, file_path, call, rejected=None, upload=None, upload_registry=None):
+
+        """Returns call(upload name) for the file uploaded with operation_name, see registered_upload. If the server rejects
+        a reused upload name, with a SOAP Fault or rejected(result) true, the file is uploaded again and call repeated once.
+        upload: function used instead of registered_upload, e.g. to hold a slot while uploading
+        upload_registry: used instead of the upload_registry of the service"""
+
+        registry = upload_registry or self.upload_registry
+        upload = upload or (lambda operation_name, file_path: self.registered_upload(operation_name, file_path, registry))
+
+        for attempt in range(2):
+            upload_name, digest = upload(operation_name, file_path)
+
+            try:
+                result = call(upload_name)
+            except zeep.exceptions.Fault:
+                if digest is None or attempt:
+                    raise
+            else:
+                if digest is None or attempt or not (rejected and rejected(result)):
+                    return result
+
+            print("WARNING - Upload {} of {} rejected by the server, uploading again".format(upload_name, file_path))
+            registry.invalidate(self.server, operation_name, digest, rejected=True)
+
+
+    def stream_download(self, operation_name, file_path, *args, **kwargs):
+
+        """Calls an operation returning a file (CIMExport, GetAnalysisResultFile) and writes the decoded result to file_path
+        while it is received, returns the number of written bytes. The response is not kept in history."""
+
+        with open(file_path, "wb") as file_object:
+            parser = etree.XMLParser(target=Base64StreamTarget(file_object, operation_name + "Result"), huge_tree=True)
+
+            return self.stream_parse(operation_name, parser, lambda result: file_object.write(result or b""), *args, **kwargs)
+
+
+    def stream_parse(self, operation_name, parser, from_reply, *args, **kwargs):
+
+        """Calls the operation and feeds the response to parser while it is received, returns parser.close().
+        parser is an lxml parser or an object with feed() and close(), like ElementResultReader. Faults and MTOM
+        responses are handled by zeep, from_reply is then called with the deserialized result and its return value
+        returned. The response is not kept in history."""
+
+        with self._slot(operation_name), self._measure(operation_name) as call:
+            address, message, http_headers = self._stream_message(operation_name, *args, **kwargs)
+            transport = self.client.transport
+
+            if call:
+                call.sent(len(message))
+
+            with transport.session.post(address, data=message, headers=http_headers, stream=True,
+                                        timeout=transport.get_operation_timeout(http_headers)) as response:
+
+                if response.status_code != 200 or "multipart" in response.headers.get("Content-Type", ""):
+                    if call:
+                        call.received(len(response.content))
+                    return from_reply(self._process_reply(operation_name, response))
+
+                response_bytes = 0
+
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    response_bytes += len(chunk)
+                    parser.feed(chunk)
+
+                if call:
+                    call.received(response_bytes)
+
+                return parser.close()
+
+
+    def raw_call(self, operation_name, *args, output="dict", **kwargs):
+
+        """Calls the operation without building zeep objects from the response
+        output: "dict" for the plain structure of RAW_OPERATIONS (lists, tuples, dicts and str) built by the compiled
+                extractor of the operation, "tree" for the lxml {operation}Response element
+        SOAP faults raise zeep Fault, other HTTP errors and MTOM responses are handled by zeep. The response is not
+        kept in history."""
+
+        with self._slot(operation_name), self._measure(operation_name) as call:
+            address, message, http_headers = self._stream_message(operation_name, *args, **kwargs)
+            transport = self.client.transport
+
+            if call:
+                call.sent(len(message))
+
+            response = transport.session.post(address, data=message, headers=http_headers, timeout=transport.get_operation_timeout(http_headers))
+
+            if call:
+                call.received(len(response.content))
+
+            if response.status_code not in (200, 500) or "multipart" in response.headers.get("Content-Type", ""):
+                return self._process_reply(operation_name, response)
+
+            element = raw_response(response.content, operation_name)
+
+            return element if output == "tree" else raw_extractor(operation_name)(element)
+
+
+    def _call(self, operation_name, *args):
+
+        """Calls the operation with zeep, with raw_responses operations of RAW_CLIENT_OPERATIONS with raw_call"""
+
+        if self.raw_responses and operation_name in RAW_CLIENT_OPERATIONS:
+            return self.raw_call(operation_name, *args)
+
+        return getattr(self.service, operation_name)(*args)
+
+
+    def _cached(self, key, operation_name, *args):
+
+        """Returns the result of the SOAP operation from lookup_cache, calls the server only on a miss, None is not cached"""
+
+        if self.lookup_cache:
+            found, value = self.lookup_cache.get(key)
+            if found:
+                return value
+
+        value = getattr(self.service, operation_name)(*args)
+
+        if self.lookup_cache and value is not None:
+            self.lookup_cache.set(key, value)
+
+        return value
+
+
+    # HELPER FUNCTIONS - END
+
+
+    def WriteMessageToLogFile(self, project, message_text, log_level_text = "Info"):
+        """Writes a message to the user log file, by default the log level is Info
+        WriteMessageToLogFile(project: ns2:ExternalProject, text: xsd:string, logLvl: xsd:string)"""
+
+        self.service.WriteMessageToLogFile(project, message_text, log_level_text)
+
+    # VARIABLES start
+    class networkTypeGroup(Enum):
+        Network             = 0
+        Feeder              = 1
+        Zone                = 2
+        Area                = 3
+        Subarea             = 4
+        TieFlowBetweenZones = 5
+        TieFlowBetweenAreas = 6
+        VoltageLevel        = 7
+
+    class phase(Enum):
+        L1L2L3N     = 0
+        L1N         = 1
+        L2N         = 2
+        L3N         = 3
+        L1L2N       = 4
+        L1L3N       = 5
+        L2L3N       = 6
+        L1L2L3N_AS  = 7
+
+    class portNr(Enum):
+        first   = 0
+        second  = 1
+        third   = 2
+        fourth  = 3
+
+    class units(Enum):
+        HV = 0
+        LV = 1
+
+    class analysisType:
+
+        __DistrictHeatingAnalysis_string    = """DistrictHeating, DistrictHeating2DProfile, DistrictHeatingContingencyAnalysis, DistrictHeatingTimeSimulation, DistrictHeatingTransientAnalysis"""
+        DistrictHeatingAnalysis             = Enum('DistrictHeatingAnalysis', dict((item, item) for item in re.sub('\s+', '',__DistrictHeatingAnalysis_string).split(",")))
+
+        __GasAnalysis_string                = """Gas, Gas2DProfile, GasContingencyAnalysis, GasTimeSimulation, GasTransientAnalysis, InteractiveDistributionGW, PressureProfileGW, TimeDistributionGW"""
+        GasAnalysis                         = Enum('GasAnalysis', dict((item, item) for item in re.sub('\s+', '',__GasAnalysis_string).split(",")))
+
+        __PowerSystemAnalysis_string        = """ArcFlash, CableSizing,
+                                                CapacitorPlacement, CircuitBreakerPlacement, ContingencyAnalysis,
+                                                DistanceProtection, DynamicAnalysis, ExpressFeeder, FaultFinding,
+                                                FeederReinforcement, FlickerAnalysis, GroundingSystemAnalysis,
+                                                HarmonicAnalysis, HostingCapacity, InvestmentAnalysis, LoadFlow,
+                                                LoadFlowTimeSimulation, LowVoltageCalculation,
+                                                MotorStartingAnalysis, NeplanDach, NetworkReduction, NTC,
+                                                OptimalPowerFlow, OvercurrentProtection, PhaseSwapping,
+                                                PipeTypeOptimization, PoleStrengthCalculation, PortionOfFeeders,
+                                                PowerSystemAssessmentERIS, Reliability, Resupply, ShortCircuit,
+                                                SmallSignalStability, SwitchingOptimization, ThermalAnalysis,
+                                                VoltageRegulatorPlacement, VoltageStability"""
+        PowerSystemAnalysis                 = Enum('PowerSystemAnalysis', dict((item, item) for item in re.sub('\s+', '', __PowerSystemAnalysis_string).split(",")))
+
+        __WaterAnalysis_string              = """FireWater, InteractiveDistributionGW,
+                                                PressureProfileGW, TimeDistributionGW, Water, Water2DProfile,
+                                                WaterContingencyAnalysis, WaterTimeSimulation,
+                                                WaterTransientAnalysis"""
+        WaterAnalysis                       = Enum('WaterAnalysis', dict((item, item) for item in re.sub('\s+', '', __WaterAnalysis_string).split(",")))
+
+
+    class elementType:
+
+        __DistrictHeatingAnalysis_string    = """HeatingCentrifugalPump,
+                                                HeatingCirculationPump, HeatingFitting, HeatingLoad,
+                                                HeatingNode, HeatingPipe, HeatingPlant, HeatingPressureRegulator,
+                                                HeatingShutOffValve, HeatingSpecialLoad, HeatingStation,
+                                                HeatingValve"""
+        DistrictHeatingAnalysis             = Enum('DistrictHeatingAnalysis', dict((item, item) for item in re.sub('\s+', '',__DistrictHeatingAnalysis_string).split(",")))
+
+        __GasAnalysis_string                = """GasCentrifugalPump, GasCirculationPump,
+                                                GasFitting, GasNode, GasPipe, GasPressureRegulator,
+                                                GasShutOffValve, GasSpecialLoad, GasStation, GasValve,
+                                                Trafo2WindingAsym"""
+        GasAnalysis                         = Enum('GasAnalysis', dict((item, item) for item in re.sub('\s+', '',__GasAnalysis_string).split(",")))
+
+        __PowerSystemAnalysis_string        = """ACCompressedAirEnergyStorage,
+                                                ACDisperseGenerator, ACFlyWheel, AsynchronousMachine, Busbar,
+                                                BusbarCoupler, CircuitBreaker, CircuitBreakerOnElem,
+                                                CompositeLoad, CurrentTransformer, CustomerConnection,
+                                                DCBattery, DCConverter, DCConverter3Pole, DCFlyWheel,
+                                                DCFuelCell, DCGround, DCLine, DCLoad, DCMotor, DCNode,
+                                                DCPhotoVoltaic, DCReactor, DCShunt, DCVoltageSource, DFIG,
+                                                DisconnectSwitch, DisconnectSwitchOnElem, DistanceRelais,
+                                                EarthingSystem, EarthSwitch, EnergyStorage, EquivalentSerieLF,
+                                                EquivalentSerieSC, EquivalentShuntLF, EquivalentShuntSC,
+                                                ExternalGrid, FaultIndicator, Filter, FrequencyRelais, FunctionBlock,
+                                                Fuse, GenericModel, GroundElement, HarmonicCurrentSource,
+                                                HarmonicVoltageSource, Inertia, Line, LineAsym, LineCoupling,
+                                                LineSection, Load, LoadSwitch, LoadSwitchOnElem,
+                                                MeasurementDevice, MechanicalLoad, MinMaxRelaisOnLink,
+                                                MinMaxRelaisOnNode, MultiFunctionProtection, NestedBlockCCT,
+                                                OvercurrentRelais, ParallelRLC, PoleSlipRelais, PowerRelais, PWM,
+                                                PWM3Pole, Pylon, Reactor, Regulator, SerieEarthRLC, SerieRLC,
+                                                SerieTransformator, Shunt, STATCOM, Station, SurgeArrester, SVC,
+                                                SynchronousMachine, Table, TCSC, Trafo2Winding, Trafo3Winding,
+                                                Trafo4Winding, TrafoRegulator, UPFC, UserDefinedPort0,
+                                                UserDefinedPort1, UserDefinedPort2, UserDefinedPort3,
+                                                UserDefinedPort4, VoltageRelais, VoltageTransformer"""
+        PowerSystemAnalysis                 = Enum('PowerSystemAnalysis', dict((item, item) for item in re.sub('\s+', '', __PowerSystemAnalysis_string).split(",")))
+
+        __WaterAnalysis_string              = """WaterCentrifugalPump, WaterCirculationPump,
+                                                WaterFitting, WaterHydrant, WaterNode, WaterPipe,
+                                                WaterReservoir, WaterShutOffValve, WaterSpecialLoad,
+                                                WaterStation, WaterValve"""
+        WaterAnalysis                       = Enum('WaterAnalysis', dict((item, item) for item in re.sub('\s+', '', __WaterAnalysis_string).split(",")))
+
+    # NATIVE FUNCTIONS - START
+
+
+    def GetAllFeeders(self, project):
+        """Get all feeders of the project"""
+        return self._cached(("GetAllFeeders", project_key(project)), "GetAllFeeders", project)
+
+    def GetAllSubAreas(self, project):
+        """Get all subareas of the project, also fills the lookup cache of both directions"""
+        subareas = self._cached(("GetAllSubAreas", project_key(project)), "GetAllSubAreas", project)
+        self._warm_lookups(project, "SubArea", subareas)
+        return subareas
+
+    def GetAllZones(self, project):
+        """Get all zones of the project, also fills the lookup cache of both directions"""
+        zones = self._cached(("GetAllZones", project_key(project)), "GetAllZones", project)
+        self._warm_lookups(project, "Zone", zones)
+        return zones
+
+    def GetAllElementResults(self, project, analysisType = "LoadFlow"):
+        """Gets a list of all element resultst, with raw_responses as (ElementID, ElementName, ElementType, {result key: value}) tuples"""
+        return self._call("GetAllElementResults", project, analysisType)
+
+    def GetAllElementsOfElementType(self, project, elementType="Line"):
+        """Gets a list of all elements of the selected element type in a project
+        elementType: member of the elementType enums or its name, unknown element types raise ValueError"""
+
+        return self.service.GetAllElementsOfElementType(project, element_type_name(elementType), {}, {})
+
+    def GetElementTables(self, project, element_types=None, analysisType="LoadFlow", results=True, max_workers=8):
+        """Returns ElementTables with an ElementTable of IDs, names and result columns per element type
+
+        element_types: members of elementType.PowerSystemAnalysis (or their names), by default the types of the project
+        results: also read GetAllElementResults of analysisType into float64 columns
+        The elements of every type are fetched in parallel, at most max_workers calls at the same time. The results are
+        one call for the whole project, it runs at the same time and is read into columns while it is received."""
+
+        element_types = [element_type_name(element_type) for element_type in element_types] if element_types else self.GetElementCatalog(project).type_names
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            if results:
+                reader = ElementResultReader(element_types)
+                result_future = executor.submit(self.stream_parse, "GetAllElementResults", reader, reader.from_reply, project, analysisType)
+
+            element_futures = {element_type: executor.submit(self.GetAllElementsOfElementType, project, element_type) for element_type in element_types}
+
+            columns = result_future.result() if results else {}
+            tables = ElementTables()
+            for element_type, future in element_futures.items():
+                response = future.result()
+                tables[element_type] = ElementTable.from_results(element_type, string_items(response.elementIDs), string_items(response.elementNames),
+                                                                 columns.get(element_type))
+
+        return tables
+
+    def GetAllElementsOfProject(self, project):
+        """Returns all elements of given project in a dataframe, with columns [ID, NAME, TYPE]
+        The elements are cached per project variant, see GetElementCatalog. The dataframe is the cached one and must be
+        treated as read-only, use .copy() before changing it"""
+
+        return self.GetElementCatalog(project).dataframe
+
+    def GetElementCatalog(self, project, refresh=False):
+        """Returns the ElementCatalog of the project variant, the catalog is downloaded only once per (ProjectID, VariantID)
+        use refresh=True or invalidate_element_catalog after changing the elements of the project"""
+
+        key = (project.ProjectID, project.VariantID)
+
+        with self._element_catalogs_lock:
+            catalog = None if refresh else self._element_catalogs.get(key)
+
+        if catalog is None:
+            # Get all element data
+            #CIM_ID_dict = self.service.GetNeplanIDtoCimIDDictionary(project)
+            #EIC_ID_dict = self.service.GetNeplanIDtoEICodeDictionary(project)
+            Name_Type_dict = self._call("GetAllElementsOfProject", project, {}, {})
+            catalog = ElementCatalog.from_response(Name_Type_dict)
+
+            with self._element_catalogs_lock:
+                self._element_catalogs[key] = catalog
+
+        return catalog
+
+    def project_change_marker(self, project):
+        """Returns a marker of the element structure of the project variant, the fingerprint of the freshly downloaded ElementCatalog.
+        It detects added, removed, renamed and retyped elements but not changed element parameters, so it is no
+        change_marker for result_cache on its own, and it downloads all elements of the project"""
+
+        return self.GetElementCatalog(project, refresh=True).fingerprint()
+
+    def GetAnalysisResultFile(self, fileName):
+        """Retruns analysis result file defined in: analysis_result.ResultFilename
+        GetAnalysisResultFile(fileName: xsd:string) -> GetAnalysisResultFileResult: ns5:StreamBody"""
+
+        analysis_result_string = self.service.GetAnalysisResultFile(fileName)
+        #print(analysis_result_string) # Quite big xml, not reasonable to export it
+
+        return analysis_result_string
+
+    def GetAnaylsisLogFile(self, fileName):
+        """Retruns analysis log file defined in: analysis_result.LogFilename
+        GetAnaylsisLogFile(fileName: xsd:string) -> GetAnaylsisLogFileResult: ns5:StreamBody"""
+
+        return self.service.GetAnaylsisLogFile(fileName)
+
+
+    def GetCalcParameterAttributes(self, project, analysisType="LoadFlow"):
+        """Returns parameters  of  the  given  analysis  type  for the given project"""
+        # TODO validate the analysisType
+        return self._call("GetCalcParameterAttributes", project, analysisType)
+
+    def GetCalcParameterAttributesDescription(self, analysisType="LoadFlow"):
+        """Returns parameters  of  the  given  analysis  type  for the given project"""
+        # TODO validate the analysisType
+        # TODO report that description is missing
+        return self._call("GetCalcParameterAttributesDescription", analysisType)
+
+
+    def GetProject(self, projectName= "", variantName= "",  diagramName= "", layerName= ""):
+
+        """Gets a project based on the name
+           GetProject(projectName: xsd:string, variantName: xsd:string, diagramName: xsd:string, layerName: xsd:string) -> GetProjectResult: ns2:ExternalProject"""
+
+        if self.debug:
+            print("INFO - Getting project: {}".format(projectName))
+
+        key = ("GetProject", projectName, variantName,  diagramName, layerName)
+        project = self._cached(key, "GetProject", projectName, variantName,  diagramName, layerName)
+
+        if project is None or project.ProjectID is None:
+
+            if self.lookup_cache:
+                self.lookup_cache.delete(key)
+
+            print(locals())
+            print('ERROR - Project not found')
+
+        return project
+
+    def GetProjects(self):
+
+        """Gets a project based on the name
+           GetProject(projectName: xsd:string, variantName: xsd:string, diagramName: xsd:string, layerName: xsd:string) -> GetProjectResult: ns2:ExternalProject"""
+
+        if self.debug:
+            print("INFO - Getting all projects")
+
+        projects = self._call("GetProjects")
+
+        if projects is None :
+
+            print(locals())
+            print('ERROR - ')
+
+        return projects
+
+    def GetLogFileAsList(self, print_log=False):
+        """Returns whole user activity logfile as a list"""
+        log_list = self.service.GetLogFileAsList()
+
+        if print_log:
+            for entry in log_list:
+                print(entry)
+
+        return log_list
+
+
+    def GetLogFileAsString(self):
+        """Returns whole user activity logfile as a string"""
+
+        return self.service.GetLogFileAsString()
+
+    def GetLogOnSessionID(self, project=""):
+        """Get the session id for login to NEPLAN. Add the session id to the base url of NEPLAN"""
+
+        return self.service.GetLogOnSessionID(project)
+
+    def GetLogOnUrl(self):
+        """returns logon url for the current user session
+        GetLogOnUrl() -> GetLogOnUrlResult: xsd:string"""
+
+        localhost_url = self.service.GetLogOnUrl()
+
+        updated_url = self.update_url_to_current_server(localhost_url)
+
+        return updated_url
+
+
+    def GetLogOnUrlWithProject(self, project):
+        """returns logon url for the current user session and project
+        GetLogOnUrlWithProject(project: ns2:ExternalProject) -> GetLogOnUrlWithProjectResult: xsd:string"""
+
+        localhost_url = self.service.GetLogOnUrlWithProject(project)
+
+        updated_url = self.update_url_to_current_server(localhost_url)
+
+        return updated_url
+
+
+    def AnalyseVariant(self, project, analysisRefenceID= None, analysisModule = "LoadFlow", calcNameID = "", analysisMethode = "", conditions = "", analysisLoadOptionXML = ""):
+
+        """ This function runs selected analyses on loaded project, by default LoadFlow -> returns: analysis_variant_result
+        AnalyseVariant(project: ns2:ExternalProject, analysisRefenceID: xsd:string, analysisModule: xsd:string, calcNameID: xsd:string, analysisMethode: xsd:string, conditions: xsd:string, analysisLoadOptionXML: xsd:string) -> AnalyseVariantResult: ns2:AnalysisReturnInfo"""
+
+        if analysisRefenceID is None:
+            analysisRefenceID = str(uuid4())
+
+        analysis_variant_result = self.service.AnalyseVariant(project, analysisRefenceID, analysisModule, calcNameID, analysisMethode, conditions, analysisLoadOptionXML)
+
+        return analysis_variant_result
+
+    def GetSubAreaIDByName(self, project, subAreaName):
+        """Get the subarea ID of the given subarea name"""
+        return self._cached(("GetSubAreaIDByName", project_key(project), subAreaName), "GetSubAreaIDByName", project, subAreaName)
+
+    def GetSubAreaNameByID(self, project, subAreaID):
+        """Get the subarea name of the given subarea ID"""
+        return self._cached(("GetSubAreaNameByID", project_key(project), subAreaID), "GetSubAreaNameByID", project, subAreaID)
+
+    def GetZoneIDByName(self, project, zoneName):
+        """Get the Zone ID of the given Zone name"""
+        return self._cached(("GetZoneIDByName", project_key(project), zoneName), "GetZoneIDByName", project, zoneName)
+
+    def GetZoneNameByID(self, project, zoneID):
+        """Get the Zone name of the given Zone ID"""
+        return self._cached(("GetZoneNameByID", project_key(project), zoneID), "GetZoneNameByID", project, zoneID)
+
+
+    # NATIVE FUNCTIONS - END
+
+    # CUSTOM FUNCTIONS - START
+
+    def _timed(self, function, *args):
+
+        """Calls function and returns its result and duration in seconds"""
+
+        start_time = time.perf_counter()
+        result = function(*args)
+
+        return result, time.perf_counter() - start_time
+
+
+    def run_loadflow(self, project_name, operational_state_name = "", analysis_slots = None, download_log = True,
+                     analysis_methode = "", conditions = "", analysis_load_option_xml = "", refresh = False, change_marker = None):
+        """Run basic loadflow analyses, operational state name is optional.
+        analysis_slots is an optional semaphore limiting the number of parallel AnalyseVariant calls on the server
+        Log and result file are downloaded in parallel, with download_log = False the log is not downloaded (process_log is None)
+
+        With a result_cache the files of an earlier run with the same inputs are returned without running the analysis,
+        analysis_response is then an AnalysisInfo. refresh = True runs the analysis again and replaces the cached files.
+        change_marker identifies the state of the project (e.g. a model version) and is required with a result_cache, runs
+        with a changed marker are not served from the cache. False keys on the variant only.
+
+        Input : project_name, operational_state_name = "", analysis_slots = None, download_log = True,
+                analysis_methode = "", conditions = "", analysis_load_option_xml = "", refresh = False, change_marker = None
+        Output: results_xml, analysis_response, project, process_log"""
+
+        # START TIMER
+        start_time = datetime.now()
+
+        # Get project and run loadflow
+        project           = self.GetProject(project_name)
+        _,start_time = self.print_duration("Project Loaded -> ", start_time)
+
+        cache_key = None
+        if self.result_cache:
+            if change_marker is None:
+                raise ValueError("run_loadflow with result_cache needs a change_marker of the project state")
+
+            cache_key = self.result_cache.key(self.server, project, "LoadFlow", operational_state_name, analysis_methode, conditions,
+                                              analysis_load_option_xml, change_marker)
+            cached = None if refresh else self.result_cache.get(cache_key)
+
+            # Entries without log are only used if no log is requested
+            if cached and (cached[2] is not None or not download_log):
+                analysis_response, results_xml, process_log = cached
+                print("INFO - Load flow results from cache: {} / {}".format(project_name, operational_state_name or "-"))
+                return results_xml, analysis_response, project, process_log
+
+        with analysis_slots or nullcontext():
+            analysis_response = self.AnalyseVariant(project, analysisModule = "LoadFlow", calcNameID = operational_state_name, analysisMethode = analysis_methode,
+                                                    conditions = conditions, analysisLoadOptionXML = analysis_load_option_xml)
+        _,start_time = self.print_duration("Load Flow finished -> ", start_time)
+
+        # Get analysis process log and result file in parallel, logon url is only needed without result file
+        with ThreadPoolExecutor(max_workers=2) as executor:
+
+            log_future = executor.submit(self._timed, self.GetAnaylsisLogFile, analysis_response.LogFilename) if download_log else None
+
+            if analysis_response.ResultFilename:
+                results_future = executor.submit(self._timed, self.GetAnalysisResultFile, analysis_response.ResultFilename)
+            else:
+                results_future = executor.submit(self._timed, self.GetLogOnUrlWithProject, project)
+
+            results_xml, download_time = results_future.result()
+            process_log, log_download_time = log_future.result() if log_future else (None, 0)
+
+        downloads_duration, start_time = self.print_duration("Log and results file retrived -> ", start_time)
+        self.print_duration_saved(download_time + log_download_time, downloads_duration)
+
+        if not analysis_response.ResultFilename:
+            project_logon_url, results_xml = results_xml, None
+
+        if results_xml:
+            print("XML Result File received")
+            #results_xml = etree.fromstring(results_xml)
+
+            if cache_key:
+                self.result_cache.put(cache_key, analysis_response, results_xml, process_log)
+
+        else:
+            if analysis_response.ResultFilename:
+                project_logon_url = self.GetLogOnUrlWithProject(project)
+            print("No XML results returned, you haven't enabled 'Write XML result file' under Parameters->Storage/Messages.\n You can use this url to open the project: {}".format(project_logon_url))
+
+
+        return results_xml, analysis_response, project, process_log
+
+    def GetAnalysisResultTables(self, fileName, tables=None):
+        """Returns the analysis result file defined in: analysis_result.ResultFilename parsed into DataFrames per table
+        (node, branch, losses, other element types), see parse_result_file"""
+
+        return parse_result_file(self.GetAnalysisResultFile(fileName) or b"<Results/>", tables=tables)
+
+    def CIMExport(self, project, file_path="Export.zip",
+                  ENTSOEZIP=True,
+                  ExportEQ=True,
+                  ExportSSH=True,
+                  ExportTP=True,
+                  ExportSV=True,
+                  ExportMerged=False,
+                  ExportDL=False,
+                  ExportGL=False,
+                  ExportDY=False,
+                  ExportSVShortCircuit=False,
+                  BoundaryPath=None,
+                  BoundaryAreaName="EU",
+                  DynamicLineRatingPath=None,
+                  MAS="",
+                  Period="1D",
+                  ScenarioDateTime=None,
+                  Version="001",
+                  Description="Neplan Export",
+                  ExportAsCGMES3=False,
+                  ExportBoundary=False,
+                  FileHeaderComment="OPDE Confidential",
+                  IsAutomatedExport=True,
+                  EqFileCIMID=False,
+                  KeepEQIDConstant=True,
+                  AreasToExport=[],
+                  AreasToExportNames=[],
+                  ListOfMASForSVExport=[],
+                  BalticCGMArea=None,
+                  BalticRSCExport=False,
+                  ExcludeBRELL=True,
+                  runPowerFlow=False,
+                  operationalState=None
+                  ):
+
+        """Performs CIM export on the specified project, exports all CIM files to defined filepath, by default 'Export.zip'
+        With upload_registry the boundary zip is uploaded only once per content and server, ScenarioDateTime None is the time of the call"""
+
+        def export(boundary_upload):
+
+            CIMOptions = self.cim_export_options(AreasToExport=AreasToExport,
+                                                 AreasToExportNames=AreasToExportNames,
+                                                 BalticCGMArea=BalticCGMArea,
+                                                 BalticRSCExport=BalticRSCExport,
+                                                 BoundaryAreaName=BoundaryAreaName,
+                                                 BoundaryPath=boundary_upload,
+                                                 Description=Description,
+                                                 DynamicLineRatingPath=DynamicLineRatingPath,
+                                                 ENTSOEZIP=ENTSOEZIP,
+                                                 EqFileCIMID=EqFileCIMID,
+                                                 ExcludeBRELL=ExcludeBRELL,
+                                                 ExportAsCGMES3=ExportAsCGMES3,
+                                                 ExportBoundary=ExportBoundary,
+                                                 ExportDL=ExportDL,
+                                                 ExportDY=ExportDY,
+                                                 ExportEQ=ExportEQ,
+                                                 ExportGL=ExportGL,
+                                                 ExportMerged=ExportMerged,
+                                                 ExportSSH=ExportSSH,
+                                                 ExportSV=ExportSV,
+                                                 ExportSVShortCircuit=ExportSVShortCircuit,
+                                                 ExportTP=ExportTP,
+                                                 FileHeaderComment=FileHeaderComment,
+                                                 IsAutomatedExport=IsAutomatedExport,
+                                                 KeepEQIDConstant=KeepEQIDConstant,
+                                                 ListOfMASForSVExport=ListOfMASForSVExport,
+                                                 MAS=MAS,
+                                                 Period=Period,
+                                                 ScenarioDateTime=ScenarioDateTime,
+                                                 Version=Version)
+
+            print("INFO - exporting CIM data to {}".format(file_path))
+            return self.stream_download("CIMExport", file_path, project, CIMOptions, operationalState=operationalState, runPowerFlow=runPowerFlow)
+
+        if BoundaryPath:
+            print("Uploading boundary to Neplan")
+            written_bytes = self.with_upload("ZipUpload", BoundaryPath, export)
+        else:
+            written_bytes = export(None)
+
+        if written_bytes == 0:
+            print("ERROR - Exported file is empty: {}".format(file_path))
+            return False
+        else:
+            return True
+
+
+    def Import_from_List_files(self, inputFiles, projectName=None, copySettingsFromProjectName="test"):
+        """Import NeplanList Files to Neplan from local path, see import_files_batch for many files"""
+        # If no project name has been provided, create one automatically based on first provided filename
+        file_path = pathlib.Path(inputFiles)
+        projectName = projectName or file_path.stem
+        print(f'Importing to {projectName} file {inputFiles}.')
+        if file_path.exists():
+            def import_file(response_filename):
+                print(f"Filename {response_filename}")
+                return self.service.ImportFromListFile(uploadName=response_filename, projectName=projectName, copySettingsFromProjectName=copySettingsFromProjectName)
+
+            try:
+                response = self.with_upload("XMLUpload", file_path, import_file, lambda response: not response.success)
+            except zeep.exceptions.Fault as fault:
+                if fault.detail is not None and len(fault.detail):
+                    print(self.wsdl.types.deserialize(fault.detail[0]))
+                else:
+                    print("ERROR - Import of {} failed: {}".format(inputFiles, fault.message))
+                self.print_last_messageexchange()
+                response = "ERROR"
+
+        else:
+            #print(f"Could not find {file_path}.")
+            response = "ERROR"
+        return response
+        
+
+    def DeleteMarkedAdDeletedProject(self):
+        """Delete Delete all the own projects marked as deleted.
+        As and admin all the projects marked as deleted will be deleted 
+        return = Number of deleted projects"""
+        response = self.service.DeleteMarkedAdDeletedProject()
+        return response
+
+    def CIMImport(self, projectName, inputFiles, isLocalPath=False):
+        """Import CIM files to Neplan"""
+
+        #array_of_strings = [{"string": file_path} for file_path in inputFiles]
+
+        response = self.service.CIMImport(inputFiles={"string":inputFiles},
+                                           isLocalPath=isLocalPath,
+                                           projectName=projectName,
+                                           userName=self.username)
+        return response
+
+    def run_loadflow_batch(self, jobs, output_dir, max_workers=4, max_analyses=None, use_processes=False, download_log=True,
+                           archive_dir=None, archive_format="parquet", refresh=False, diff_dir=None, change_marker=None):
+        """Runs load flows for a list of (project_name, operational_state_name) pairs in parallel.
+        Every finished result is written to output_dir immediately, see write_loadflow_result.
+
+        max_workers: number of worker threads or processes, pool_maxsize of the service should be at least this for threads
+        max_analyses: number of AnalyseVariant calls running on the server at the same time, by default max_workers
+        use_processes: use worker processes, each with its own NeplanService, instead of threads
+        download_log: also download and write the analysis log of every run
+        archive_dir: if given, parsed results of every run are also stored there, see archive_loadflow_results
+        archive_format: parquet or arrow
+        refresh: with a result_cache, run every load flow again instead of using cached results
+        change_marker: state of the projects for the keys of result_cache (e.g. a model version), required with a result_cache
+        diff_dir: if given, only the changes against the previous run of each project and operational state are stored there, see ResultDiffStore
+
+        Output: list of result dicts with project, operational_state, status (ok, no_result, failed), cached, duration, result_file, error
+                and changed_rows with diff_dir"""
+
+        return _run_loadflow_batch(self, jobs, output_dir, max_workers, max_analyses, use_processes, download_log, archive_dir, archive_format, refresh,
+                                   diff_dir, change_marker)
+
+    def import_files_batch(self, jobs, max_uploads=4, max_imports=2, copy_settings_from="test"):
+        """Imports many NeplanList files, each into its own project, uploads and imports of different files overlap.
+        XMLUpload runs for up to max_uploads files at the same time, every uploaded file is then queued for
+        ImportFromListFile, which runs for up to max_imports files at the same time. Uploads wait while all import slots
+        are taken, so files are not uploaded far ahead of their import.
+
+        jobs: list of (file path, project name) pairs, see read_import_jobs, without project name the file name is used
+        copy_settings_from: project whose settings are copied into the new projects
+        pool_maxsize of the service should be at least max_uploads + max_imports
+
+        Output: list of result dicts with file, project, status (ok, failed), created_project, bytes, upload_duration,
+                import_duration, duration, error"""
+
+        return _import_files_batch(self, jobs, max_uploads, max_imports, copy_settings_from)
+
+    def _import_job(self, upload_slots, import_slots, file_path, project_name, copy_settings_from):
+
+        return _run_import_job(self, upload_slots, import_slots, file_path, project_name, copy_settings_from)
+
+    def cim_export_batch(self, project_name, scenarios, output_dir, max_workers=4, refresh=False, BoundaryPath=None, runPowerFlow=False,
+                         operationalState=None, **options):
+        """Runs CIMExport of the project for every scenario, up to max_workers exports at the same time. Every export is
+        written to output_dir under cim_export_filename, exports whose file is already there are skipped, so a failed
+        batch can simply be started again.
+
+        scenarios: list of CimExportOptions per export, see cim_export_scenarios, repeated scenarios are exported once
+        refresh: export all scenarios again, also those already in output_dir
+        BoundaryPath: local boundary zip, uploaded once per server for the whole batch, with upload_registry once per content
+        options: CimExportOptions shared by all exports, checked once, see CIM_EXPORT_DEFAULTS
+        pool_maxsize of the service should be at least max_workers
+
+        Output: list of result dicts with project, scenario_time, period, areas, mas, status (ok, skipped, empty, failed),
+                file, bytes, duration, error"""
+
+        return _cim_export_batch(self, project_name, scenarios, output_dir, max_workers, refresh, BoundaryPath, runPowerFlow, operationalState, **options)
+
+    def _cim_export_job(self, project_name, scenario, file_path, base_options, job_options):
+
+        return _run_cim_export_job(self, project_name, scenario, file_path, base_options, job_options)
+
+
+class AsyncNeplanService(NeplanServiceBase):
+    """asyncio version of NeplanService, all SOAP wrapper methods are coroutines with the same arguments
+
+    At most max_concurrency SOAP calls are in flight at the same time, further calls wait for a free slot.
+    Use it as async context manager or call aclose() to close the connections. The batch methods of NeplanService
+    are not offered, gather the coroutines of single calls instead. follow_log returns a LogFollower read with apoll
+    and atail.
+
+        async with AsyncNeplanService(server, username, crypted_password, max_concurrency=50) as api:
+            project = await api.GetProject("Project")
+            results = await asyncio.gather(*[api.AnalyseVariant(project, calcNameID=name) for name in operational_states])
+    """
+
+    def __init__(self, server, username, crypted_password, debug = False, wsdl_cache = True, max_concurrency = 100,
+                 pool_maxsize = 100, timeout = 300, operation_timeouts = None, keep_alive = True, compression = True,
+                 lookup_cache = False, history = True, metrics = True,
+                 concurrency_limiter = False, result_cache = False, raw_responses = False, upload_registry = False):
+        """Sets up the async Neplan SOAP WS, arguments as for NeplanService
+        max_concurrency: number of SOAP calls in flight at the same time"""
+
+        if not httpx:
+            raise RuntimeError("AsyncNeplanService needs httpx, install zeep with async extras: pip install zeep[async]")
+
+        super().__init__(server, username, crypted_password, debug, wsdl_cache, lookup_cache, history, metrics,
+                         concurrency_limiter, result_cache, raw_responses, upload_registry)
+        self.adapter = None
+
+        # Async connection pool for operations, sync client only for loading the WSDL
+        limits = httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize if keep_alive else 0)
+        client = httpx.AsyncClient(verify=False, limits=limits)
+        wsdl_client = httpx.Client(verify=False, timeout=timeout)
+
+        # Setup of transport
+        transport = soap.NeplanAsyncTransport(client=client, wsdl_client=wsdl_client, timeout=timeout,
+                                            operation_timeouts=dict(DEFAULT_OPERATION_TIMEOUTS, **(operation_timeouts or {})),
+                                            operation_class=get_operation_class, current_call=CURRENT_CALL)
+
+        if not compression:
+            transport.client.headers["Accept-Encoding"] = "identity"
+
+        # Use local copy of the WSDL if available
+        wsdl = self.wsdl_url
+
+        if self.wsdl_cache:
+            session = requests.Session()
+            session.verify = False
+            wsdl = self.wsdl_cache.document(wsdl, session)
+            session.close()
+
+        client = zeep.AsyncClient(wsdl, transport=transport, wsse=self.wsse, plugins=[self.history] if self.history else [],
+                             settings=zeep.settings.Settings(xml_huge_tree=True))
+        self.transport = transport
+        self._bind_service(client, zeep.proxy.AsyncServiceProxy, soap.MeteredAsyncServiceProxy)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self._upload_locks = {} # sha1 of the file -> asyncio.Lock held while it is uploaded
+
+        if debug:
+            print("INFO - Async service created to {}".format(server))
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, exc_type=None, exc_value=None, traceback=None):
+        await self.aclose()
+
+
+    async def aclose(self):
+
+        """Closes all connections to the server"""
+
+        await self.transport.aclose()
+        self.transport.wsdl_client.close()
+
+
+    def connection_stats(self):
+
+        """Connection counters are not available for the httpx based client, returns None"""
+
+        return None
+
+
+    async def call(self, operation_name, *args, **kwargs):
+
+        """Calls the SOAP operation as soon as one of the max_concurrency slots is free, with raw_responses operations
+        of RAW_CLIENT_OPERATIONS with raw_call"""
+
+        if self.raw_responses and operation_name in RAW_CLIENT_OPERATIONS:
+            return await self.raw_call(operation_name, *args, **kwargs)
+
+        async with self.semaphore:
+            return await getattr(self.service, operation_name)(*args, **kwargs)
+
+
+    async def raw_call(self, operation_name, *args, output="dict", **kwargs):
+
+        """Calls the operation without building zeep objects from the response, see NeplanService.raw_call"""
+
+        async with self.semaphore, self._async_slot(operation_name):
+            with self._measure(operation_name) as call:
+                address, message, http_headers = self._stream_message(operation_name, *args, **kwargs)
+
+                if call:
+                    call.sent(len(message))
+
+                response = await self.transport.client.post(address, content=message, headers=http_headers,
+                                                            timeout=self.transport.get_operation_timeout(http_headers))
+
+                if call:
+                    call.received(len(response.content))
+
+                if response.status_code not in (200, 500) or "multipart" in response.headers.get("Content-Type", ""):
+                    return self._process_reply(operation_name, response)
+
+                element = raw_response(response.content, operation_name)
+
+                return element if output == "tree" else raw_extractor(operation_name)(element)
+
+
+    def _async_slot(self, operation_name):
+
+        """Returns the async context manager holding a slot of concurrency_limiter for a call of the operation"""
+
+        return self.concurrency_limiter.async_slot(operation_name) if self.concurrency_limiter else nullcontext()
+
+
+    async def stream_upload(self, operation_name, file_path):
+
+        """Calls an upload operation with the file as stream argument, the file is sent in chunks, see NeplanService.stream_upload"""
+
+        async with self.semaphore, self._async_slot(operation_name):
+            with self._measure(operation_name) as call:
+                address, body, http_headers = self._upload_body(operation_name, file_path)
+                headers = dict(http_headers, **{"Content-Length": str(len(body))})
+
+                async def content():
+                    for chunk in body:
+                        yield chunk
+
+                if call:
+                    call.sent(len(body))
+
+                response = await self.transport.client.post(address, content=content(), headers=headers,
+                                                            timeout=self.transport.get_operation_timeout(http_headers))
+
+                if call:
+                    call.received(len(response.content))
+
+                return self._process_reply(operation_name, response)
+
+
+
+    async def registered_upload(self, operation_name, file_path, upload_registry=None):
+
+        """Uploads the file unless upload_registry knows an upload name of the same content, see NeplanService.registered_upload"""
+
+        registry = upload_registry or self.upload_registry
+
+        if not registry:
+            return await self.stream_upload(operation_name, file_path), None
+
+        digest = await asyncio.to_thread(registry.file_hash, file_path)
+        file_bytes = os.path.getsize(file_path)
+
+        # Tasks with the same file wait for the first upload
+        async with self._upload_locks.setdefault(digest, asyncio.Lock()):
+            upload_name = registry.get(self.server, operation_name, digest, file_bytes)
+
+            if upload_name:
+                return upload_name, digest
+
+            upload_name = await self.stream_upload(operation_name, file_path)
+            await asyncio.to_thread(registry.put, self.server, operation_name, digest, upload_name, file_bytes)
+
+        return upload_name, None
+
+
+    async def with_upload(self, operation_name, file_path, call, rejected=None, upload=None, upload_registry=None):
+
+        """Returns await call(upload name) for the uploaded file, uploads again once if a reused upload name is rejected,
+        see NeplanService.with_upload"""
+
+        registry = upload_registry or self.upload_registry
+        upload = upload or (lambda operation_name, file_path: self.registered_upload(operation_name, file_path, registry))
+
+        for attempt in range(2):
+            upload_name, digest = await upload(operation_name, file_path)
+
+            try:
+                result = await call(upload_name)
+            except zeep.exceptions.Fault:
+                if digest is None or attempt:
+                    raise
+            else:
+                if digest is None or attempt or not (rejected and rejected(result)):
+                    return result
+
+            print("WARNING - Upload {} of {} rejected by the server, uploading again".format(upload_name, file_path))
+            await asyncio.to_thread(registry.invalidate, self.server, operation_name, digest, rejected=True)
+
+    async def stream_download(self, operation_name, file_path, *args, **kwargs):
+
+        """Calls an operation returning a file and writes the decoded result to file_path while it is received,
+        returns the number of written bytes, see NeplanService.stream_download"""
+
+        with open(file_path, "wb") as file_object:
+            parser = etree.XMLParser(target=Base64StreamTarget(file_object, operation_name + "Result"), huge_tree=True)
+
+            return await self.stream_parse(operation_name, parser, lambda result: file_object.write(result or b""), *args, **kwargs)
+
+
+    async def stream_parse(self, operation_name, parser, from_reply, *args, **kwargs):
+
+        """Calls the operation and feeds the response to parser while it is received, returns parser.close(),
+        see NeplanService.stream_parse"""
+
+        async with self.semaphore, self._async_slot(operation_name):
+            with self._measure(operation_name) as call:
+                address, message, http_headers = self._stream_message(operation_name, *args, **kwargs)
+
+                if call:
+                    call.sent(len(message))
+
+                async with self.transport.client.stream("POST", address, content=message, headers=http_headers,
+                                                        timeout=self.transport.get_operation_timeout(http_headers)) as response:
+
+                    # Faults and MTOM responses are handled by zeep
+                    if response.status_code != 200 or "multipart" in response.headers.get("Content-Type", ""):
+                        await response.aread()
+                        if call:
+                            call.received(len(response.content))
+                        return from_reply(self._process_reply(operation_name, response))
+
+                    response_bytes = 0
+
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        response_bytes += len(chunk)
+                        parser.feed(chunk)
+
+                    if call:
+                        call.received(response_bytes)
+
+                    return parser.close()
+
+
+    async def _cached(self, key, operation_name, *args):
+
+        """Returns the result of the SOAP operation from lookup_cache, calls the server only on a miss, None is not cached"""
+
+        if self.lookup_cache:
+            found, value = self.lookup_cache.get(key)
+            if found:
+                return value
+
+        value = await self.call(operation_name, *args)
+
+        if self.lookup_cache and value is not None:
+            self.lookup_cache.set(key, value)
+
+        return value
+
+
+    async def WriteMessageToLogFile(self, project, message_text, log_level_text = "Info"):
+        """Writes a message to the user log file, by default the log level is Info"""
+
+        await self.call("WriteMessageToLogFile", project, message_text, log_level_text)
+
+    # NATIVE FUNCTIONS - START
+
+    async def GetAllFeeders(self, project):
+        """Get all feeders of the project"""
+        return await self._cached(("GetAllFeeders", project_key(project)), "GetAllFeeders", project)
+
+    async def GetAllSubAreas(self, project):
+        """Get all subareas of the project, also fills the lookup cache of both directions"""
+        subareas = await self._cached(("GetAllSubAreas", project_key(project)), "GetAllSubAreas", project)
+        self._warm_lookups(project, "SubArea", subareas)
+        return subareas
+
+    async def GetAllZones(self, project):
+        """Get all zones of the project, also fills the lookup cache of both directions"""
+        zones = await self._cached(("GetAllZones", project_key(project)), "GetAllZones", project)
+        self._warm_lookups(project, "Zone", zones)
+        return zones
+
+    async def GetAllElementResults(self, project, analysisType = "LoadFlow"):
+        """Gets a list of all element resultst, with raw_responses as (ElementID, ElementName, ElementType, {result key: value}) tuples"""
+        return await self.call("GetAllElementResults", project, analysisType)
+
+    async def GetAllElementsOfElementType(self, project, elementType="Line"):
+        """Gets a list of all elements of the selected element type in a project"""
+        return await self.call("GetAllElementsOfElementType", project, element_type_name(elementType), {}, {})
+
+    async def GetElementTables(self, project, element_types=None, analysisType="LoadFlow", results=True):
+        """Returns ElementTables of the element types, all calls run at the same time, see NeplanService.GetElementTables"""
+
+        element_types = [element_type_name(element_type) for element_type in element_types] if element_types else (await self.GetElementCatalog(project)).type_names
+        calls = [self.GetAllElementsOfElementType(project, element_type) for element_type in element_types]
+
+        if results:
+            reader = ElementResultReader(element_types)
+            calls.append(self.stream_parse("GetAllElementResults", reader, reader.from_reply, project, analysisType))
+
+        responses = await asyncio.gather(*calls)
+        columns = responses.pop() if results else {}
+        tables = ElementTables()
+
+        for element_type, response in zip(element_types, responses):
+            tables[element_type] = ElementTable.from_results(element_type, string_items(response.elementIDs), string_items(response.elementNames),
+                                                             columns.get(element_type))
+
+        return tables
+
+    async def GetAllElementsOfProject(self, project):
+        """Returns all elements of given project in a dataframe, with columns [ID, NAME, TYPE], read-only as for
+        NeplanService.GetAllElementsOfProject"""
+
+        return (await self.GetElementCatalog(project)).dataframe
+
+    async def GetElementCatalog(self, project, refresh=False):
+        """Returns the cached ElementCatalog of the project variant, see NeplanService.GetElementCatalog"""
+
+        key = (project.ProjectID, project.VariantID)
+
+        with self._element_catalogs_lock:
+            catalog = None if refresh else self._element_catalogs.get(key)
+
+        if catalog is None:
+            Name_Type_dict = await self.call("GetAllElementsOfProject", project, {}, {})
+            catalog = ElementCatalog.from_response(Name_Type_dict)
+
+            with self._element_catalogs_lock:
+                self._element_catalogs[key] = catalog
+
+        return catalog
+
+    async def project_change_marker(self, project):
+        """Returns a marker of the current state of the project variant, see NeplanService.project_change_marker"""
+
+        return (await self.GetElementCatalog(project, refresh=True)).fingerprint()
+
+    async def GetAnalysisResultFile(self, fileName):
+        """Retruns analysis result file defined in: analysis_result.ResultFilename"""
+        return await self.call("GetAnalysisResultFile", fileName)
+
+    async def GetAnaylsisLogFile(self, fileName):
+        """Retruns analysis log file defined in: analysis_result.LogFilename"""
+        return await self.call("GetAnaylsisLogFile", fileName)
+
+    async def GetCalcParameterAttributes(self, project, analysisType="LoadFlow"):
+        """Returns parameters  of  the  given  analysis  type  for the given project"""
+        return await self.call("GetCalcParameterAttributes", project, analysisType)
+
+    async def GetCalcParameterAttributesDescription(self, analysisType="LoadFlow"):
+        """Returns parameters  of  the  given  analysis  type  for the given project"""
+        return await self.call("GetCalcParameterAttributesDescription", analysisType)
+
+    async def GetProject(self, projectName= "", variantName= "",  diagramName= "", layerName= ""):
+        """Gets a project based on the name"""
+
+        if self.debug:
+            print("INFO - Getting project: {}".format(projectName))
+
+        key = ("GetProject", projectName, variantName,  diagramName, layerName)
+        project = await self._cached(key, "GetProject", projectName, variantName,  diagramName, layerName)
+
+        if project is None or project.ProjectID is None:
+
+            if self.lookup_cache:
+                self.lookup_cache.delete(key)
+
+            print(locals())
+            print('ERROR - Project not found')
+
+        return project
+
+    async def GetProjects(self):
+        """Gets all projects"""
+
+        if self.debug:
+            print("INFO - Getting all projects")
+
+        projects = await self.call("GetProjects")
+
+        if projects is None :
+
+            print(locals())
+            print('ERROR - ')
+
+        return projects
+
+    async def GetLogFileAsList(self, print_log=False):
+        """Returns whole user activity logfile as a list"""
+        log_list = await self.call("GetLogFileAsList")
+
+        if print_log:
+            for entry in log_list:
+                print(entry)
+
+        return log_list
+
+    async def GetLogFileAsString(self):
+        """Returns whole user activity logfile as a string"""
+        return await self.call("GetLogFileAsString")
+
+    async def GetLogOnSessionID(self, project=""):
+        """Get the session id for login to NEPLAN. Add the session id to the base url of NEPLAN"""
+        return await self.call("GetLogOnSessionID", project)
+
+    async def GetLogOnUrl(self):
+        """returns logon url for the current user session"""
+
+        localhost_url = await self.call("GetLogOnUrl")
+
+        return self.update_url_to_current_server(localhost_url)
+
+    async def GetLogOnUrlWithProject(self, project):
+        """returns logon url for the current user session and project"""
+
+        localhost_url = await self.call("GetLogOnUrlWithProject", project)
+
+        return self.update_url_to_current_server(localhost_url)
+
+    async def AnalyseVariant(self, project, analysisRefenceID= None, analysisModule = "LoadFlow", calcNameID = "", analysisMethode = "", conditions = "", analysisLoadOptionXML = ""):
+        """ This function runs selected analyses on loaded project, by default LoadFlow -> returns: analysis_variant_result"""
+
+        if analysisRefenceID is None:
+            analysisRefenceID = str(uuid4())
+
+        return await self.call("AnalyseVariant", project, analysisRefenceID, analysisModule, calcNameID, analysisMethode, conditions, analysisLoadOptionXML)
+
+    async def GetSubAreaIDByName(self, project, subAreaName):
+        """Get the subarea ID of the given subarea name"""
+        return await self._cached(("GetSubAreaIDByName", project_key(project), subAreaName), "GetSubAreaIDByName", project, subAreaName)
+
+    async def GetSubAreaNameByID(self, project, subAreaID):
+        """Get the subarea name of the given subarea ID"""
+        return await self._cached(("GetSubAreaNameByID", project_key(project), subAreaID), "GetSubAreaNameByID", project, subAreaID)
+
+    async def GetZoneIDByName(self, project, zoneName):
+        """Get the Zone ID of the given Zone name"""
+        return await self._cached(("GetZoneIDByName", project_key(project), zoneName), "GetZoneIDByName", project, zoneName)
+
+    async def GetZoneNameByID(self, project, zoneID):
+        """Get the Zone name of the given Zone ID"""
+        return await self._cached(("GetZoneNameByID", project_key(project), zoneID), "GetZoneNameByID", project, zoneID)
+
+    async def DeleteMarkedAdDeletedProject(self):
+        """Delete all the own projects marked as deleted, returns number of deleted projects"""
+        return await self.call("DeleteMarkedAdDeletedProject")
+
+    async def CIMImport(self, projectName, inputFiles, isLocalPath=False):
+        """Import CIM files to Neplan"""
+        return await self.call("CIMImport", inputFiles={"string":inputFiles}, isLocalPath=isLocalPath, projectName=projectName, userName=self.username)
+
+    # NATIVE FUNCTIONS - END
+
+    # CUSTOM FUNCTIONS - START
+
+    async def _timed(self, coroutine):
+
+        """Awaits coroutine and returns its result and duration in seconds"""
+
+        start_time = time.perf_counter()
+        result = await coroutine
+
+        return result, time.perf_counter() - start_time
+
+    async def run_loadflow(self, project_name, operational_state_name = "", download_log = True,
+                           analysis_methode = "", conditions = "", analysis_load_option_xml = "", refresh = False, change_marker = None):
+        """Run basic loadflow analyses, operational state name is optional.
+        Log and result file are downloaded in parallel, with download_log = False the log is not downloaded (process_log is None)
+        result_cache, refresh and change_marker as for NeplanService.run_loadflow, cache files are read and written in a worker thread
+
+        Input : project_name, operational_state_name = "", download_log = True,
+                analysis_methode = "", conditions = "", analysis_load_option_xml = "", refresh = False, change_marker = None
+        Output: results_xml, analysis_response, project, process_log"""
+
+        # START TIMER
+        start_time = datetime.now()
+
+        # Get project and run loadflow
+        project           = await self.GetProject(project_name)
+        _,start_time = self.print_duration("Project Loaded -> ", start_time)
+
+        cache_key = None
+        if self.result_cache:
+            if change_marker is None:
+                raise ValueError("run_loadflow with result_cache needs a change_marker of the project state")
+
+            cache_key = self.result_cache.key(self.server, project, "LoadFlow", operational_state_name, analysis_methode, conditions,
+                                              analysis_load_option_xml, change_marker)
+            cached = None if refresh else await asyncio.to_thread(self.result_cache.get, cache_key)
+
+            # Entries without log are only used if no log is requested
+            if cached and (cached[2] is not None or not download_log):
+                analysis_response, results_xml, process_log = cached
+                print("INFO - Load flow results from cache: {} / {}".format(project_name, operational_state_name or "-"))
+                return results_xml, analysis_response, project, process_log
+
+        analysis_response = await self.AnalyseVariant(project, analysisModule = "LoadFlow", calcNameID = operational_state_name, analysisMethode = analysis_methode,
+                                                      conditions = conditions, analysisLoadOptionXML = analysis_load_option_xml)
+        _,start_time = self.print_duration("Load Flow finished -> ", start_time)
+
+        # Get analysis process log and result file in parallel, logon url is only needed without result file
+        if analysis_response.ResultFilename:
+            results_download = self._timed(self.GetAnalysisResultFile(analysis_response.ResultFilename))
+        else:
+            results_download = self._timed(self.GetLogOnUrlWithProject(project))
+
+        if download_log:
+            (results_xml, download_time), (process_log, log_download_time) = await asyncio.gather(results_download, self._timed(self.GetAnaylsisLogFile(analysis_response.LogFilename)))
+        else:
+            (results_xml, download_time), (process_log, log_download_time) = await results_download, (None, 0)
+
+        downloads_duration, start_time = self.print_duration("Log and results file retrived -> ", start_time)
+        self.print_duration_saved(download_time + log_download_time, downloads_duration)
+
+        if not analysis_response.ResultFilename:
+            project_logon_url, results_xml = results_xml, None
+
+        if results_xml:
+            print("XML Result File received")
+
+            if cache_key:
+                await asyncio.to_thread(self.result_cache.put, cache_key, analysis_response, results_xml, process_log)
+
+        else:
+            if analysis_response.ResultFilename:
+                project_logon_url = await self.GetLogOnUrlWithProject(project)
+            print("No XML results returned, you haven't enabled 'Write XML result file' under Parameters->Storage/Messages.\n You can use this url to open the project: {}".format(project_logon_url))
+
+        return results_xml, analysis_response, project, process_log
+
+    async def GetAnalysisResultTables(self, fileName, tables=None):
+        """Returns the analysis result file parsed into DataFrames per table, parsing runs in a worker thread"""
+
+        results_xml = await self.GetAnalysisResultFile(fileName)
+
+        return await asyncio.to_thread(parse_result_file, results_xml or b"<Results/>", tables)
+
+    async def CIMExport(self, project, file_path="Export.zip", BoundaryPath=None, runPowerFlow=False, operationalState=None, **options):
+        """Performs CIM export on the specified project, exports all CIM files to defined filepath, by default 'Export.zip'
+        options are the CimExportOptions, see CIM_EXPORT_DEFAULTS, with upload_registry the boundary zip is uploaded only
+        once per content and server"""
+
+        async def export(boundary_upload):
+            CIMOptions = self.cim_export_options(BoundaryPath=boundary_upload, **options)
+
+            print("INFO - exporting CIM data to {}".format(file_path))
+            return await self.stream_download("CIMExport", file_path, project, CIMOptions, operationalState=operationalState, runPowerFlow=runPowerFlow)
+
+        if BoundaryPath:
+            print("Uploading boundary to Neplan")
+            written_bytes = await self.with_upload("ZipUpload", BoundaryPath, export)
+        else:
+            written_bytes = await export(None)
+
+        if written_bytes == 0:
+            print("ERROR - Exported file is empty: {}".format(file_path))
+            return False
+        else:
+            return True
+
+    async def Import_from_List_files(self, inputFiles, projectName=None, copySettingsFromProjectName="test"):
+        """Import NeplanList Files to Neplan from local path"""
+
+        file_path = pathlib.Path(inputFiles)
+        projectName = projectName or file_path.stem
+        print(f'Importing to {projectName} file {inputFiles}.')
+        response = "ERROR"
+
+        if file_path.exists():
+            async def import_file(response_filename):
+                print(f"Filename {response_filename}")
+                return await self.call("ImportFromListFile", uploadName=response_filename, projectName=projectName, copySettingsFromProjectName=copySettingsFromProjectName)
+
+            try:
+                response = await self.with_upload("XMLUpload", file_path, import_file, lambda response: not response.success)
+            except zeep.exceptions.Fault as fault:
+                if fault.detail is not None and len(fault.detail):
+                    print(self.wsdl.types.deserialize(fault.detail[0]))
+                else:
+                    print("ERROR - Import of {} failed: {}".format(inputFiles, fault.message))
+                self.print_last_messageexchange()
+
+        return response
+
+    # CUSTOM FUNCTIONS - END
+
+
+# --- BATCH LOAD FLOW ---
+
+def _open_job_csv(csv_path, header):
+    """Yields the (first, second) columns of the rows of a job CSV file, separated by comma or semicolon. The second
+    column is optional, empty lines, comments (#) and a header line whose first column is header are skipped"""
+
+    with open(csv_path, newline="", encoding="utf-8-sig") as file_object:
+
+        sample = file_object.read(4096)
+        file_object.seek(0)
+        delimiter = ";" if sample.count(";") > sample.count(",") else ","
+
+        for row in csv.reader(file_object, delimiter=delimiter):
+            row = [column.strip() for column in row]
+
+            if not row or not row[0] or row[0].startswith("#") or row[0].lower() == header:
+                continue
+
+            yield row[0], row[1] if len(row) > 1 else ""
+
+
+def read_loadflow_jobs(csv_path):
+    """Reads (project_name, operational_state_name) pairs from a CSV file, separated by comma or semicolon.
+    The operational state column is optional, empty lines, comments (#) and a header line starting with 'project' are skipped"""
+
+    return list(_open_job_csv(csv_path, "project"))
+
+
+def safe_filename(text):
+    """Replaces all characters not allowed in file names with _"""
+
+    return re.sub(r"[^\w.-]+", "_", text).strip("_") or "_"
+
+
+def write_loadflow_result(output_dir, project_name, operational_state_name, results_xml, process_log=None):
+    """Writes result xml and process log of one load flow to output_dir
+    Files are named <project>__<operational state>__CalculationResult.xml and <project>__<operational state>__AnalysisLog.txt
+    Output: path of the result file"""
+
+    prefix = "{}__{}".format(safe_filename(project_name), safe_filename(operational_state_name or "default"))
+    result_file = os.path.join(output_dir, prefix + "__CalculationResult.xml")
+
+    with open(result_file, "wb") as file_object:
+        file_object.write(results_xml)
+
+    if process_log:
+        with open(os.path.join(output_dir, prefix + "__AnalysisLog.txt"), "wb") as file_object:
+            file_object.write(process_log)
+
+    return result_file
+
+
+def _run_loadflow_job(api, analysis_slots, project_name, operational_state_name, output_dir, job_options):
+    """Runs one load flow of a batch and writes the result, errors are returned and not raised
+    job_options: download_log, archive_dir, archive_format, refresh, diff_dir and change_marker, see NeplanService.run_loadflow_batch"""
+
+    start_time = time.perf_counter()
+    result = {"project": project_name, "operational_state": operational_state_name, "status": "ok", "cached": False, "result_file": None, "error": None}
+
+    try:
+        results_xml, analysis_response, project, process_log = api.run_loadflow(project_name, operational_state_name, analysis_slots=analysis_slots,
+                                                                                download_log=job_options["download_log"], refresh=job_options["refresh"],
+                                                                                change_marker=job_options["change_marker"])
+        result["cached"] = isinstance(analysis_response, AnalysisInfo)
+
+        if results_xml:
+            result["result_file"] = write_loadflow_result(output_dir, project_name, operational_state_name, results_xml, process_log)
+
+            tables = parse_result_file(results_xml) if job_options["archive_dir"] or job_options["diff_dir"] else None
+
+            if job_options["archive_dir"]:
+                archive_loadflow_results(job_options["archive_dir"], project_name, operational_state_name, tables,
+                                         analysis_response, file_format=job_options["archive_format"])
+
+            if job_options["diff_dir"]:
+                changes = ResultDiffStore(job_options["diff_dir"]).update(project_name, operational_state_name, tables, analysis_response)
+                result["changed_rows"] = sum(len(table_changes) for table_changes in changes.values())
+        else:
+            result["status"] = "no_result"
+
+    except Exception as error:
+        result["status"] = "failed"
+        result["error"] = repr(error)
+
+    result["duration"] = time.perf_counter() - start_time
+
+    return result
+
+
+# NeplanService of the worker process, set up by _init_loadflow_worker
+_worker_api = None
+_worker_analysis_slots = None
+
+def _init_loadflow_worker(init_args, init_kwargs, analysis_slots):
+
+    global _worker_api, _worker_analysis_slots
+
+    _worker_api = NeplanService(*init_args, **init_kwargs)
+    _worker_analysis_slots = analysis_slots
+
+
+def _run_loadflow_job_in_worker(project_name, operational_state_name, output_dir, job_options):
+
+    result = _run_loadflow_job(_worker_api, _worker_analysis_slots, project_name, operational_state_name, output_dir, job_options)
+
+    # Calls of this job, added to the metrics of the main process
+    if _worker_api.metrics:
+        result["metrics"] = _worker_api.metrics.snapshot(reset=True)
+
+    return result
+
+
+def _run_loadflow_batch(runner, jobs, output_dir, max_workers=4, max_analyses=None, use_processes=False, download_log=True,
+                       archive_dir=None, archive_format="parquet", refresh=False, diff_dir=None, change_marker=None):
+    """Batch of NeplanService.run_loadflow_batch and ServerPool.run_loadflow_batch, runner is the NeplanService or ServerPool"""
+
+    max_analyses = max_analyses or max_workers
+    job_options  = {"download_log": download_log, "archive_dir": archive_dir, "archive_format": archive_format, "refresh": refresh,
+                    "diff_dir": diff_dir, "change_marker": change_marker}
+
+    if use_processes:
+        analysis_slots = multiprocessing.Semaphore(max_analyses)
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers, initializer=_init_loadflow_worker, initargs=(runner._init_args, runner._init_kwargs, analysis_slots))
+        submit_job = lambda project_name, operational_state_name: executor.submit(_run_loadflow_job_in_worker, project_name, operational_state_name, output_dir, job_options)
+    else:
+        analysis_slots = threading.BoundedSemaphore(max_analyses)
+        executor = ThreadPoolExecutor(max_workers)
+        submit_job = lambda project_name, operational_state_name: executor.submit(_run_loadflow_job, runner, analysis_slots, project_name, operational_state_name, output_dir, job_options)
+
+    start_time = time.perf_counter()
+    results = []
+
+    with executor:
+        futures = [submit_job(project_name, operational_state_name) for project_name, operational_state_name in jobs]
+
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+
+            worker_metrics = result.pop("metrics", None)
+            if worker_metrics and runner.metrics:
+                runner.metrics.merge(worker_metrics)
+
+            print("INFO - [{}/{}] {} {} / {} in {:.1f} s {}".format(len(results), len(futures), result["status"], result["project"],
+                                                                    result["operational_state"] or "-", result["duration"], result["result_file"] or result["error"] or ""))
+
+    print_batch_report(results, time.perf_counter() - start_time)
+
+    return results
+
+
+def _print_report(title, unit, results, wall_time, table=None, totals=(), counted=None):
+    """Prints the report of a batch run. With table (heading format, headings, row format, row function) one row per
+    result sorted by file, errors below their row. Then the counts per status, totals as (label, text) pairs, the wall
+    time, and duration and throughput of the counted results, by default all"""
+
+    print("--- {} report ---".format(title))
+
+    if table:
+        heading_format, headings, row_format, row = table
+        print(heading_format.format(*headings))
+
+        for result in sorted(results, key=lambda result: result["file"]):
+            print(row_format.format(*row(result)))
+            if result["error"]:
+                print("         {}".format(result["error"]))
+
+    counted   = results if counted is None else counted
+    durations = [result["duration"] for result in counted] or [0]
+    statuses  = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+
+    print("{:<17}{}".format(unit.capitalize() + ":", len(results)))
+    print("Status:          {}".format(", ".join("{} {}".format(status, count) for status, count in sorted(statuses.items()))))
+
+    for label, text in totals:
+        print("{:<17}{}".format(label + ":", text))
+
+    print("Wall time:       {:.1f} s".format(wall_time))
+    print("Duration:        mean {:.1f} s, max {:.1f} s, sum {:.1f} s".format(sum(durations) / len(durations), max(durations), sum(durations)))
+    print("Throughput:      {:.2f} {}/min".format(len(counted) / wall_time * 60 if wall_time else 0, unit))
+
+
+def _write_report(path, results, columns):
+    """Writes the given columns of the results of a batch run as CSV"""
+
+    with open(path, "w", newline="", encoding="utf-8") as file_object:
+        writer = csv.DictWriter(file_object, columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def print_batch_report(results, wall_time):
+    """Prints the aggregated status and throughput of a batch run"""
+
+    _print_report("Batch", "jobs", results, wall_time, totals=[("From cache", sum(1 for result in results if result.get("cached")))])
+
+
+# --- BULK IMPORT ---
+
+def read_import_jobs(csv_path):
+    """Reads (file path, project name) pairs from a CSV file, separated by comma or semicolon.
+    The project name column is optional, relative file paths are relative to the CSV file.
+    Empty lines, comments (#) and a header line starting with 'file' are skipped"""
+
+    base_dir = os.path.dirname(os.path.abspath(csv_path))
+
+    return [(os.path.join(base_dir, file_path), project_name) for file_path, project_name in _open_job_csv(csv_path, "file")]
+
+
+def _run_import_job(api, upload_slots, import_slots, file_path, project_name, copy_settings_from):
+    """Uploads and imports one NeplanList file of a bulk import, errors are returned and not raised"""
+
+    start_time = time.perf_counter()
+    project_name = project_name or pathlib.Path(file_path).stem
+    result = {"file": str(file_path), "project": project_name, "status": "ok", "created_project": None, "bytes": None,
+              "upload_reused": False, "upload_duration": 0.0, "import_duration": 0.0, "error": None}
+
+    def upload(operation_name, path):
+        with upload_slots:
+            (upload_name, digest), duration = api._timed(api.registered_upload, operation_name, path)
+        result["upload_duration"] += duration
+        result["upload_reused"]    = digest is not None
+        return upload_name, digest
+
+    def import_file(upload_name):
+        with import_slots:
+            response, duration = api._timed(lambda: api.service.ImportFromListFile(uploadName=upload_name, projectName=project_name,
+                                                                                   copySettingsFromProjectName=copy_settings_from))
+        result["import_duration"] += duration
+        return response
+
+    try:
+        result["bytes"] = os.path.getsize(file_path)
+
+        response = api.with_upload("XMLUpload", file_path, import_file, lambda response: not response.success, upload)
+
+        result["created_project"] = response.actualCreatedProjectName
+
+        if not response.success:
+            result["status"] = "failed"
+            result["error"] = response.errorMessage or "Import failed"
+
+    except Exception as error:
+        result["status"] = "failed"
+        result["error"] = repr(error)
+
+    result["duration"] = time.perf_counter() - start_time
+
+    return result
+
+
+def _import_files_batch(runner, jobs, max_uploads=4, max_imports=2, copy_settings_from="test"):
+    """Bulk import of NeplanService.import_files_batch and ServerPool.import_files_batch, runner is the NeplanService or
+    ServerPool, its _import_job runs the upload and import of one file"""
+
+    upload_slots = threading.BoundedSemaphore(max_uploads)
+    import_slots = threading.BoundedSemaphore(max_imports)
+
+    start_time = time.perf_counter()
+    results = []
+
+    with ThreadPoolExecutor(max_uploads + max_imports) as executor:
+        futures = [executor.submit(runner._import_job, upload_slots, import_slots, file_path, project_name, copy_settings_from)
+                   for file_path, project_name in jobs]
+
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+
+            print("INFO - [{}/{}] {} {} -> {} upload {:.1f} s, import {:.1f} s {}".format(len(results), len(futures), result["status"], result["file"], result["project"],
+                                                                                     result["upload_duration"], result["import_duration"], result["error"] or ""))
+
+    print_import_report(results, time.perf_counter() - start_time)
+
+    return results
+
+
+def print_import_report(results, wall_time):
+    """Prints status and timing of every file and the totals of a bulk import"""
+
+    reused = [result for result in results if result.get("upload_reused")]
+    table  = ("{:<8} {:>10} {:>10} {:>10}  {:<40} {}", ("Status", "MB", "Upload s", "Import s", "Project", "File"),
+              "{:<8} {:>10.1f} {:>10.1f} {:>10.1f}  {:<40} {}",
+              lambda result: (result["status"], (result["bytes"] or 0) / 1024 ** 2, result["upload_duration"], result["import_duration"],
+                              result["created_project"] or result["project"], result["file"]))
+    totals = [("Uploaded",       "{:.1f} MB".format(sum(result["bytes"] or 0 for result in results if not result.get("upload_reused")) / 1024 ** 2)),
+              ("Reused uploads", "{} ({:.1f} MB not sent again)".format(len(reused), sum(result["bytes"] or 0 for result in reused) / 1024 ** 2)),
+              ("Upload time",    "sum {:.1f} s".format(sum(result["upload_duration"] for result in results))),
+              ("Import time",    "sum {:.1f} s".format(sum(result["import_duration"] for result in results)))]
+
+    _print_report("Import", "files", results, wall_time, table, totals)
+
+
+def write_import_report(path, results):
+    """Writes the per file results of a bulk import as CSV"""
+
+    _write_report(path, results, ["file", "project", "status", "created_project", "bytes", "upload_reused", "upload_duration", "import_duration",
+                                  "duration", "error"])
+
+
+# --- BATCH CIM EXPORT ---
+
+# CimExportOptions that make up a scenario of a CIM export batch, they name the exported file, further options of a
+# scenario go into the name as hash
+CIM_SCENARIO_OPTIONS = ("ScenarioDateTime", "Period", "AreasToExportNames", "MAS")
+
+
+def scenario_datetime(value):
+    """Returns value (datetime or ISO 8601 string) as naive UTC datetime, naive values are taken as UTC"""
+
+    if isinstance(value, str):
+        value = aniso8601.parse_datetime(value.replace(" ", "T"))
+
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return value
+
+
+def scenario_times(start, end, step_minutes=60):
+    """Returns the scenario times from start to end (included) every step_minutes"""
+
+    start, end = scenario_datetime(start), scenario_datetime(end)
+    count = int((end - start) / timedelta(minutes=step_minutes)) + 1
+
+    return [start + index * timedelta(minutes=step_minutes) for index in range(max(count, 0))]
+
+
+def cim_export_scenario(ScenarioDateTime, AreasToExportNames=None, MAS="", Period="1D", **options):
+    """Returns the CimExportOptions of one export of a batch, areas as list of names, further options are passed on,
+    BoundaryPath is given once for the whole batch"""
+
+    unknown_options = set(options) - set(CIM_EXPORT_DEFAULTS)
+
+    if unknown_options:
+        raise TypeError("Unknown CIM export options: {}".format(", ".join(sorted(unknown_options))))
+
+    if "BoundaryPath" in options:
+        raise TypeError("BoundaryPath is set for the whole CIM export batch, not per scenario")
+
+    if isinstance(AreasToExportNames, str):
+        AreasToExportNames = [AreasToExportNames]
+
+    return dict(options, ScenarioDateTime=scenario_datetime(ScenarioDateTime), AreasToExportNames=list(AreasToExportNames or []),
+                MAS=MAS or "", Period=Period or "1D")
+
+
+def cim_export_scenarios(times, areas=None, mas=None, periods=None):
+    """Returns the scenario grid of a CIM export batch, every combination of scenario time, area set, MAS and period
+
+    times:   datetimes or ISO 8601 strings, see scenario_times
+    areas:   area sets, each an area name or a list of names, by default one set with all areas
+    mas:     model authority sets, by default the MAS of the project
+    periods: Period values, by default 1D"""
+
+    return [cim_export_scenario(scenario_time, area_names, model_authority_set, period)
+            for scenario_time, area_names, model_authority_set, period in itertools.product(times, areas or [None], mas or [""], periods or ["1D"])]
+
+
+def cim_export_filename(project_name, scenario):
+    """Returns the zip file name of one export, <project>__<YYYYmmddTHHMMZ>__<period>__<areas>__<MAS>[__<options>].zip
+    the time has seconds and microseconds only if they are set, areas are joined with +, all without areas and default
+    without MAS. Further options of the scenario are named by the first 8 hex digits of their sha1."""
+
+    scenario_time = scenario["ScenarioDateTime"]
+    time_format   = "%Y%m%dT%H%M%S%fZ" if scenario_time.microsecond else "%Y%m%dT%H%M%SZ" if scenario_time.second else "%Y%m%dT%H%MZ"
+    options       = {option: value for option, value in scenario.items() if option not in CIM_SCENARIO_OPTIONS}
+    options_name  = "__" + sha1(json.dumps(options, sort_keys=True, default=str).encode()).hexdigest()[:8] if options else ""
+
+    return "{}__{}__{}__{}__{}{}.zip".format(safe_filename(project_name), scenario_time.strftime(time_format), safe_filename(scenario["Period"]),
+                                            "+".join(safe_filename(area) for area in scenario["AreasToExportNames"]) or "all",
+                                            safe_filename(scenario["MAS"] or "default"), options_name)
+
+
+def _cim_export_result(project_name, scenario, file_path, status="ok"):
+
+    return {"project": project_name, "scenario_time": scenario["ScenarioDateTime"].isoformat(), "period": scenario["Period"],
+            "areas": "+".join(scenario["AreasToExportNames"]), "mas": scenario["MAS"], "status": status, "file": file_path,
+            "bytes": os.path.getsize(file_path) if status == "skipped" else None, "duration": 0.0, "error": None}
+
+
+def _run_cim_export_job(api, project_name, scenario, file_path, base_options, job_options):
+    """Exports one scenario of a CIM export batch to file_path, errors are returned and not raised. The export is written
+    to file_path.part and renamed when complete, so only finished exports are skipped on resume.
+    job_options: boundary_path, upload_registry, runPowerFlow and operationalState, see NeplanService.cim_export_batch"""
+
+    start_time = time.perf_counter()
+    result = _cim_export_result(project_name, scenario, file_path)
+    part_path = file_path + ".part"
+
+    try:
+        project = api.GetProject(project_name)
+
+        def export(boundary_upload):
+            CIMOptions = cim_export_options(**dict(base_options, BoundaryPath=boundary_upload, **scenario))
+            return api.stream_download("CIMExport", part_path, project, CIMOptions, operationalState=job_options["operationalState"],
+                                       runPowerFlow=job_options["runPowerFlow"])
+
+        if job_options["boundary_path"]:
+            result["bytes"] = api.with_upload("ZipUpload", job_options["boundary_path"], export, upload_registry=api.upload_registry or job_options["upload_registry"])
+        else:
+            result["bytes"] = export(None)
+
+        if result["bytes"]:
+            os.replace(part_path, file_path)
+        else:
+            result["status"] = "empty"
+            result["error"]  = "Exported file is empty"
+
+    except Exception as error:
+        result["status"] = "failed"
+        result["error"]  = repr(error)
+
+    if os.path.exists(part_path):
+        os.remove(part_path)
+
+    result["duration"] = time.perf_counter() - start_time
+
+    return result
+
+
+def _cim_export_batch(runner, project_name, scenarios, output_dir, max_workers=4, refresh=False, BoundaryPath=None, runPowerFlow=False,
+                     operationalState=None, **options):
+    """Export batch of NeplanService.cim_export_batch and ServerPool.cim_export_batch, runner is the NeplanService or
+    ServerPool, its _cim_export_job runs one export"""
+
+    base_options = cim_export_options(**options)
+    job_options  = {"boundary_path": BoundaryPath, "upload_registry": UploadRegistry(None), "runPowerFlow": runPowerFlow,
+                    "operationalState": operationalState}
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    start_time = time.perf_counter()
+    jobs = OrderedDict()
+    results = []
+
+    for scenario in scenarios:
+        scenario = cim_export_scenario(**scenario)
+        file_path = os.path.join(output_dir, cim_export_filename(project_name, scenario))
+
+        if jobs.setdefault(file_path, scenario) != scenario:
+            raise ValueError("Different scenarios are exported to the same file {}".format(file_path))
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        futures = []
+
+        for file_path, scenario in jobs.items():
+            if not refresh and os.path.isfile(file_path) and os.path.getsize(file_path):
+                results.append(_cim_export_result(project_name, scenario, file_path, "skipped"))
+            else:
+                futures.append(executor.submit(runner._cim_export_job, project_name, scenario, file_path, base_options, job_options))
+
+        if results:
+            print("INFO - {} of {} exports already done in {}".format(len(results), len(jobs), output_dir))
+
+        for index, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+
+            print("INFO - [{}/{}] {} {} in {:.1f} s {}".format(index, len(futures), result["status"], os.path.basename(result["file"]),
+                                                               result["duration"], result["error"] or ""))
+
+    print_cim_export_report(results, time.perf_counter() - start_time)
+
+    return results
+
+
+def print_cim_export_report(results, wall_time):
+    """Prints status and timing of every export and the totals of a CIM export batch"""
+
+    exported = [result for result in results if result["status"] != "skipped"]
+    table    = ("{:<8} {:>10} {:>10}  {}", ("Status", "MB", "Export s", "File"), "{:<8} {:>10.1f} {:>10.1f}  {}",
+                lambda result: (result["status"], (result["bytes"] or 0) / 1024 ** 2, result["duration"], os.path.basename(result["file"])))
+
+    _print_report("CIM export", "exports", results, wall_time, table, [("Exported", "{:.1f} MB".format(sum(result["bytes"] or 0 for result in exported) / 1024 ** 2))],
+                  counted=exported)
+
+
+def write_cim_export_report(path, results):
+    """Writes the per export results of a CIM export batch as CSV"""
+
+    _write_report(path, results, ["project", "scenario_time", "period", "areas", "mas", "status", "file", "bytes", "duration", "error"])
+
+
+# --- SERVER POOL ---
+
+class ServerHealth(OperationMetrics):
+    """OperationMetrics of one server of a ServerPool, also tracks the recent latency per operation class, the calls in
+    flight and consecutive failures of the server
+
+    Errors without SOAP Fault (connection errors, timeouts) count as failures, a Fault is an answer of a healthy server.
+    After eject_after consecutive failures the server is taken out of rotation for eject_time seconds, afterwards it gets
+    calls again and one more failure ejects it again."""
+
+    def __init__(self, server, eject_after=3, eject_time=60, smoothing=0.2):
+
+        super().__init__()
+
+        self.server        = server
+        self.eject_after   = eject_after
+        self.eject_time    = eject_time
+        self.smoothing     = smoothing
+        self.latency       = {} # operation class -> exponentially smoothed latency in seconds
+        self.in_flight     = 0  # jobs leased by the ServerPool
+        self.failures      = 0  # consecutive failures
+        self.ejected_until = 0.0
+
+
+    def record(self, call, fault=False, error=False):
+
+        super().record(call, fault, error)
+
+        latency = time.perf_counter() - call.start_time
+        operation_class = get_operation_class(call.operation_name)
+
+        with self._lock:
+            if error:
+                self.failures += 1
+                if self.failures >= self.eject_after:
+                    self.ejected_until = time.monotonic() + self.eject_time
+                    print("WARNING - Server {} taken out of rotation for {} s after {} failures".format(self.server, self.eject_time, self.failures))
+                return
+
+            self.failures = 0
+            previous = self.latency.get(operation_class)
+            self.latency[operation_class] = latency if previous is None else previous + self.smoothing * (latency - previous)
+
+
+    def is_ejected(self, now=None):
+
+        return self.ejected_until > (time.monotonic() if now is None else now)
+
+
+    def stats(self):
+
+        """Returns in_flight, failures, ejected and latency per operation class"""
+
+        with self._lock:
+            return {"in_flight": self.in_flight, "failures": self.failures, "ejected": self.is_ejected(), "latency": dict(self.latency)}
+
+
+class ServerPool():
+    """NeplanService clients for several Neplan servers, jobs are dispatched to one server each
+
+    strategy "queue" picks the server with the fewest jobs in flight, "latency" the server with the lowest expected
+    wait, the recent latency of the operation class times the jobs in flight. Servers failing repeatedly are taken out
+    of rotation for a while, see ServerHealth. Servers that can not be reached at start are left out with a warning.
+
+        pool = ServerPool(["http://neplan1", "http://neplan2"], username, crypted_password)
+        pool.run_loadflow_batch(jobs, "results")
+        with pool.lease("analysis") as api:
+            api.run_loadflow("Project")
+
+    service_options are passed to every NeplanService (metrics is always the ServerHealth of the server), all servers
+    share one UploadRegistry."""
+
+    STRATEGIES = ("queue", "latency")
+
+    def __init__(self, servers, username, crypted_password, strategy="queue", eject_after=3, eject_time=60, **service_options):
+
+        if strategy not in self.STRATEGIES:
+            raise ValueError("Unknown dispatch strategy {}, use one of {}".format(strategy, ", ".join(self.STRATEGIES)))
+
+        self.strategy = strategy
+        self.metrics  = None # Metrics are kept per server, see stats
+        self._lock    = threading.Lock()
+        self._next    = 0    # Rotates the order of equally good servers
+
+        upload_registry = service_options.get("upload_registry")
+        if upload_registry is True or isinstance(upload_registry, str):
+            service_options["upload_registry"] = UploadRegistry(debug=service_options.get("debug", False)) if upload_registry is True else \
+                                                 UploadRegistry(upload_registry, debug=service_options.get("debug", False))
+
+        def connect(server):
+            try:
+                return NeplanService(server, username, crypted_password, metrics=ServerHealth(server, eject_after, eject_time), **service_options)
+            except Exception as error:
+                print("WARNING - Server {} left out of the pool: {!r}".format(server, error))
+                return None
+
+        with ThreadPoolExecutor(max(len(servers), 1)) as executor:
+            self.services = [service for service in executor.map(connect, servers) if service is not None]
+
+        if not self.services:
+            raise RuntimeError("None of the Neplan servers could be reached: {}".format(", ".join(servers)))
+
+
+    def __len__(self):
+        return len(self.services)
+
+
+    def _score(self, service, operation_class, now):
+
+        health = service.metrics
+        latency = health.latency.get(operation_class, health.latency.get("lookup", 0.0))
+
+        if self.strategy == "queue":
+            return health.in_flight, latency
+
+        return latency * (health.in_flight + 1), health.in_flight
+
+
+    def _choose(self, operation_class):
+
+        """Returns the best server for the operation class, if all servers are ejected the one coming back first"""
+
+        now = time.monotonic()
+        count = len(self.services)
+        candidates = [(index, service) for index, service in enumerate(self.services) if not service.metrics.is_ejected(now)]
+
+        if not candidates:
+            return min(self.services, key=lambda service: service.metrics.ejected_until)
+
+        index, service = min(candidates, key=lambda candidate: (self._score(candidate[1], operation_class, now), (candidate[0] - self._next) % count))
+        self._next = (index + 1) % count
+
+        return service
+
+
+    @contextmanager
+    def lease(self, operation_class="lookup"):
+
+        """Context manager returning the NeplanService of the best server for one job of the operation class
+        (analysis, export, lookup), the job counts to the queue of the server until the context is left"""
+
+        with self._lock:
+            service = self._choose(operation_class)
+            service.metrics.in_flight += 1
+
+        try:
+            yield service
+        finally:
+            with self._lock:
+                service.metrics.in_flight -= 1
+
+
+    def run_loadflow(self, project_name, operational_state_name="", analysis_slots=None, **options):
+        """Runs the load flow on the best server, options and output as for NeplanService.run_loadflow"""
+
+        with self.lease("analysis") as api:
+            return api.run_loadflow(project_name, operational_state_name, analysis_slots=analysis_slots, **options)
+
+
+    def CIMExport(self, project_name, file_path="Export.zip", **options):
+        """Exports the project from the best server, options as for NeplanService.CIMExport"""
+
+        with self.lease("export") as api:
+            return api.CIMExport(api.GetProject(project_name), file_path, **options)
+
+
+    def Import_from_List_files(self, inputFiles, projectName=None, copySettingsFromProjectName="test"):
+        """Uploads and imports the NeplanList file on the best server"""
+
+        with self.lease("export") as api:
+            return api.Import_from_List_files(inputFiles, projectName, copySettingsFromProjectName)
+
+
+    def run_loadflow_batch(self, jobs, output_dir, max_workers=None, max_analyses=None, use_processes=False, **options):
+        """Runs load flows for a list of (project_name, operational_state_name) pairs, each on the best server at its start,
+        see NeplanService.run_loadflow_batch. max_workers is by default 4 per server, worker processes are not supported"""
+
+        if use_processes:
+            raise ValueError("ServerPool runs batches in threads only")
+
+        results = _run_loadflow_batch(self, jobs, output_dir, max_workers or 4 * len(self), max_analyses, **options)
+        print_pool_report(self)
+
+        return results
+
+
+    def import_files_batch(self, jobs, max_uploads=None, max_imports=None, copy_settings_from="test"):
+        """Uploads and imports NeplanList files, upload and import of a file run on the same server, see
+        NeplanService.import_files_batch. By default 4 uploads and 2 imports per server run at the same time"""
+
+        results = _import_files_batch(self, jobs, max_uploads or 4 * len(self), max_imports or 2 * len(self), copy_settings_from)
+        print_pool_report(self)
+
+        return results
+
+
+    def _import_job(self, upload_slots, import_slots, file_path, project_name, copy_settings_from):
+
+        with self.lease("export") as api:
+            return _run_import_job(api, upload_slots, import_slots, file_path, project_name, copy_settings_from)
+
+
+    def cim_export_batch(self, project_name, scenarios, output_dir, max_workers=None, **options):
+        """Runs the CIM exports of a scenario grid, each on the best server at its start, see NeplanService.cim_export_batch.
+        max_workers is by default 2 per server, the boundary zip is uploaded once to every server used"""
+
+        results = _cim_export_batch(self, project_name, scenarios, output_dir, max_workers or 2 * len(self), **options)
+        print_pool_report(self)
+
+        return results
+
+
+    def _cim_export_job(self, project_name, scenario, file_path, base_options, job_options):
+
+        with self.lease("export") as api:
+            return _run_cim_export_job(api, project_name, scenario, file_path, base_options, job_options)
+
+
+    def combined_metrics(self):
+
+        """Returns OperationMetrics with the SOAP calls of all servers"""
+
+        metrics = OperationMetrics()
+        for service in self.services:
+            metrics.merge(service.metrics.snapshot())
+
+        return metrics
+
+
+    def stats(self):
+
+        """Returns ServerHealth.stats and SOAP calls per server url"""
+
+        return {service.server: dict(service.metrics.stats(), calls=sum(operation["calls"] for operation in service.metrics.as_dict().values()))
+                for service in self.services}
 
-    class portNr(Enum):
-        first   = 0
-        second  = 1
-        third   = 2
-        fourth  = 3
 
-    class units(Enum):
-        HV = 0
-        LV = 1
+def print_pool_report(pool):
+    """Prints calls, failures and recent latencies per server of a ServerPool"""
 
-    class analysisType:
+    print("--- Server pool ---")
 
-        __DistrictHeatingAnalysis_string    = """DistrictHeating, DistrictHeating2DProfile, DistrictHeatingContingencyAnalysis, DistrictHeatingTimeSimulation, DistrictHeatingTransientAnalysis"""
-        DistrictHeatingAnalysis             = Enum('DistrictHeatingAnalysis', dict((item, item) for item in re.sub('\s+', '',__DistrictHeatingAnalysis_string).split(",")))
+    for server, stats in pool.stats().items():
+        latencies = ", ".join("{} {:.3f} s".format(operation_class, latency) for operation_class, latency in sorted(stats["latency"].items()))
+        print("{:<40} calls {:>6}  failures {:>3}{}  {}".format(server, stats["calls"], stats["failures"], "  ejected" if stats["ejected"] else "", latencies))
 
-        __GasAnalysis_string                = """Gas, Gas2DProfile, GasContingencyAnalysis, GasTimeSimulation, GasTransientAnalysis, InteractiveDistributionGW, PressureProfileGW, TimeDistributionGW"""
-        GasAnalysis                         = Enum('GasAnalysis', dict((item, item) for item in re.sub('\s+', '',__GasAnalysis_string).split(",")))
 
-        __PowerSystemAnalysis_string        = """ArcFlash, CableSizing,
-                                                CapacitorPlacement, CircuitBreakerPlacement, ContingencyAnalysis,
-                                                DistanceProtection, DynamicAnalysis, ExpressFeeder, FaultFinding,
-                                                FeederReinforcement, FlickerAnalysis, GroundingSystemAnalysis,
-                                                HarmonicAnalysis, HostingCapacity, InvestmentAnalysis, LoadFlow,
-                                                LoadFlowTimeSimulation, LowVoltageCalculation,
-                                                MotorStartingAnalysis, NeplanDach, NetworkReduction, NTC,
-                                                OptimalPowerFlow, OvercurrentProtection, PhaseSwapping,
-                                                PipeTypeOptimization, PoleStrengthCalculation, PortionOfFeeders,
-                                                PowerSystemAssessmentERIS, Reliability, Resupply, ShortCircuit,
-                                                SmallSignalStability, SwitchingOptimization, ThermalAnalysis,
-                                                VoltageRegulatorPlacement, VoltageStability"""
-        PowerSystemAnalysis                 = Enum('PowerSystemAnalysis', dict((item, item) for item in re.sub('\s+', '', __PowerSystemAnalysis_string).split(",")))
+# --- RESULT ARCHIVE ---
 
-        __WaterAnalysis_string              = """FireWater, InteractiveDistributionGW,
-                                                PressureProfileGW, TimeDistributionGW, Water, Water2DProfile,
-                                                WaterContingencyAnalysis, WaterTimeSimulation,
-                                                WaterTransientAnalysis"""
-        WaterAnalysis                       = Enum('WaterAnalysis', dict((item, item) for item in re.sub('\s+', '', __WaterAnalysis_string).split(",")))
+ARCHIVE_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
 
 
-    class elementType:
+def archive_partition(value):
+    """Returns the escaped partition directory value, empty values are stored as 'default'"""
 
-        __DistrictHeatingAnalysis_string    = """HeatingCentrifugalPump,
-                                                HeatingCirculationPump, HeatingFitting, HeatingLoad,
-                                                HeatingNode, HeatingPipe, HeatingPlant, HeatingPressureRegulator,
-                                                HeatingShutOffValve, HeatingSpecialLoad, HeatingStation,
-                                                HeatingValve"""
-        DistrictHeatingAnalysis             = Enum('DistrictHeatingAnalysis', dict((item, item) for item in re.sub('\s+', '',__DistrictHeatingAnalysis_string).split(",")))
+    return quote(str(value or "default"), safe="")
 
-        __GasAnalysis_string                = """GasCentrifugalPump, GasCirculationPump,
-                                                GasFitting, GasNode, GasPipe, GasPressureRegulator,
-                                                GasShutOffValve, GasSpecialLoad, GasStation, GasValve,
-                                                Trafo2WindingAsym"""
-        GasAnalysis                         = Enum('GasAnalysis', dict((item, item) for item in re.sub('\s+', '',__GasAnalysis_string).split(",")))
 
-        __PowerSystemAnalysis_string        = """ACCompressedAirEnergyStorage,
-                                                ACDisperseGenerator, ACFlyWheel, AsynchronousMachine, Busbar,
-                                                BusbarCoupler, CircuitBreaker, CircuitBreakerOnElem,
-                                                CompositeLoad, CurrentTransformer, CustomerConnection,
-                                                DCBattery, DCConverter, DCConverter3Pole, DCFlyWheel,
-                                                DCFuelCell, DCGround, DCLine, DCLoad, DCMotor, DCNode,
-                                                DCPhotoVoltaic, DCReactor, DCShunt, DCVoltageSource, DFIG,
-                                                DisconnectSwitch, DisconnectSwitchOnElem, DistanceRelais,
-                                                EarthingSystem, EarthSwitch, EnergyStorage, EquivalentSerieLF,
-                                                EquivalentSerieSC, EquivalentShuntLF, EquivalentShuntSC,
-                                                ExternalGrid, FaultIndicator, Filter, FrequencyRelais, FunctionBlock,
-                                                Fuse, GenericModel, GroundElement, HarmonicCurrentSource,
-                                                HarmonicVoltageSource, Inertia, Line, LineAsym, LineCoupling,
-                                                LineSection, Load, LoadSwitch, LoadSwitchOnElem,
-                                                MeasurementDevice, MechanicalLoad, MinMaxRelaisOnLink,
-                                                MinMaxRelaisOnNode, MultiFunctionProtection, NestedBlockCCT,
-                                                OvercurrentRelais, ParallelRLC, PoleSlipRelais, PowerRelais, PWM,
-                                                PWM3Pole, Pylon, Reactor, Regulator, SerieEarthRLC, SerieRLC,
-                                                SerieTransformator, Shunt, STATCOM, Station, SurgeArrester, SVC,
-                                                SynchronousMachine, Table, TCSC, Trafo2Winding, Trafo3Winding,
-                                                Trafo4Winding, TrafoRegulator, UPFC, UserDefinedPort0,
-                                                UserDefinedPort1, UserDefinedPort2, UserDefinedPort3,
-                                                UserDefinedPort4, VoltageRelais, VoltageTransformer"""
-        PowerSystemAnalysis                 = Enum('PowerSystemAnalysis', dict((item, item) for item in re.sub('\s+', '', __PowerSystemAnalysis_string).split(",")))
+def archive_loadflow_results(archive_dir, project_name, operational_state_name, tables, analysis_response=None, run_time=None, file_format="parquet"):
+    """Stores parsed results of one run (see parse_result_file) as hive partitioned Parquet or Arrow IPC files
 
-        __WaterAnalysis_string              = """WaterCentrifugalPump, WaterCirculationPump,
-                                                WaterFitting, WaterHydrant, WaterNode, WaterPipe,
-                                                WaterReservoir, WaterShutOffValve, WaterSpecialLoad,
-                                                WaterStation, WaterValve"""
-        WaterAnalysis                       = Enum('WaterAnalysis', dict((item, item) for item in re.sub('\s+', '', __WaterAnalysis_string).split(",")))
+    <archive_dir>/<table>/project=<project>/operational_state=<state>/run=<YYYYmmddTHHMMSSZ>/part-0.<parquet|arrow>
 
-    # NATIVE FUNCTIONS - START
+    The table 'runs' gets one row per run with the fields of AnalysisReturnInfo. Arrow files are written uncompressed,
+    so they can be memory mapped, Parquet files are smaller. Use read_archive to scan an archived table.
+    Output: run partition value"""
 
+    if not pyarrow:
+        raise RuntimeError("Result archive needs pyarrow: pip install pyarrow")
 
-    def GetAllFeeders(self, project):
-        """Get all feeders of the project"""
-        return self.service.GetAllFeeders(project)
+    if file_format not in ARCHIVE_FORMATS:
+        raise ValueError("Unknown archive format {}, use one of {}".format(file_format, ", ".join(ARCHIVE_FORMATS)))
 
-    def GetAllSubAreas(self, project):
-        """Get all subareas of the project"""
-        return self.service.GetAllSubAreas(project)
+    run_time = scenario_datetime(run_time or datetime.now(timezone.utc)) # naive UTC, also for aware run times of other zones
+    run = run_time.strftime("%Y%m%dT%H%M%SZ")
+    partition = os.path.join("project=" + archive_partition(project_name), "operational_state=" + archive_partition(operational_state_name), "run=" + run)
 
-    def GetAllZones(self, project):
-        """Get all zones of the project"""
-        return self.service.GetAllZones(project)
+    # project, operational_state and run are partition columns, they are not stored in the files
+    run_info = {"run_time": run_time.isoformat()}
+    for name, value in (zeep.helpers.serialize_object(analysis_response, dict) or {}).items():
+        run_info[name] = value if value is None or isinstance(value, (str, int, float, bool)) else str(value)
 
-    def GetAllElementResults(self, project, analysisType = "LoadFlow"):
-        """Gets a list of all element resultst"""
-        return self.service.GetAllElementResults(project, analysisType)
+    tables = dict(tables, runs=pandas.DataFrame([run_info]))
 
-    def GetAllElementsOfElementType(self, project, elementType="Line"):
-        """Gets a list of all elements of the selected element type in a project"""
-        # TODO add validation of element types
-        return self.service.GetAllElementsOfElementType(project, elementType, {}, {})
+    for table_name, table in tables.items():
 
-    def GetAllElementsOfProject(self, project):
-        """Returns all elements of given project in a dataframe, with columns [ID, CIM_ID, EIC_ID, NAME, TYPE]"""
+        table_dir = os.path.join(archive_dir, safe_filename(table_name), partition)
+        os.makedirs(table_dir, exist_ok=True)
+        path = os.path.join(table_dir, "part-0" + ARCHIVE_FORMATS[file_format])
 
-        # Get all element data
-        #CIM_ID_dict = self.service.GetNeplanIDtoCimIDDictionary(project)
-        #EIC_ID_dict = self.service.GetNeplanIDtoEICodeDictionary(project)
-        Name_Type_dict = self.service.GetAllElementsOfProject(project, {}, {})
-        CIM_ID=[]
-        # Parse and merge all the data
-        #CIM_ID = pandas.DataFrame([(item.Key, item.Value) for item in CIM_ID_dict], columns=["ID", "CIM_ID"])
-        #EIC_ID = pandas.DataFrame([(item.Key, item.Value) for item in EIC_ID_dict], columns=["ID", "EIC_ID"])
-        NAME = pandas.DataFrame([(item.Key, item.Value) for item in Name_Type_dict.elementNames.KeyValueOfstringstring], columns=["ID", "NAME"])
-        TYPE = pandas.DataFrame([(item.Key, item.Value) for item in Name_Type_dict.elementTypes.KeyValueOfstringstring], columns=["ID", "TYPE"])
+        arrow_table = pyarrow.Table.from_pandas(table, preserve_index=False)
 
-        return NAME.merge(NAME, on='ID').merge(TYPE, on='ID')
+        if file_format == "parquet":
+            pyarrow.parquet.write_table(arrow_table, path)
+        else:
+            pyarrow.feather.write_feather(arrow_table, path, compression="uncompressed")
 
-    def GetAnalysisResultFile(self, fileName):
-        """Retruns analysis result file defined in: analysis_result.ResultFilename
-        GetAnalysisResultFile(fileName: xsd:string) -> GetAnalysisResultFileResult: ns5:StreamBody"""
+    return run
 
-        analysis_result_string = self.service.GetAnalysisResultFile(fileName)
-        #print(analysis_result_string) # Quite big xml, not reasonable to export it
 
-        return analysis_result_string
+def read_archive(archive_dir, table_name, file_format="parquet"):
+    """Returns a pyarrow dataset of one archived table over all projects, operational states and runs
+    Partition columns project, operational_state and run can be used in filters, e.g.
+    read_archive(path, "node").to_table(filter=pyarrow.dataset.field("project") == "Project").to_pandas()"""
 
-    def GetAnaylsisLogFile(self, fileName):
-        """Retruns analysis log file defined in: analysis_result.LogFilename
-        GetAnaylsisLogFile(fileName: xsd:string) -> GetAnaylsisLogFileResult: ns5:StreamBody"""
+    if not pyarrow:
+        raise RuntimeError("Result archive needs pyarrow: pip install pyarrow")
 
-        return self.service.GetAnaylsisLogFile(fileName)
+    return pyarrow.dataset.dataset(os.path.join(archive_dir, safe_filename(table_name)),
+                                   format="parquet" if file_format == "parquet" else "ipc",
+                                   partitioning=pyarrow.dataset.HivePartitioning(pyarrow.schema([("project", pyarrow.string()),
+                                                                                                 ("operational_state", pyarrow.string()),
+                                                                                                 ("run", pyarrow.string())]),
+                                                                                 segment_encoding="uri"))
 
 
-    def GetCalcParameterAttributes(self, project, analysisType="LoadFlow"):
-        """Returns parameters  of  the  given  analysis  type  for the given project"""
-        # TODO validate the analysisType
-        return api.service.GetCalcParameterAttributes(project, analysisType)
+# --- RESULT DIFF ---
 
-    def GetCalcParameterAttributesDescription(self, analysisType="LoadFlow"):
-        """Returns parameters  of  the  given  analysis  type  for the given project"""
-        # TODO validate the analysisType
-        # TODO report that description is missing
-        return api.service.GetCalcParameterAttributesDescription(analysisType)
+# Absolute thresholds per result column, smaller changes are ignored: voltage in kV and %, angle in degree,
+# loading in %, current in A, power in MW and Mvar
+DIFF_THRESHOLDS = {"U": 0.1, "u": 0.1, "Uang": 0.5,
+                   "Loading": 1.0, "I": 1.0, "I1": 1.0, "I2": 1.0,
+                   "P": 0.5, "Q": 0.5, "P1": 0.5, "Q1": 0.5, "P2": 0.5, "Q2": 0.5,
+                   "PLoss": 0.05, "QLoss": 0.05}
 
+# Columns identifying a record, the first one found in both tables is used
+DIFF_KEY_COLUMNS = ("ID", "ElementID", "Zone", "Name")
 
-    def GetProject(self, projectName= "", variantName= "",  diagramName= "", layerName= ""):
 
-        """Gets a project based on the name
-           GetProject(projectName: xsd:string, variantName: xsd:string, diagramName: xsd:string, layerName: xsd:string) -> GetProjectResult: ns2:ExternalProject"""
+def _compare_result_table(previous, current, thresholds, default_threshold, key_columns):
 
-        if self.debug:
-            print("INFO - Getting project: {}".format(projectName))
+    """Aligns current to previous by the key column and compares all numeric columns with a threshold in one vectorized pass
+    Output: dict with key, columns, positions (row of previous per current row, -1 if added), matched, changed, deltas and removed"""
 
-        project = self.service.GetProject(projectName, variantName,  diagramName, layerName)
+    key = next((column for column in key_columns if column in previous.columns and column in current.columns), None)
 
-        if project is None or project.ProjectID is None:
+    if key is None:
+        raise ValueError("No key column ({}) found in both result tables".format(", ".join(key_columns)))
 
-            print(locals())
-            print('ERROR - Project not found')
+    # Keys are expected to be unique, the last record of a key wins
+    previous = previous.drop_duplicates(key, keep="last")
+    current  = current.drop_duplicates(key, keep="last")
 
-        return project
+    columns = [column for column in current.columns
+               if column != key and column in previous.columns and (column in thresholds or default_threshold is not None)
+               and current[column].dtype.kind == "f" and previous[column].dtype.kind == "f"]
 
-    def GetProjects(self):
+    positions = pandas.Index(previous[key]).get_indexer(current[key])
+    matched   = positions >= 0
+    rows      = numpy.where(matched, positions, 0)
+    changed   = numpy.zeros(len(current), dtype=bool)
+    deltas    = {}
 
-        """Gets a project based on the name
-           GetProject(projectName: xsd:string, variantName: xsd:string, diagramName: xsd:string, layerName: xsd:string) -> GetProjectResult: ns2:ExternalProject"""
+    for column in columns:
 
-        if self.debug:
-            print("INFO - Getting all projects")
+        current_values  = current[column].to_numpy(dtype=numpy.float64)
+        previous_values = previous[column].to_numpy(dtype=numpy.float64)[rows] if len(previous) else numpy.full(len(current), numpy.nan)
+        delta = current_values - previous_values
 
-        projects = self.service.GetProjects()
+        # A value that appears or disappears is always a change
+        with numpy.errstate(invalid="ignore"):
+            column_changed = (numpy.abs(delta) > thresholds.get(column, default_threshold)) | (numpy.isnan(current_values) != numpy.isnan(previous_values))
 
-        if projects is None :
+        changed |= column_changed & matched
+        deltas[column] = delta
 
-            print(locals())
-            print('ERROR - ')
+    removed = pandas.Index(current[key]).get_indexer(previous[key]) < 0
 
-        return projects
+    return {"key": key, "columns": columns, "previous": previous, "current": current, "positions": positions, "matched": matched,
+            "changed": changed, "deltas": deltas, "removed": removed}
 
-    def GetLogFileAsList(self, print_log=False):
-        """Returns whole user activity logfile as a list"""
-        log_list = self.service.GetLogFileAsList()
 
-        if print_log:
-            for entry in log_list:
-                print(entry)
+def _changed_rows(comparison):
 
-        return log_list
+    """Builds the DataFrame of changed, added and removed rows of a comparison"""
 
+    key, columns = comparison["key"], comparison["columns"]
+    matched, removed = comparison["matched"], comparison["removed"]
+    selected = comparison["changed"] | ~matched
 
-    def GetLogFileAsString(self):
-        """Returns whole user activity logfile as a string"""
+    data = {key:      comparison["current"][key].to_numpy()[selected],
+            "change": numpy.where(matched[selected], "changed", "added")}
 
-        return self.service.GetLogFileAsString()
+    for column in columns:
+        data[column]            = comparison["current"][column].to_numpy(dtype=numpy.float64)[selected]
+        data[column + "_delta"] = numpy.where(matched[selected], comparison["deltas"][column][selected], numpy.nan)
 
-    def GetLogOnSessionID(self, project=""):
-        """Get the session id for login to NEPLAN. Add the session id to the base url of NEPLAN"""
+    changes = pandas.DataFrame(data)
 
-        return self.service.GetLogOnSessionID(project)
+    if removed.any():
+        removed_rows = {key: comparison["previous"][key].to_numpy()[removed], "change": "removed"}
+        removed_rows.update({name: numpy.nan for name in changes.columns if name not in removed_rows})
+        changes = pandas.concat([changes, pandas.DataFrame(removed_rows)[changes.columns]], ignore_index=True)
 
-    def GetLogOnUrl(self):
-        """returns logon url for the current user session
-        GetLogOnUrl() -> GetLogOnUrlResult: xsd:string"""
+    return changes
 
-        localhost_url = self.service.GetLogOnUrl()
 
-        updated_url = self.update_url_to_current_server(localhost_url)
+def diff_result_table(previous, current, thresholds=DIFF_THRESHOLDS, default_threshold=None, key_columns=DIFF_KEY_COLUMNS):
+    """Returns the rows of a result table (see parse_result_file) that changed between two runs
 
-        return updated_url
+    Records are matched by the first of key_columns found in both tables. A record is changed if any numeric column with a
+    threshold changed by more than it, or got or lost a value. default_threshold also compares all other numeric columns.
+    Output: DataFrame with the key column, change (changed, added, removed), the current value and <column>_delta
+            (current - previous) of every compared column, unchanged records are not included"""
 
+    return _changed_rows(_compare_result_table(previous, current, thresholds, default_threshold, key_columns))
 
-    def GetLogOnUrlWithProject(self, project):
-        """returns logon url for the current user session and project
-        GetLogOnUrlWithProject(project: ns2:ExternalProject) -> GetLogOnUrlWithProjectResult: xsd:string"""
 
-        localhost_url = self.service.GetLogOnUrlWithProject(project)
+def diff_result_tables(previous_tables, current_tables, thresholds=DIFF_THRESHOLDS, default_threshold=None, key_columns=DIFF_KEY_COLUMNS):
+    """Returns the changed rows of all result tables between two runs, see diff_result_table
+    Tables without any change are left out, tables without key column are skipped with a warning
+    Output: dict of table name -> DataFrame of changed rows"""
 
-        updated_url = self.update_url_to_current_server(localhost_url)
+    changes = {}
 
-        return updated_url
+    for table_name in list(current_tables) + [name for name in previous_tables if name not in current_tables]:
 
+        current  = current_tables.get(table_name)
+        previous = previous_tables.get(table_name)
+        current  = previous.iloc[0:0] if current is None else current
+        previous = current.iloc[0:0] if previous is None else previous
 
-    def AnalyseVariant(self, project, analysisRefenceID= str(uuid4()), analysisModule = "LoadFlow", calcNameID = "", analysisMethode = "", conditions = "", analysisLoadOptionXML = ""):
+        try:
+            table_changes = diff_result_table(previous, current, thresholds, default_threshold, key_columns)
+        except ValueError as error:
+            print("WARNING - Result table {} not compared: {}".format(table_name, error))
+            continue
 
-        """ This function runs selected analyses on loaded project, by default LoadFlow -> returns: analysis_variant_result
-        AnalyseVariant(project: ns2:ExternalProject, analysisRefenceID: xsd:string, analysisModule: xsd:string, calcNameID: xsd:string, analysisMethode: xsd:string, conditions: xsd:string, analysisLoadOptionXML: xsd:string) -> AnalyseVariantResult: ns2:AnalysisReturnInfo"""
+        if len(table_changes):
+            changes[table_name] = table_changes
 
-        analysis_variant_result = self.service.AnalyseVariant(project, analysisRefenceID, analysisModule, calcNameID, analysisMethode, conditions, analysisLoadOptionXML)
+    return changes
 
-        return analysis_variant_result
 
-    def GetSubAreaIDByName(self, project, subAreaName):
-        """Get the subarea ID of the given subarea name"""
-        return self.service.GetSubAreaIDByName(project, subAreaName)
+class ResultDiffStore():
+    """Stores only the changes between consecutive load flow results of each project and operational state
 
-    def GetSubAreaNameByID(self, project, subAreaID):
-        """Get the subarea name of the given subarea ID"""
-        return self.service.GetSubAreaNameByID(project, subAreaID)
+    Every table keeps a reference snapshot per project and operational state, memory mapped Arrow files in
+    <store_dir>/reference/<project>/<operational state>/. A new run is compared against the reference and only the changed
+    rows are written, in the layout of archive_loadflow_results below <store_dir>/changes, so read_archive works on them.
+    The reference only takes over values that were reported as changed, slow drifts below the thresholds are therefore
+    reported as soon as they add up to a threshold.
 
-    def GetZoneIDByName(self, project, zoneName):
-        """Get the Zone ID of the given Zone name"""
-        return self.service.GetZoneIDByName(project, zoneName)
+        store = ResultDiffStore("monitoring")
+        changes = store.update("Project", "State", api.GetAnalysisResultTables(analysis_response.ResultFilename))
+        read_archive(store.changes_dir, "node").to_table().to_pandas()
+    """
 
-    def GetZoneNameByID(self, project, zoneID):
-        """Get the Zone name of the given Zone ID"""
-        return self.service.GetZoneNameByID(project, zoneID)
+    def __init__(self, store_dir, thresholds=DIFF_THRESHOLDS, default_threshold=None, key_columns=DIFF_KEY_COLUMNS, file_format="parquet"):
 
+        if not pyarrow:
+            raise RuntimeError("Result diff store needs pyarrow: pip install pyarrow")
 
+        self.store_dir         = store_dir
+        self.changes_dir       = os.path.join(store_dir, "changes")
+        self.thresholds        = thresholds
+        self.default_threshold = default_threshold
+        self.key_columns       = key_columns
+        self.file_format       = file_format
 
 
+    def _reference_dir(self, project_name, operational_state_name):
 
+        return os.path.join(self.store_dir, "reference", archive_partition(project_name), archive_partition(operational_state_name))
 
-    # NATIVE FUNCTIONS - END
 
-    # CUSTOM FUNCTIONS - START
+    def reference(self, project_name, operational_state_name):
 
-    def run_loadflow(self, project_name, operational_state_name = ""):
-        """Run basic loadflow analyses, operational state name is optional.
+        """Returns the reference tables of the project and operational state, an empty dict before the first update"""
 
-        Input : project_name, operational_state_name = ""
-        Output: results_xml, analysis_response, project, process_log"""
+        reference_dir = self._reference_dir(project_name, operational_state_name)
 
-        # START TIMER
-        start_time = datetime.now()
+        if not os.path.isdir(reference_dir):
+            return {}
 
-        # Get project and run loadflow
-        project           = self.GetProject(project_name)
-        _,start_time = self.print_duration("Project Loaded -> ", start_time)
+        return {os.path.splitext(name)[0]: pyarrow.feather.read_table(os.path.join(reference_dir, name), memory_map=True).to_pandas()
+                for name in os.listdir(reference_dir) if name.endswith(".arrow")}
 
-        analysis_response = self.AnalyseVariant(project, analysisModule = "LoadFlow", calcNameID = operational_state_name)
-        _,start_time = self.print_duration("Load Flow finished -> ", start_time)
 
-        # Get analysis process log
-        process_log = self.GetAnaylsisLogFile(analysis_response.LogFilename)
-        _,start_time = self.print_duration("Log file retrived -> ", start_time)
+    def _write_reference(self, reference_dir, table_name, table):
 
-        # Get analysis result log
-        results_xml = self.GetAnalysisResultFile(analysis_response.ResultFilename)
-        _,start_time = self.print_duration("Results file retrived -> ", start_time)
+        """Writes the reference table atomically, so parallel readers never see half written files"""
 
+        os.makedirs(reference_dir, exist_ok=True)
+        path = os.path.join(reference_dir, safe_filename(table_name) + ".arrow")
+        temporary_path = "{}.{}.tmp".format(path, uuid4().hex)
 
-        if results_xml:
-            print("XML Result File received")
-            #results_xml = etree.fromstring(results_xml)
+        pyarrow.feather.write_feather(pyarrow.Table.from_pandas(table, preserve_index=False), temporary_path, compression="uncompressed")
+        os.replace(temporary_path, path)
 
 
-        else:
-            project_logon_url = self.GetLogOnUrlWithProject(project)
-            print("No XML results returned, you haven't enabled 'Write XML result file' under Parameters->Storage/Messages.\n You can use this url to open the project: {}".format(project_logon_url))
+    def _next_reference(self, comparison):
 
+        """Returns the current table with the previous values in all compared columns of the records not reported as changed"""
 
-        return results_xml, analysis_response, project, process_log
+        reference = comparison["current"].reset_index(drop=True)
+        kept = comparison["matched"] & ~comparison["changed"]
 
-    def CIMExport(self, project, file_path="Export.zip",
-                  ENTSOEZIP=True,
-                  ExportEQ=True,
-                  ExportSSH=True,
-                  ExportTP=True,
-                  ExportSV=True,
-                  ExportMerged=False,
-                  ExportDL=False,
-                  ExportGL=False,
-                  ExportDY=False,
-                  ExportSVShortCircuit=False,
-                  BoundaryPath=None,
-                  BoundaryAreaName="EU",
-                  DynamicLineRatingPath=None,
-                  MAS="",
-                  Period="1D",
-                  ScenarioDateTime=datetime.utcnow(),
-                  Version="001",
-                  Description="Neplan Export",
-                  ExportAsCGMES3=False,
-                  ExportBoundary=False,
-                  FileHeaderComment="OPDE Confidential",
-                  IsAutomatedExport=True,
-                  EqFileCIMID=False,
-                  KeepEQIDConstant=True,
-                  AreasToExport=[],
-                  AreasToExportNames=[],
-                  ListOfMASForSVExport=[],
-                  BalticCGMArea=None,
-                  BalticRSCExport=False,
-                  ExcludeBRELL=True,
-                  runPowerFlow=False,
-                  operationalState=None
-                  ):
+        if kept.any():
+            rows = comparison["positions"][kept]
+            reference = reference.copy()
+            for column in comparison["columns"]:
+                values = reference[column].to_numpy(dtype=numpy.float64, copy=True)
+                values[kept] = comparison["previous"][column].to_numpy(dtype=numpy.float64)[rows]
+                reference[column] = values
 
-        """Performs CIM export on the specified project, exports all CIM files to defined filepath, by default 'Export.zip'"""
+        return reference
 
-        if BoundaryPath:
-            with open(BoundaryPath, "rb") as file_object:
-
-                print("Uploading boundary to Neplan")
-                BoundaryPath = self.service.ZipUpload(stream=file_object.read())
-                print(BoundaryPath)
-
-
-        #ns13:CimExportOptions(AreasToExport: ns4:ArrayOfguid, AreasToExportNames: ns4:ArrayOfstring, BalticCGMArea: xsd:string, BalticRSCExport: xsd:boolean, BoundaryAreaName: xsd:string, BoundaryPath: xsd:string, Description: xsd:string, DynamicLineRatingPath: xsd:string, ENTSOEZIP: xsd:boolean, EqFileCIMID: xsd:string, ExcludeBRELL: xsd:boolean, ExportAsCGMES3: xsd:boolean, ExportBoundary: xsd:boolean, ExportDL: xsd:boolean, ExportDY: xsd:boolean, ExportEQ: xsd:boolean, ExportGL: xsd:boolean, ExportMerged: xsd:boolean, ExportSSH: xsd:boolean, ExportSV: xsd:boolean, ExportSVShortCircuit: xsd:boolean, ExportTP: xsd:boolean, FileHeaderComment: xsd:string, IsAutomatedExport: xsd:boolean, KeepEQIDConstant: xsd:boolean, ListOfMASForSVExport: ns4:ArrayOfKeyValueOfstringArrayOfstringty7Ep6D1, MAS: xsd:string, Period: xsd:string, ScenarioDateTime: xsd:dateTime, Version: xsd:string)
-
-        CIMOptions = {  'AreasToExport': AreasToExport, #ns4:ArrayOfguid
-                        'AreasToExportNames': AreasToExportNames, #ns4:ArrayOfstring
-                        'BalticCGMArea': BalticCGMArea, #xsd:string
-                        'BalticRSCExport': BalticRSCExport, #xsd:boolean
-                        'BoundaryAreaName': BoundaryAreaName, #xsd:string
-                        'BoundaryPath': BoundaryPath, #xsd:string
-                        'Description': Description, #xsd:string
-                        'DynamicLineRatingPath': DynamicLineRatingPath, #xsd:string
-                        'ENTSOEZIP': ENTSOEZIP, #xsd:boolean
-                        'EqFileCIMID': EqFileCIMID, #xsd:string
-                        'ExcludeBRELL': ExcludeBRELL, #xsd:boolean
-                        'ExportAsCGMES3': ExportAsCGMES3, #xsd:boolean
-                        'ExportBoundary': ExportBoundary, #xsd:boolean
-                        'ExportDL': ExportDL, #xsd:boolean
-                        'ExportDY': ExportDY, #xsd:boolean
-                        'ExportEQ': ExportEQ, #xsd:boolean
-                        'ExportGL': ExportGL, #xsd:boolean
-                        'ExportMerged': ExportMerged, #xsd:boolean
-                        'ExportSSH': ExportSSH, #xsd:boolean
-                        'ExportSV': ExportSV, #xsd:boolean
-                        'ExportSVShortCircuit': ExportSVShortCircuit, #xsd:boolean
-                        'ExportTP': ExportTP, #xsd:boolean
-                        'FileHeaderComment': FileHeaderComment, #xsd:string
-                        'IsAutomatedExport': IsAutomatedExport, #xsd:boolean
-                        'KeepEQIDConstant': KeepEQIDConstant, #xsd:boolean
-                        'ListOfMASForSVExport': ListOfMASForSVExport, #ns4:ArrayOfKeyValueOfstringArrayOfstringty7Ep6D1
-                        'MAS': MAS, #xsd:string
-                        'Period': Period, #xsd:string
-                        'ScenarioDateTime': ScenarioDateTime, #xsd:dateTime
-                        'Version': Version, #xsd:string
-}
 
-        data = self.service.CIMExport(project, CIMOptions, operationalState=operationalState, runPowerFlow=runPowerFlow)
+    def update(self, project_name, operational_state_name, tables, analysis_response=None, run_time=None):
 
-        with open(file_path, "wb") as file_object:
-            print("INFO - exporting CIM data to {}".format(file_path))
-            written_bytes = file_object.write(data)
+        """Compares the parsed results of a new run (see parse_result_file) with the reference, stores the changed rows and
+        updates the reference. The first run of a project and operational state only sets the reference.
+        Output: dict of table name -> DataFrame of changed rows, see diff_result_table"""
 
-        if written_bytes == 0:
-            print("ERROR - Exported file is empty: {}".format(file_path))
-            return False
-        else:
-            return True
+        reference_dir = self._reference_dir(project_name, operational_state_name)
+        references = self.reference(project_name, operational_state_name)
+        first_run = not references
+        changes = {}
 
+        for table_name, table in tables.items():
 
-    def Import_from_List_files(self, inputFiles, projectName=None):
-        """Import NeplanList Files to Neplan from local path"""
-        # If no project name has been provided, create one automatically based on first provided filename
-        file_path = Path(inputFiles)
-        print(f'Importing to {projectName} file {inputFiles}.')
-        if file_path.exists():
-            with file_path.open("rb") as file_object:
-                response_filename=self.service.XMLUpload(stream=file_object.read())
-                print(f"Filename {response_filename}")
+            previous = references.pop(safe_filename(table_name), None)
 
-                try:
-                     response = self.service.ImportFromListFile(uploadName=response_filename, projectName="Test_so_doof", copySettingsFromProjectName="test")
-                except Fault as fault:
-                    parsed_fault_detail = self.wsdl.types.deserialize(fault.detail[0])
-                    print(parsed_fault_detail)
-                    print("test")
-                    self.print_last_messageexchange()
+            if previous is None:
+                previous = table.iloc[0:0]
 
-        else:
-            #print(f"Could not find {file_path}.")
-            response = "ERROR"
-        return response
-        
+            try:
+                comparison = _compare_result_table(previous, table, self.thresholds, self.default_threshold, self.key_columns)
+            except ValueError as error:
+                print("WARNING - Result table {} not compared: {}".format(table_name, error))
+                continue
 
-    def DeleteMarkedAdDeletedProject(self):
-        """Delete Delete all the own projects marked as deleted.
-        As and admin all the projects marked as deleted will be deleted 
-        return = Number of deleted projects"""
-        response = self.service.DeleteMarkedAdDeletedProject()
-        return response
+            if not first_run:
+                table_changes = _changed_rows(comparison)
+                if len(table_changes):
+                    changes[table_name] = table_changes
 
-    def CIMImport(self, projectName, inputFiles, isLocalPath=False):
-        """Import CIM files to Neplan"""
+            if first_run or comparison["changed"].any() or not comparison["matched"].all() or comparison["removed"].any():
+                self._write_reference(reference_dir, table_name, self._next_reference(comparison))
 
-        #array_of_strings = [{"string": file_path} for file_path in inputFiles]
+        # Tables missing in the new run, all their records are removed
+        for table_name, previous in references.items():
+            changes[table_name] = _changed_rows(_compare_result_table(previous, previous.iloc[0:0], self.thresholds, self.default_threshold, self.key_columns))
+            os.remove(os.path.join(reference_dir, table_name + ".arrow"))
 
-        response = self.service.CIMImport(inputFiles={"string":inputFiles},
-                                           isLocalPath=isLocalPath,
-                                           projectName=projectName,
-                                           userName=self.username)
-        return response
+        if changes:
+            archive_loadflow_results(self.changes_dir, project_name, operational_state_name, changes, analysis_response, run_time, file_format=self.file_format)
+
+        return changes
 
 
 if __name__ == "__main__":
@@ -632,11 +5268,18 @@ if __name__ == "__main__":
     subparsers = argParser.add_subparsers(dest='mode')
     #Config für File Import
     parser_import = subparsers.add_parser('importFiles', help='Import Modus')
-    parser_import.add_argument("-w", "--webSer", help="WebService Adress", required=True)
+    parser_import.add_argument("-w", "--webSer", help="WebService Adress, with several addresses the files are distributed over the servers", nargs="+", required=True)
     parser_import.add_argument("-u", "--user", help="Username", required=True)
     parser_import.add_argument("-p", "--passwd", help="Password, as SHA1 Passphrase use crypt to encode password", required=True)
-    parser_import.add_argument("-i", "--ifile", help="Input File", required=True)
-    parser_import.add_argument("-L", "--ListFile", help="Input CSV Filelist for Import or analysis")
+    parser_import.add_argument("-i", "--ifile", help="Input File")
+    parser_import.add_argument("-n", "--project", help="Project name for the input file, by default the file name")
+    parser_import.add_argument("-L", "--ListFile", help="Input CSV Filelist for Import or analysis, with file and project name per line")
+    parser_import.add_argument("-c", "--copySettingsFrom", help="Project whose settings are copied into the new projects", default="test")
+    parser_import.add_argument("--uploads", help="Number of files uploaded at the same time", type=int, default=4)
+    parser_import.add_argument("--imports", help="Number of imports running on the server at the same time", type=int, default=2)
+    parser_import.add_argument("-r", "--report", help="Write the per file status and timing as CSV to this file")
+    parser_import.add_argument("--dispatch", help="Choice of the server with several servers, fewest jobs in flight or lowest expected wait", choices=ServerPool.STRATEGIES, default="queue")
+    parser_import.add_argument("--uploadRegistry", help="Upload files with the same content only once per server, registry in this json file or the default cache directory", nargs="?", const=True)
     #Config für LoadFlow Analyse
     parser_flow = subparsers.add_parser('LoadFlow', help='Do Loadflow Analysis')
     parser_flow.add_argument("-w", "--webSer", help="WebService Adress", required=True)
@@ -644,30 +5287,159 @@ if __name__ == "__main__":
     parser_flow.add_argument("-p", "--passwd", help="Password, as SHA1 Passphrase use crypt to encode password", required=True)
     parser_flow.add_argument("-n", "--project", help="Project Name that has to be analyzed", required=True)
     parser_flow.add_argument("-o", "--outputDir", help="Output location of the Analyze XML file and result", required=True)
+    parser_flow.add_argument("-a", "--archiveDir", help="Also store parsed results partitioned by project, operational state and run in this directory")
+    parser_flow.add_argument("--archiveFormat", help="File format of the result archive", choices=["parquet", "arrow"], default="parquet")
+    parser_flow.add_argument("--resultCache", help="Reuse results of earlier runs with the same inputs, cached in this directory or the default cache directory, needs --changeMarker", nargs="?", const=True)
+    parser_flow.add_argument("--changeMarker", help="State of the project for the result cache, e.g. the model version, change it whenever element parameters change")
+    parser_flow.add_argument("--cacheSizeMB", help="Maximum size of the result cache", type=int, default=2048)
+    parser_flow.add_argument("--refresh", help="Run the analysis even if cached results exist", action="store_true")
+    parser_flow.add_argument("--diffDir", help="Store only the result changes against the previous run in this directory")
+    #Config für Batch LoadFlow Analyse
+    parser_batch = subparsers.add_parser('LoadFlowBatch', help='Do Loadflow Analysis for many projects and operational states in parallel')
+    parser_batch.add_argument("-w", "--webSer", help="WebService Adress, with several addresses the analyses are distributed over the servers", nargs="+", required=True)
+    parser_batch.add_argument("-u", "--user", help="Username", required=True)
+    parser_batch.add_argument("-p", "--passwd", help="Password, as SHA1 Passphrase use crypt to encode password", required=True)
+    parser_batch.add_argument("-L", "--ListFile", help="Input CSV with project name and operational state per line")
+    parser_batch.add_argument("-n", "--project", help="Project Name that has to be analyzed, can be repeated", action="append", default=[])
+    parser_batch.add_argument("-s", "--operationalState", help="Operational state for all given projects, can be repeated", action="append", default=[])
+    parser_batch.add_argument("-o", "--outputDir", help="Output location of the Analyze XML files and logs", required=True)
+    parser_batch.add_argument("-j", "--workers", help="Number of parallel workers", type=int, default=4)
+    parser_batch.add_argument("-a", "--maxAnalyses", help="Number of analyses running on the server at the same time, by default number of workers", type=int)
+    parser_batch.add_argument("--processes", help="Use worker processes instead of threads", action="store_true")
+    parser_batch.add_argument("--noLog", help="Do not download the analysis logs", action="store_true")
+    parser_batch.add_argument("--archiveDir", help="Also store parsed results partitioned by project, operational state and run in this directory")
+    parser_batch.add_argument("--archiveFormat", help="File format of the result archive", choices=["parquet", "arrow"], default="parquet")
+    parser_batch.add_argument("--adaptive", help="Adapt the calls in flight per operation class to server latency and failures, per worker process with --processes", action="store_true")
+    parser_batch.add_argument("--metrics", help="Write the SOAP call metrics to this file, JSON if it ends with .json, else Prometheus text")
+    parser_batch.add_argument("--resultCache", help="Reuse results of earlier runs with the same inputs, cached in this directory or the default cache directory, needs --changeMarker", nargs="?", const=True)
+    parser_batch.add_argument("--changeMarker", help="State of the projects for the result cache, e.g. the model version, change it whenever element parameters change")
+    parser_batch.add_argument("--cacheSizeMB", help="Maximum size of the result cache", type=int, default=2048)
+    parser_batch.add_argument("--refresh", help="Run the analyses even if cached results exist", action="store_true")
+    parser_batch.add_argument("--diffDir", help="Store only the result changes against the previous run of each project and operational state in this directory")
+    parser_batch.add_argument("--dispatch", help="Choice of the server with several servers, fewest jobs in flight or lowest expected wait", choices=ServerPool.STRATEGIES, default="queue")
+    #Config für CIM Export vieler Szenarien
+    parser_export = subparsers.add_parser('CIMExportBatch', help='CIM export of a project for every combination of scenario time, areas, MAS and period')
+    parser_export.add_argument("-w", "--webSer", help="WebService Adress, with several addresses the exports are distributed over the servers", nargs="+", required=True)
+    parser_export.add_argument("-u", "--user", help="Username", required=True)
+    parser_export.add_argument("-p", "--passwd", help="Password, as SHA1 Passphrase use crypt to encode password", required=True)
+    parser_export.add_argument("-n", "--project", help="Project Name that has to be exported", required=True)
+    parser_export.add_argument("-o", "--outputDir", help="Output location of the zip files, exports already there are skipped", required=True)
+    parser_export.add_argument("-t", "--times", help="Scenario times in ISO 8601, UTC if no offset is given", nargs="+", default=[])
+    parser_export.add_argument("--start", help="First scenario time of a series, with --end and --step")
+    parser_export.add_argument("--end", help="Last scenario time of a series")
+    parser_export.add_argument("--step", help="Minutes between the scenario times of a series", type=int, default=60)
+    parser_export.add_argument("-a", "--areas", help="Area sets to export, names of one set separated by +, by default all areas", nargs="+")
+    parser_export.add_argument("-m", "--mas", help="Model authority sets, by default the MAS of the project", nargs="+")
+    parser_export.add_argument("--periods", help="Period values", nargs="+", default=["1D"])
+    parser_export.add_argument("-b", "--boundary", help="Boundary zip uploaded once for all exports")
+    parser_export.add_argument("-j", "--workers", help="Number of exports at the same time", type=int, default=2)
+    parser_export.add_argument("--runPowerFlow", help="Run a power flow before every export", action="store_true")
+    parser_export.add_argument("-s", "--operationalState", help="Operational state of the exports")
+    parser_export.add_argument("--refresh", help="Export all scenarios again, also those already in the output directory", action="store_true")
+    parser_export.add_argument("-r", "--report", help="Write the per export status and timing as CSV to this file")
+    parser_export.add_argument("--uploadRegistry", help="Upload a boundary with the same content only once per server, registry in this json file or the default cache directory", nargs="?", const=True)
+    parser_export.add_argument("--dispatch", help="Choice of the server with several servers, fewest jobs in flight or lowest expected wait", choices=ServerPool.STRATEGIES, default="queue")
     #Config für einzelene Befehle die ausgeführt werden sollen
     parser_single = subparsers.add_parser('Single', help='Do a single Command')
     parser_single.add_argument("-w", "--webSer", help="WebService Adress", required=True)
     parser_single.add_argument("-u", "--user", help="Username", required=True)
     parser_single.add_argument("-p", "--passwd", help="Password, as SHA1 Passphrase use crypt to encode password", required=True)
     parser_single.add_argument("-c", "--command", help="defines the Single Command", required=True)
+    #Config für User Activity Log
+    parser_log = subparsers.add_parser('activityLog', help='Print new entries of the user activity log')
+    parser_log.add_argument("-w", "--webSer", help="WebService Adress", required=True)
+    parser_log.add_argument("-u", "--user", help="Username", required=True)
+    parser_log.add_argument("-p", "--passwd", help="Password, as SHA1 Passphrase use crypt to encode password", required=True)
+    parser_log.add_argument("-s", "--state", help="Keep the cursor in this file, only entries added since the last run are printed")
+    parser_log.add_argument("-f", "--follow", help="Keep polling and print new entries as they come", action="store_true")
+    parser_log.add_argument("-i", "--interval", help="Poll interval with --follow in seconds", type=float, default=5.0)
+    parser_log.add_argument("--maxInterval", help="Without new entries the poll interval doubles up to this many seconds", type=float)
+    parser_log.add_argument("-l", "--level", help="Print only entries of this level, can be repeated", action="append")
+    parser_log.add_argument("--new", help="Skip the entries already in the log at the first poll", action="store_true")
+    parser_log.add_argument("--json", help="Print one JSON object per entry", action="store_true")
+    #Config für Daemon mit warmen Clients
+    parser_daemon = subparsers.add_parser('daemon', help='Keep warm clients and run jobs submitted with the client mode')
+    parser_daemon.add_argument("-w", "--webSer", help="WebService Adress, with several addresses the jobs are distributed over the servers", nargs="+", required=True)
+    parser_daemon.add_argument("-u", "--user", help="Username", required=True)
+    parser_daemon.add_argument("-p", "--passwd", help="Password, as SHA1 Passphrase use crypt to encode password", required=True)
+    parser_daemon.add_argument("-s", "--socket", help="Unix socket for the jobs", default=DEFAULT_DAEMON_SOCKET)
+    parser_daemon.add_argument("--port", help="Listen on this HTTP port of --host instead of the Unix socket, needs a token", type=int)
+    parser_daemon.add_argument("--host", help="Loopback listen address with --port", default="127.0.0.1")
+    parser_daemon.add_argument("--token", help="Token the clients send with --port, by default the environment variable NEPLAN_DAEMON_TOKEN", default=os.environ.get("NEPLAN_DAEMON_TOKEN"))
+    parser_daemon.add_argument("--outputRoot", help="With --port jobs read and write files only below this directory, by default the working directory")
+    parser_daemon.add_argument("-j", "--workers", help="Number of jobs running at the same time", type=int, default=4)
+    parser_daemon.add_argument("-a", "--maxAnalyses", help="Number of analyses running on the server at the same time, by default number of workers", type=int)
+    parser_daemon.add_argument("--dispatch", help="Choice of the server with several servers, fewest jobs in flight or lowest expected wait", choices=ServerPool.STRATEGIES, default="queue")
+    parser_daemon.add_argument("--adaptive", help="Adapt the calls in flight per operation class to server latency and failures", action="store_true")
+    parser_daemon.add_argument("--resultCache", help="Reuse results of earlier runs with the same inputs, cached in this directory or the default cache directory, loadflow jobs then need a change_marker", nargs="?", const=True)
+    parser_daemon.add_argument("--cacheSizeMB", help="Maximum size of the result cache", type=int, default=2048)
+    parser_daemon.add_argument("--uploadRegistry", help="Upload boundary and list files with the same content only once per server, registry in this json file or the default cache directory", nargs="?", const=True)
+    #Config für Client des Daemons
+    parser_client = subparsers.add_parser('client', help='Submit jobs to a running daemon and query them')
+    parser_client.add_argument("-c", "--command", help="Job type to submit, or query of the daemon", required=True,
+                               choices=["loadflow", "import", "cimexport", "call", "status", "job", "jobs", "shutdown"])
+    parser_client.add_argument("-s", "--socket", help="Unix socket of the daemon", default=DEFAULT_DAEMON_SOCKET)
+    parser_client.add_argument("--url", help="HTTP address of a daemon started with --port, instead of the Unix socket")
+    parser_client.add_argument("--token", help="Token of a daemon started with --port, by default the environment variable NEPLAN_DAEMON_TOKEN", default=os.environ.get("NEPLAN_DAEMON_TOKEN"))
+    parser_client.add_argument("-n", "--project", help="Project name of loadflow, import and cimexport")
+    parser_client.add_argument("--operationalState", help="Operational state of loadflow", default="")
+    parser_client.add_argument("--changeMarker", help="State of the project for the result cache of the daemon, e.g. the model version")
+    parser_client.add_argument("-o", "--outputDir", help="Output location of the loadflow result files")
+    parser_client.add_argument("-i", "--ifile", help="Input file of import, output zip file of cimexport")
+    parser_client.add_argument("-m", "--method", help="NeplanService method of call, e.g. GetProjects")
+    parser_client.add_argument("--args", help="JSON list of positional arguments of call", default="[]")
+    parser_client.add_argument("--options", help="JSON object of further job parameters, keyword arguments of call or CIMExport options", default="{}")
+    parser_client.add_argument("--id", help="Job id of job")
+    parser_client.add_argument("--wait", help="Wait up to this many seconds for the end of the job", type=float)
     parser_crypt = subparsers.add_parser('crypt', help='Crypt the password for later use in Service')
     parser_crypt.add_argument("-p", "--password", help="Password that should be cryptes as SHA", required=True)
+    parser_cache = subparsers.add_parser('clearCache', help='Remove the locally cached WSDL files')
+    parser_cache.add_argument("-w", "--webSer", help="WebService Adress, if not given the cache of all servers is removed")
+    parser_cache.add_argument("-r", "--results", help="Remove the cached load flow results instead, from this directory or the default cache directory", nargs="?", const=True)
+    parser_cache.add_argument("--uploads", help="Forget the uploaded files instead, of --webSer or all servers, in this json file or the default registry", nargs="?", const=True)
 
 
     args = argParser.parse_args()
     #Open Neplan Web Service
     print(args.mode)
     if args.mode == 'importFiles' :
-        #Upload the File
-        print(args.mode)
-        api = NeplanService(args.webSer, args.user, args.passwd, debug=True)
-        upload_response = api.Import_from_List_files(args.ifile, "TEST_IMPORT_PYTHON")
-        sys.stdout.write('Noch was zu tun')
-        sys.exit(0)
+        #Upload and import the files
+        jobs = read_import_jobs(args.ListFile) if args.ListFile else []
+        if args.ifile:
+            jobs.append((args.ifile, args.project or ""))
+
+        if not jobs:
+            print("No files given, use --ListFile or --ifile")
+            sys.exit(1)
+
+        if len(args.webSer) > 1:
+            api = ServerPool(args.webSer, args.user, args.passwd, strategy=args.dispatch, debug=True, pool_maxsize=max(args.uploads + args.imports, 10),
+                             upload_registry=args.uploadRegistry or False)
+            args.uploads, args.imports = args.uploads * len(api), args.imports * len(api)
+        else:
+            api = NeplanService(args.webSer[0], args.user, args.passwd, debug=True, pool_maxsize=max(args.uploads + args.imports, 10),
+                                upload_registry=args.uploadRegistry or False)
+        results = api.import_files_batch(jobs, max_uploads=args.uploads, max_imports=args.imports, copy_settings_from=args.copySettingsFrom)
+        if args.report:
+            write_import_report(args.report, results)
+            print("INFO - Import report written to {}".format(args.report))
+        sys.exit(0 if all(result["status"] == "ok" for result in results) else 1)
     elif args.mode == 'crypt' :
         #Crypt a Password
         cryptPassword(args.password)
 
+    elif args.mode == 'clearCache' :
+        if args.results:
+            #Remove cached load flow results
+            (ResultCache(args.results, debug=True) if isinstance(args.results, str) else ResultCache(debug=True)).invalidate()
+        elif args.uploads:
+            #Forget uploaded boundary and list files
+            (UploadRegistry(args.uploads, debug=True) if isinstance(args.uploads, str) else UploadRegistry(debug=True)).invalidate(args.webSer)
+        else:
+            #Remove cached WSDL
+            wsdl_url = "{}/Services/External/NeplanService.svc?singleWsdl".format(args.webSer) if args.webSer else None
+            WsdlCache(debug=True).invalidate(wsdl_url)
+
     elif args.mode == 'LoadFlow' :
         """Do LoadFlow Analysis of a project"""
         #Check if output Path exist
@@ -680,18 +5452,123 @@ if __name__ == "__main__":
                 print(f"Output Path does not exist {args.outputDir} !!!")
                 sys.exit(1)
             else:
-                api = NeplanService(args.webSer, args.user, args.passwd, debug=True)
-                analysisReferenceID = str(uuid4())
-                analysisResult = api.run_loadflow(args.project)
+                result_cache = result_cache_from_args(args)
+                api = NeplanService(args.webSer, args.user, args.passwd, debug=True, result_cache=result_cache)
+                analysisResult = api.run_loadflow(args.project, download_log=False, refresh=args.refresh, change_marker=args.changeMarker)
                 ##Get XML Analyse File and write to project folder
                 xmlResult = analysisResult[0]
                 OutputXMLCalcFile = pathlib.PurePath(args.outputDir, "CalculationResult.xml")
                 print(f"Writing {OutputXMLCalcFile}")
                 xmlFile = open(OutputXMLCalcFile, "wb")
                 xmlFile.write(xmlResult)
+                xmlFile.close()
+                if args.archiveDir and xmlResult:
+                    run = archive_loadflow_results(args.archiveDir, args.project, "", parse_result_file(xmlResult), analysisResult[1], file_format=args.archiveFormat)
+                    print(f"Results archived in {args.archiveDir} run {run}")
+                if args.diffDir and xmlResult:
+                    changes = ResultDiffStore(args.diffDir).update(args.project, "", parse_result_file(xmlResult), analysisResult[1])
+                    print("Changed rows: {}".format(", ".join(f"{table_name} {len(table_changes)}" for table_name, table_changes in changes.items()) or "none"))
                 sys.exit(0)
+    elif args.mode == 'LoadFlowBatch' :
+        """Do LoadFlow Analysis of many projects and operational states"""
+        if not os.path.isdir(args.outputDir):
+            print(f"Output Path does not exist or is not a path {args.outputDir} !!!")
+            sys.exit(1)
+
+        jobs = read_loadflow_jobs(args.ListFile) if args.ListFile else []
+        jobs += [(project_name, operational_state_name) for project_name in args.project for operational_state_name in (args.operationalState or [""])]
+
+        if not jobs:
+            print("No jobs given, use --ListFile or --project")
+            sys.exit(1)
+
+        if len(args.webSer) > 1 and args.processes:
+            print("Worker processes are not supported with several servers, leave out --processes")
+            sys.exit(1)
+
+        if len(args.webSer) > 1:
+            #Workers and analyses per server
+            api = ServerPool(args.webSer, args.user, args.passwd, strategy=args.dispatch, debug=True, pool_maxsize=max(args.workers, 10),
+                             concurrency_limiter=args.adaptive, result_cache=result_cache_from_args(args))
+            args.workers, args.maxAnalyses = args.workers * len(api), args.maxAnalyses and args.maxAnalyses * len(api)
+        else:
+            api = NeplanService(args.webSer[0], args.user, args.passwd, debug=True, pool_maxsize=max(args.workers, 10), concurrency_limiter=args.adaptive,
+                                result_cache=result_cache_from_args(args))
+        results = api.run_loadflow_batch(jobs, args.outputDir, max_workers=args.workers, max_analyses=args.maxAnalyses, use_processes=args.processes, download_log=not args.noLog,
+                                         archive_dir=args.archiveDir, archive_format=args.archiveFormat, refresh=args.refresh,
+                                         diff_dir=args.diffDir, change_marker=args.changeMarker)
+        if args.adaptive and not args.processes and isinstance(api, NeplanService):
+            print("INFO - Concurrency limits: {}".format(", ".join("{} {}".format(operation_class, stats["limit"]) for operation_class, stats in api.concurrency_stats().items())))
+        if args.metrics:
+            (api.combined_metrics() if isinstance(api, ServerPool) else api.metrics).write(args.metrics)
+            print("INFO - SOAP call metrics written to {}".format(args.metrics))
+        sys.exit(0 if all(result["status"] == "ok" for result in results) else 1)
+    elif args.mode == 'CIMExportBatch' :
+        """CIM export of a project for a grid of scenarios"""
+        times = args.times + (scenario_times(args.start, args.end, args.step) if args.start and args.end else [])
+
+        if not times:
+            print("No scenario times given, use --times or --start and --end")
+            sys.exit(1)
+
+        scenarios = cim_export_scenarios(times, [area_set.split("+") for area_set in args.areas] if args.areas else None, args.mas, args.periods)
+
+        if len(args.webSer) > 1:
+            #Exports per server
+            api = ServerPool(args.webSer, args.user, args.passwd, strategy=args.dispatch, debug=True, pool_maxsize=max(args.workers, 10),
+                             upload_registry=args.uploadRegistry or False)
+            args.workers = args.workers * len(api)
+        else:
+            api = NeplanService(args.webSer[0], args.user, args.passwd, debug=True, pool_maxsize=max(args.workers, 10), upload_registry=args.uploadRegistry or False)
+        results = api.cim_export_batch(args.project, scenarios, args.outputDir, max_workers=args.workers, refresh=args.refresh, BoundaryPath=args.boundary,
+                                       runPowerFlow=args.runPowerFlow, operationalState=args.operationalState)
+        if args.report:
+            write_cim_export_report(args.report, results)
+            print("INFO - Export report written to {}".format(args.report))
+        sys.exit(0 if all(result["status"] in ("ok", "skipped") for result in results) else 1)
+    elif args.mode == 'activityLog' :
+        """Print the new entries of the user activity log"""
+        api = NeplanService(args.webSer, args.user, args.passwd)
+        follower = api.follow_log(from_start=not args.new, state_file=args.state, levels=args.level)
+        records = follower.tail(args.interval, args.maxInterval) if args.follow else follower.poll()
+        try:
+            for record in records:
+                print(json.dumps(record.as_dict()) if args.json else "{} {:<7} {}".format(record.time or "", record.level, record.message), flush=True)
+        except KeyboardInterrupt:
+            pass
+    elif args.mode == 'daemon' :
+        """Keep warm clients and run the jobs of the client mode"""
+        options = {"debug": True, "pool_maxsize": max(args.workers, 10), "concurrency_limiter": args.adaptive, "result_cache": result_cache_from_args(args),
+                   "upload_registry": args.uploadRegistry or False}
+        if len(args.webSer) > 1:
+            api = ServerPool(args.webSer, args.user, args.passwd, strategy=args.dispatch, **options)
+        else:
+            api = NeplanService(args.webSer[0], args.user, args.passwd, **options)
+        daemon.NeplanDaemon(api, socket_path=None if args.port is not None else args.socket, host=args.host, port=args.port, max_workers=args.workers,
+                            max_analyses=args.maxAnalyses, debug=True, token=args.token, output_root=args.outputRoot).serve_forever()
+    elif args.mode == 'client' :
+        """Submit a job to the daemon or query it, prints the answer as JSON"""
+        client = daemon.DaemonClient(args.socket, args.url, token=args.token)
+        options = json.loads(args.options)
+        if args.command == 'loadflow':
+            if args.changeMarker:
+                options["change_marker"] = args.changeMarker
+            answer = client.submit("loadflow", dict(project=args.project, operational_state=args.operationalState, output_dir=os.path.abspath(args.outputDir or "."), **options), args.wait)
+        elif args.command == 'import':
+            answer = client.submit("import", dict(file=os.path.abspath(args.ifile), project=args.project or "", **options), args.wait)
+        elif args.command == 'cimexport':
+            answer = client.submit("cimexport", dict(project=args.project, file_path=os.path.abspath(args.ifile or "Export.zip"), **options), args.wait)
+        elif args.command == 'call':
+            answer = client.submit("call", {"method": args.method, "args": json.loads(args.args), "kwargs": options}, args.wait)
+        elif args.command == 'job':
+            answer = client.job(args.id, args.wait)
+        else:
+            answer = getattr(client, args.command)()
+        print(json.dumps(answer, indent=2))
+        sys.exit(1 if isinstance(answer, dict) and answer.get("status") == "failed" else 0)
     elif args.mode == 'Single' :
     # Test for single commands
+        set_display_options()
         api = NeplanService(args.webSer, args.user, args.passwd, debug=True)
         if args.command == 'getProjects':
             ##get all projects and show them
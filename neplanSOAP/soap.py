@@ -0,0 +1,310 @@
+#-------------------------------------------------------------------------------
+# Name:             Neplan 10 WS transport
+# Purpose:          zeep, requests and urllib3 based classes of the Neplan 10 webservice wrapper,
+#                   imported by service.py on first use so that lightweight modes start fast
+#
+# Licence:          GPLv2
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import contextvars
+import threading
+from collections import deque
+from contextlib import nullcontext
+
+import urllib3
+from urllib3 import PoolManager
+from requests.adapters import HTTPAdapter
+from lxml import etree
+from zeep import Transport
+from zeep.plugins import Plugin
+from zeep.proxy import ServiceProxy, AsyncServiceProxy, OperationProxy, AsyncOperationProxy
+from zeep.transports import AsyncTransport
+
+urllib3.disable_warnings()
+
+
+# --- TRANSPORT ---
+
+class CountingPoolManager(PoolManager):
+    """PoolManager that registers every created connection pool in ConnectionStats"""
+
+    def __init__(self, connection_stats, *args, **kwargs):
+
+        self.connection_stats = connection_stats
+        super().__init__(*args, **kwargs)
+
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+
+        pool = super()._new_pool(scheme, host, port, request_context)
+        self.connection_stats.add_pool(pool)
+
+        return pool
+
+
+class NeplanHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter with connection reuse statistics, connection_stats is a ConnectionStats of service.py"""
+
+    def __init__(self, connection_stats, *args, **kwargs):
+
+        self.connection_stats = connection_stats
+        super().__init__(*args, **kwargs)
+
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager = CountingPoolManager(self.connection_stats, num_pools=connections, maxsize=maxsize, block=block, **pool_kwargs)
+
+
+class NeplanTransport(Transport):
+    """zeep Transport with a timeout per SOAP operation
+
+    operation_timeouts maps operation classes (analysis, export, lookup) or single operation names to seconds,
+    operation names take precedence over classes. operation_class maps an operation name to its class, current_call is
+    the context variable holding the measured call whose sent and received bytes are counted."""
+
+    def __init__(self, operation_timeouts=None, operation_class=None, current_call=None, **kwargs):
+
+        super().__init__(**kwargs)
+        self.operation_timeouts = operation_timeouts or {}
+        self.operation_class    = operation_class or (lambda operation_name: None)
+        self.current_call       = current_call or contextvars.ContextVar("neplan_current_call", default=None)
+
+
+    def get_operation_timeout(self, headers):
+
+        """Returns the timeout for the operation in the SOAPAction header"""
+
+        operation_name = headers.get("SOAPAction", "").strip('"').rsplit("/", 1)[-1]
+
+        if operation_name in self.operation_timeouts:
+            return self.operation_timeouts[operation_name]
+
+        return self.operation_timeouts.get(self.operation_class(operation_name))
+
+
+    def post(self, address, message, headers):
+
+        call = self.current_call.get()
+        if call:
+            call.sent(len(message))
+
+        response = self.session.post(address, data=message, headers=headers, timeout=self.get_operation_timeout(headers))
+
+        if call:
+            call.received(len(response.content))
+
+        return response
+
+
+class NeplanAsyncTransport(AsyncTransport):
+    """zeep AsyncTransport (httpx) with a timeout per SOAP operation, see NeplanTransport"""
+
+    def __init__(self, operation_timeouts=None, operation_class=None, current_call=None, **kwargs):
+
+        super().__init__(**kwargs)
+        self.operation_timeouts = operation_timeouts or {}
+        self.operation_class    = operation_class or (lambda operation_name: None)
+        self.current_call       = current_call or contextvars.ContextVar("neplan_current_call", default=None)
+
+    get_operation_timeout = NeplanTransport.get_operation_timeout
+
+
+    async def post(self, address, message, headers):
+
+        call = self.current_call.get()
+        if call:
+            call.sent(len(message))
+
+        response = await self.client.post(address, content=message, headers=headers, timeout=self.get_operation_timeout(headers))
+
+        if call:
+            call.received(len(response.content))
+
+        return response
+
+
+# --- METERED PROXIES ---
+
+class MeteredOperationProxy(OperationProxy):
+    """zeep OperationProxy recording every call in the OperationMetrics and waiting for a slot of the
+    ConcurrencyLimiter of its service proxy"""
+
+    def __call__(self, *args, **kwargs):
+
+        limiter = self._proxy._limiter
+
+        with limiter.slot(self._op_name) if limiter else nullcontext(), \
+             self._proxy._metrics.measure(self._op_name) if self._proxy._metrics else nullcontext():
+            return super().__call__(*args, **kwargs)
+
+
+class MeteredAsyncOperationProxy(AsyncOperationProxy):
+    """zeep AsyncOperationProxy recording every call in the OperationMetrics and waiting for a slot of the
+    ConcurrencyLimiter of its service proxy"""
+
+    async def __call__(self, *args, **kwargs):
+
+        limiter = self._proxy._limiter
+
+        async with limiter.async_slot(self._op_name) if limiter else nullcontext():
+            with self._proxy._metrics.measure(self._op_name) if self._proxy._metrics else nullcontext():
+                return await super().__call__(*args, **kwargs)
+
+
+class MeteredServiceProxy(ServiceProxy):
+    """zeep ServiceProxy whose operations are recorded in metrics and limited by limiter, both may be None"""
+
+    operation_proxy = MeteredOperationProxy
+
+    def __init__(self, client, binding, metrics, limiter=None, **binding_options):
+
+        super().__init__(client, binding, **binding_options)
+        self._metrics    = metrics
+        self._limiter    = limiter
+        self._operations = {name: self.operation_proxy(self, name) for name in binding.all()}
+
+
+class MeteredAsyncServiceProxy(MeteredServiceProxy, AsyncServiceProxy):
+    """zeep AsyncServiceProxy whose operations are recorded in metrics and limited by limiter"""
+
+    operation_proxy = MeteredAsyncOperationProxy
+
+
+# --- MESSAGE HISTORY ---
+
+class MessageHistory(Plugin):
+    """zeep plugin keeping the last SOAP message exchanges for print_last_messageexchange, a bounded HistoryPlugin
+
+    mode: "all" keeps every exchange, "errors" keeps only exchanges answered with a SOAP Fault
+    max_body_size: envelopes above this size in bytes are truncated, None keeps them complete
+    maxlen: number of kept exchanges
+    Envelopes are kept as serialized text, not as lxml trees, so large responses are not held in memory. In "errors" mode
+    the sent envelope of a running call is kept the same way until its answer arrives, calls failing before that leave
+    no lxml tree behind."""
+
+    MODES = ("all", "errors")
+
+    def __init__(self, mode="all", max_body_size=64 * 1024, maxlen=1):
+
+        if mode not in self.MODES:
+            raise ValueError("Unknown history mode {}, use one of {}".format(mode, ", ".join(self.MODES)))
+
+        self.mode          = mode
+        self.max_body_size = max_body_size
+        self._buffer       = deque([], maxlen)
+        self._lock         = threading.Lock()
+
+        # Exchange of the running call, per thread and per asyncio task
+        self._current      = contextvars.ContextVar("neplan_exchange_{}".format(id(self)), default=None)
+
+
+    @property
+    def options(self):
+
+        """Constructor arguments, to set up the same history in another process"""
+
+        return {"mode": self.mode, "max_body_size": self.max_body_size, "maxlen": self._buffer.maxlen}
+
+
+    @property
+    def last_sent(self):
+
+        with self._lock:
+            return self._buffer[-1]["sent"] if self._buffer else None
+
+
+    @property
+    def last_received(self):
+
+        with self._lock:
+            return self._buffer[-1]["received"] if self._buffer else None
+
+
+    def clear(self):
+
+        """Removes all kept exchanges"""
+
+        with self._lock:
+            self._buffer.clear()
+
+
+    def _message(self, envelope, http_headers):
+
+        """Returns the envelope as (truncated) text together with the HTTP headers. Above max_body_size only a copy with
+        about the first max_body_size bytes of tags and text is serialized, never the whole envelope."""
+
+        if self.max_body_size is None:
+            body = etree.tostring(envelope, pretty_print=True)
+        else:
+            head = etree.Element(envelope.tag, envelope.attrib, nsmap=envelope.nsmap)
+            complete = _copy_head(envelope, head, self.max_body_size) >= 0
+            body = etree.tostring(head, pretty_print=True)
+
+            if not complete:
+                body += "... truncated above {} bytes".format(self.max_body_size).encode()
+
+        return {"envelope": body.decode("utf-8", errors="replace"), "http_headers": http_headers}
+
+
+    def egress(self, envelope, http_headers, operation, binding_options):
+
+        exchange = {"sent": self._message(envelope, http_headers), "received": None}
+        self._current.set(exchange)
+
+        if self.mode == "all":
+            with self._lock:
+                self._buffer.append(exchange)
+
+        return envelope, http_headers
+
+
+    def ingress(self, envelope, http_headers, operation):
+
+        exchange = self._current.get()
+        self._current.set(None)
+
+        if exchange is None:
+            return envelope, http_headers
+
+        if self.mode == "errors":
+            if envelope.find("{*}Body/{*}Fault") is not None:
+                exchange["received"] = self._message(envelope, http_headers)
+                with self._lock:
+                    self._buffer.append(exchange)
+        else:
+            exchange["received"] = self._message(envelope, http_headers)
+
+        return envelope, http_headers
+
+
+def _copy_head(source, target, budget):
+    """Copies text, child elements and tails of source to target in document order until budget characters of tags and
+    text are used, returns the remaining budget, negative if source was not copied completely. Comments are left out."""
+
+    if source.text:
+        target.text = source.text[:max(budget, 0)]
+        budget -= len(source.text)
+
+    for child in source:
+        if budget < 0:
+            break
+
+        if not isinstance(child.tag, str):
+            continue
+
+        budget -= 2 * len(child.tag) + sum(len(name) + len(value) + 4 for name, value in child.items()) + 5
+        copy = etree.SubElement(target, child.tag, child.attrib, nsmap=child.nsmap)
+        budget = _copy_head(child, copy, budget)
+
+        if child.tail and budget >= 0:
+            copy.tail = child.tail[:budget]
+            budget -= len(child.tail)
+
+    return budget
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# service.py, soap.py and mockserver.py are imported as top level modules, as the scripts in neplanSOAP do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "neplanSOAP"))
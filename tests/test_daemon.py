@@ -0,0 +1,72 @@
+"""Access rules of the job daemon on a TCP port"""
+import pytest
+
+from mockserver import MockNeplanServer
+from service import NeplanService
+import daemon
+
+
+@pytest.fixture(scope="module")
+def api():
+
+    with MockNeplanServer() as server:
+        yield NeplanService(server.url, "user", "password", wsdl_cache=False, history=False)
+
+
+@pytest.fixture
+def neplan_daemon(api, tmp_path):
+
+    with daemon.NeplanDaemon(api, port=0, token="secret", output_root=str(tmp_path)) as neplan_daemon:
+        yield neplan_daemon
+
+
+def test_tcp_mode_needs_token_and_loopback(api):
+
+    with pytest.raises(ValueError, match="token"):
+        daemon.NeplanDaemon(api, port=0)
+
+    with pytest.raises(ValueError, match="loopback"):
+        daemon.NeplanDaemon(api, host="0.0.0.0", port=0, token="secret")
+
+
+def test_requests_without_token_are_refused(neplan_daemon):
+
+    with pytest.raises(RuntimeError, match="401"):
+        daemon.DaemonClient(url=neplan_daemon.address).status()
+
+    with pytest.raises(RuntimeError, match="401"):
+        daemon.DaemonClient(url=neplan_daemon.address, token="wrong").submit("call", {"method": "GetProjects"})
+
+    assert daemon.DaemonClient(url=neplan_daemon.address, token="secret").status()["jobs"] == {}
+
+
+def test_call_jobs_only_run_reading_methods(neplan_daemon):
+
+    client = daemon.DaemonClient(url=neplan_daemon.address, token="secret")
+
+    assert client.submit("call", {"method": "GetProjects"}, wait=30)["status"] == "done"
+
+    with pytest.raises(RuntimeError, match="400"):
+        client.submit("call", {"method": "DeleteMarkedAdDeletedProject"})
+
+
+def test_job_files_stay_below_output_root(neplan_daemon, tmp_path):
+
+    client = daemon.DaemonClient(url=neplan_daemon.address, token="secret")
+
+    with pytest.raises(RuntimeError, match="outside"):
+        client.submit("cimexport", {"project": "Project", "file_path": "/tmp/../etc/export.zip"})
+
+    job = client.submit("cimexport", {"project": "Project", "file_path": str(tmp_path / "export.zip")}, wait=30)
+    assert job["status"] == "done"
+
+
+def test_invalid_wait_is_answered_with_400(neplan_daemon):
+
+    client = daemon.DaemonClient(url=neplan_daemon.address, token="secret")
+
+    with pytest.raises(RuntimeError, match="400"):
+        client._request("GET", "/jobs/unknown?wait=abc")
+
+    with pytest.raises(RuntimeError, match="400"):
+        client.submit("call", {"method": "GetProjects"}, wait="abc")
@@ -0,0 +1,73 @@
+"""Memory ceiling of the streamed transfers: CIMExport, ZipUpload and XMLUpload of files several times the ceiling"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from mockserver import MockNeplanServer
+
+
+CEILING_MB = 16
+FILE_MB    = 4 * CEILING_MB
+
+# Runs in a fresh interpreter, so neither the mock server nor earlier tests raise the RSS high-water mark. VmHWM is
+# used and not ru_maxrss, which Linux carries over from the forking process into the child.
+CLIENT = """
+import json, sys, tracemalloc
+from service import NeplanService
+
+url, export_path, zip_path, xml_path = sys.argv[1:]
+
+def memory_mb(field):
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith(field + ":")) / 1024
+
+api = NeplanService(url, "user", "password", wsdl_cache=False)
+project = api.GetProject("Project")
+transfers = {"CIMExport": lambda: api.CIMExport(project, export_path),
+             "ZipUpload": lambda: api.stream_upload("ZipUpload", zip_path),
+             "XMLUpload": lambda: api.stream_upload("XMLUpload", xml_path)}
+
+rss_before = memory_mb("VmRSS")
+result = {}
+for name, transfer in transfers.items():
+    tracemalloc.start()
+    transfer()
+    result[name] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    tracemalloc.stop()
+
+result["rss_growth"] = memory_mb("VmHWM") - rss_before
+print(json.dumps(result))
+"""
+
+
+@pytest.fixture(scope="module")
+def server():
+
+    with MockNeplanServer(export_bytes=FILE_MB * 1024 ** 2) as server:
+        yield server
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads VmRSS and VmHWM from /proc")
+def test_streamed_transfers_stay_below_ceiling(server, tmp_path):
+
+    zip_path = tmp_path / "boundary.zip"
+    xml_path = tmp_path / "list.xml"
+
+    for path in (zip_path, xml_path):
+        with open(path, "wb") as file_object:
+            for _ in range(FILE_MB):
+                file_object.write(os.urandom(1024 ** 2))
+
+    output = subprocess.run([sys.executable, "-c", CLIENT, server.url, str(tmp_path / "export.zip"), str(zip_path), str(xml_path)],
+                            check=True, capture_output=True, text=True, cwd=os.path.dirname(sys.modules["mockserver"].__file__)).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    assert os.path.getsize(tmp_path / "export.zip") == FILE_MB * 1024 ** 2
+
+    for name in ("CIMExport", "ZipUpload", "XMLUpload"):
+        assert result[name] < CEILING_MB, "{} traced {:.1f} MB".format(name, result[name])
+
+    assert result["rss_growth"] < CEILING_MB, "RSS grew by {:.1f} MB".format(result["rss_growth"])